@@ -2,10 +2,18 @@
 """
 Analyze evaluation results and generate calibration report
 """
+import argparse
 import json
+from collections import Counter
 from pathlib import Path
 import statistics
 
+from budget import DEFAULT_MODEL
+from instrumentation import add_tracing_args, configure_tracer
+from records import CRITERIA, CRITERIA_MAX, MISSING, EvaluationEntry, EvaluationRecord, ScoreTable
+from sampling import THRESHOLD
+from similarity import SIMILARITY_INDEX_FILE, SimilarityIndex
+
 def calculate_correlation(x, y):
     """Calculate Pearson correlation coefficient"""
     if len(x) != len(y) or len(x) < 2:
@@ -23,83 +31,150 @@ def calculate_correlation(x, y):
     
     return numerator / (denominator_x * denominator_y) ** 0.5
 
-def main():
-    project_dir = Path(__file__).parent.parent
-    results_dir = project_dir / 'results'
+def load_evaluations(path):
+    """Load all_evaluations.json as EvaluationEntry records"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [EvaluationEntry.from_dict(e) for e in json.load(f)]
+
+def method_counts(entries):
+    """Evaluations per method: the main model, or what the budget controller downgraded them to"""
+    return dict(Counter(DEFAULT_MODEL if e.method is MISSING else e.method for e in entries))
+
+def calibration_entries(entries):
+    """
+    Evaluations made by the main model; downgraded ones would skew the calibration.
+
+    A run made with a single method (e.g. evaluator_mock.py, all heuristic) is
+    calibrated as a whole. Petitions used as exemplars (evaluator.py
+    --exemplars) are always left out: they were picked for their extreme
+    scores and the model saw their evaluation in its prompt.
+    """
+    entries = [e for e in entries if e.exemplar is not True]
+    if len({e.method for e in entries}) == 1:
+        return entries
+    return [e for e in entries if e.method is MISSING]
+
+def calibration_summary(entries):
+    """build_summary of the calibrated entries, with their sampling variance when there is any"""
+    calibrated = calibration_entries(entries)
+    summary = build_summary(ScoreTable.from_entries(calibrated), method_counts(entries))
+    summary['exemplars_excluded'] = sum(1 for e in entries if e.exemplar is True)
+    sampled = sampled_evaluations(calibrated)
+    if sampled:
+        summary['uncertainty'] = build_uncertainty_summary(sampled)
+    return summary
+
+def build_summary(table, methods=None):
+    """Build the calibration summary saved to calibration_summary.json
+
+    methods, from method_counts(), records how many evaluations of each
+    method there were, including those left out of the table.
+    """
+    by_rating = table.rows_by_rating()
     
-    # Load all evaluations
-    all_evals_file = results_dir / 'all_evaluations.json'
-    if not all_evals_file.exists():
-        print("No evaluations found!")
-        return
+    summary = {
+        'total_evaluations': len(table),
+        'correlation': calculate_correlation(*table.rated_scores()),
+        'by_rating': {}
+    }
+    if methods:
+        summary['methods'] = methods
     
-    with open(all_evals_file, 'r', encoding='utf-8') as f:
-        evaluations = json.load(f)
+    for rating in sorted(by_rating.keys(), reverse=True):
+        rows = by_rating[rating]
+        ai_scores = table.scores_for(rows)
+        if not ai_scores:
+            summary['by_rating'][rating] = {'count': len(rows)}
+            continue
+        
+        summary['by_rating'][rating] = {
+            'count': len(rows),
+            'ai_score_avg': statistics.mean(ai_scores),
+            'ai_score_median': statistics.median(ai_scores),
+            'ai_score_min': min(ai_scores),
+            'ai_score_max': max(ai_scores),
+            'ai_score_stdev': statistics.stdev(ai_scores) if len(ai_scores) > 1 else 0
+        }
     
+    return summary
+
+def print_report(entries, table, methods=None, exemplars=()):
+    """Print the calibration report"""
     print("="*80)
     print("PETITION EVALUATOR - CALIBRATION REPORT")
     print("="*80)
     
     # Group by customer rating
-    by_rating = {}
-    for eval_data in evaluations:
-        rating = eval_data['customer_rating']
-        if rating not in by_rating:
-            by_rating[rating] = []
-        by_rating[rating].append(eval_data)
-    
-    print(f"\nTotal petitions evaluated: {len(evaluations)}")
+    by_rating = table.rows_by_rating()
+    
+    print(f"\nTotal petitions evaluated: {len(table)}")
+    if methods and len(methods) > 1:
+        print("Evaluation methods: " + ', '.join(f"{method} {count}" for method, count in methods.items()))
+        print(f"  Only the {DEFAULT_MODEL} evaluations are calibrated below; "
+              f"the others were downgraded by the budget controller")
+    if exemplars:
+        print(f"Exemplar petitions left out of the calibration: {', '.join(map(str, exemplars))}")
     print("\n" + "-"*80)
     print("RESULTS BY CUSTOMER RATING")
     print("-"*80)
     
     for rating in sorted(by_rating.keys(), reverse=True):
-        petitions = by_rating[rating]
-        ai_scores = [p['ai_score'] for p in petitions]
+        rows = by_rating[rating]
+        ai_scores = table.scores_for(rows)
         
-        print(f"\nCustomer Rating {rating} ({len(petitions)} petitions)")
-        print(f"  AI Score Range: {min(ai_scores)} - {max(ai_scores)}")
-        print(f"  AI Score Average: {statistics.mean(ai_scores):.1f}")
-        print(f"  AI Score Median: {statistics.median(ai_scores):.1f}")
+        print(f"\nCustomer Rating {rating} ({len(rows)} petitions)")
+        if ai_scores:
+            print(f"  AI Score Range: {min(ai_scores):g} - {max(ai_scores):g}")
+            print(f"  AI Score Average: {statistics.mean(ai_scores):.1f}")
+            print(f"  AI Score Median: {statistics.median(ai_scores):.1f}")
         if len(ai_scores) > 1:
             print(f"  AI Score Std Dev: {statistics.stdev(ai_scores):.1f}")
         
         # Show individual scores
         print(f"  Individual scores:")
-        for p in petitions:
-            print(f"    - Request {p['request_id']}: {p['ai_score']}/100")
+        for i in rows:
+            score = table.ai_scores[i]
+            print(f"    - Request {table.request_ids[i]}: " + (f"{score:g}/100" if score >= 0 else "no score"))
     
     print("\n" + "-"*80)
-    print("CORRELATION ANALYSIS")
+    print("AVERAGE CRITERION SCORES BY RATING")
     print("-"*80)
     
-    customer_ratings = [e['customer_rating'] for e in evaluations]
-    ai_scores = [e['ai_score'] for e in evaluations]
+    print(f"\n  {'criterion':<26}" + ''.join(f"{'rating ' + str(r):>10}" for r in sorted(by_rating, reverse=True)))
+    means = {rating: table.criterion_means(rows) for rating, rows in by_rating.items()}
+    for name, max_score in zip(CRITERIA, CRITERIA_MAX):
+        cells = []
+        for rating in sorted(by_rating, reverse=True):
+            value = means[rating][name]
+            cells.append(f"{'-' if value is None else f'{value:.1f}/{max_score}':>10}")
+        print(f"  {name:<26}" + ''.join(cells))
     
-    correlation = calculate_correlation(customer_ratings, ai_scores)
+    print("\n" + "-"*80)
+    print("CORRELATION ANALYSIS")
+    print("-"*80)
+    
+    correlation = calculate_correlation(*table.rated_scores())
     print(f"\nPearson Correlation (Customer Rating vs AI Score): {correlation:.3f}")
     
     # Calculate accuracy for rating 5 (should be >= 85)
-    rating_5 = [e for e in evaluations if e['customer_rating'] == 5]
-    if rating_5:
-        rating_5_scores = [e['ai_score'] for e in rating_5]
+    rating_5_scores = table.scores_for(by_rating.get(5, []))
+    if rating_5_scores:
         rating_5_avg = statistics.mean(rating_5_scores)
         rating_5_above_85 = len([s for s in rating_5_scores if s >= 85])
         
         print(f"\nRating 5 petitions (Gold Standard):")
-        print(f"  Count: {len(rating_5)}")
+        print(f"  Count: {len(rating_5_scores)}")
         print(f"  Average AI Score: {rating_5_avg:.1f}")
-        print(f"  Scores >= 85: {rating_5_above_85}/{len(rating_5)} ({rating_5_above_85/len(rating_5)*100:.1f}%)")
+        print(f"  Scores >= 85: {rating_5_above_85}/{len(rating_5_scores)} ({rating_5_above_85/len(rating_5_scores)*100:.1f}%)")
         print(f"  Target: ≥85 average score ✓" if rating_5_avg >= 85 else f"  Target: ≥85 average score ✗ (adjust needed)")
     
     # Calculate for low ratings (should be < 85)
-    low_ratings = [e for e in evaluations if e['customer_rating'] <= 3]
-    if low_ratings:
-        low_scores = [e['ai_score'] for e in low_ratings]
+    low_scores = table.scores_for([i for rating, rows in by_rating.items() if rating <= 3 for i in rows])
+    if low_scores:
         low_avg = statistics.mean(low_scores)
         
         print(f"\nRating 1-3 petitions (Low Quality):")
-        print(f"  Count: {len(low_ratings)}")
+        print(f"  Count: {len(low_scores)}")
         print(f"  Average AI Score: {low_avg:.1f}")
         print(f"  Target: <85 average score ✓" if low_avg < 85 else f"  Target: <85 average score ✗ (adjust needed)")
     
@@ -108,17 +183,14 @@ def main():
     print("-"*80)
     
     for rating in sorted(by_rating.keys(), reverse=True):
-        petitions = by_rating[rating]
         all_problems = []
         
-        for p in petitions:
-            if 'evaluation' in p and 'problemas' in p['evaluation']:
-                all_problems.extend(p['evaluation']['problemas'])
+        for i in by_rating[rating]:
+            all_problems.extend(entries[i].problemas)
         
         if all_problems:
             print(f"\nCustomer Rating {rating}:")
             # Count problem frequency
-            from collections import Counter
             problem_counts = Counter(all_problems)
             for problem, count in problem_counts.most_common(5):
                 print(f"  - {problem} ({count}x)")
@@ -126,32 +198,146 @@ def main():
     print("\n" + "="*80)
     print("END OF REPORT")
     print("="*80)
-    
-    # Save summary to file
-    summary = {
-        'total_evaluations': len(evaluations),
-        'correlation': correlation,
-        'by_rating': {}
+
+def sampled_evaluations(entries):
+    """(entry, sampling stats) for evaluations made with evaluator.py --samples"""
+    sampled = []
+    for entry in entries:
+        if isinstance(entry.evaluation, EvaluationRecord):
+            sampling = entry.evaluation.extra.get('sampling')
+            if isinstance(sampling, dict):
+                sampled.append((entry, sampling))
+    return sampled
+
+def uncertainty_band(sampling):
+    """mean ± one sample standard deviation of the total score"""
+    score = sampling['score']
+    return score['mean'] - score['stdev'], score['mean'] + score['stdev']
+
+def build_uncertainty_summary(sampled):
+    """Variance summary saved under 'uncertainty' in calibration_summary.json"""
+    crossing = [entry.request_id for entry, sampling in sampled
+                if uncertainty_band(sampling)[0] < THRESHOLD <= uncertainty_band(sampling)[1]]
+    criteria = {}
+    for name in CRITERIA:
+        stats = [s['criteria'][name] for _, s in sampled if name in s['criteria']]
+        if stats:
+            criteria[name] = {
+                'variance_avg': statistics.mean(c['variance'] for c in stats),
+                'agreement_avg': statistics.mean(c['agreement'] for c in stats),
+            }
+    return {
+        'sampled_evaluations': len(sampled),
+        'samples_per_evaluation': statistics.mean(s['samples'] for _, s in sampled),
+        'score_stdev_avg': statistics.mean(s['score']['stdev'] for _, s in sampled),
+        'crossing_threshold': crossing,
+        'stopped': dict(Counter(s.get('stopped') for _, s in sampled)),
+        'criteria': criteria,
     }
+
+def print_uncertainty(sampled):
+    print("\n" + "-"*80)
+    print(f"SCORE UNCERTAINTY (multi-sample; band = mean ± 1 stdev, ⚠ = band crosses {THRESHOLD})")
+    print("-"*80)
     
-    for rating in sorted(by_rating.keys(), reverse=True):
-        petitions = by_rating[rating]
-        ai_scores = [p['ai_score'] for p in petitions]
-        
-        summary['by_rating'][rating] = {
-            'count': len(petitions),
-            'ai_score_avg': statistics.mean(ai_scores),
-            'ai_score_median': statistics.median(ai_scores),
-            'ai_score_min': min(ai_scores),
-            'ai_score_max': max(ai_scores),
-            'ai_score_stdev': statistics.stdev(ai_scores) if len(ai_scores) > 1 else 0
-        }
+    print(f"\n  {'request':>10} {'rating':>6} {'mean':>6} {'band':>13} {'range':>9} {'samples':>8}  stopped")
+    for entry, sampling in sorted(sampled, key=lambda item: abs(item[1]['score']['mean'] - THRESHOLD)):
+        low, high = uncertainty_band(sampling)
+        score = sampling['score']
+        band = f"{low:.1f}-{high:.1f}"
+        spread = f"{score['min']}-{score['max']}"
+        samples = f"{sampling['samples']}/{sampling.get('requested', sampling['samples'])}"
+        marker = ' ⚠' if low < THRESHOLD <= high else ''
+        print(f"  {entry.request_id:>10} {entry.customer_rating:>6} {score['mean']:>6.1f} {band:>13} {spread:>9} "
+              f"{samples:>8}  {sampling.get('stopped', '-')}{marker}")
+    
+    summary = build_uncertainty_summary(sampled)
+    print(f"\n  Average score stdev: {summary['score_stdev_avg']:.2f} "
+          f"({summary['samples_per_evaluation']:.1f} samples per petition)")
+    print(f"  Bands crossing {THRESHOLD}: {len(summary['crossing_threshold'])}/{len(sampled)}")
+    print(f"\n  {'criterion':<26}{'variance':>10}{'agreement':>11}")
+    for name, stats in summary['criteria'].items():
+        print(f"  {name:<26}{stats['variance_avg']:>10.2f}{stats['agreement_avg']:>11.0%}")
+
+def nearest_exemplars(table, index, limit=20):
+    """(request_id, rating, ai_score, exemplar_id, exemplar_score, cosine) for the lowest-scored low-rated petitions"""
+    by_rating = table.rows_by_rating()
+    gold_rows = by_rating.get(5, [])
+    gold_scores = {table.request_ids[i]: table.ai_scores[i] for i in gold_rows if table.ai_scores[i] >= 0}
+    low_rows = [i for rating, rows in by_rating.items() if rating <= 3 for i in rows if table.ai_scores[i] >= 0]
+    low_rows.sort(key=lambda i: table.ai_scores[i])
+    
+    results = []
+    for i in low_rows[:limit]:
+        request_id = table.request_ids[i]
+        if index.row_of(request_id) is None:
+            continue
+        nearest = index.most_similar(request_id, k=1, candidates=gold_scores)
+        if nearest:
+            exemplar_id, cosine = nearest[0]
+            results.append((request_id, table.customer_ratings[i], table.ai_scores[i],
+                            exemplar_id, gold_scores[exemplar_id], cosine))
+    return results
+
+def print_nearest_exemplars(exemplars):
+    print("\n" + "-"*80)
+    print("NEAREST GOLD-STANDARD EXEMPLARS (rating 1-3 vs most similar rating 5)")
+    print("-"*80)
+    
+    for request_id, rating, ai_score, exemplar_id, exemplar_score, cosine in exemplars:
+        print(f"  Request {request_id} (rating {rating}, {ai_score:g}/100) -> "
+              f"Request {exemplar_id} ({exemplar_score:g}/100), similarity {cosine:.3f}")
+
+def main(evals_filename='all_evaluations.json'):
+    parser = argparse.ArgumentParser(description='Analyze evaluation results')
+    add_tracing_args(parser)
+    args = parser.parse_args()
+    tracer = configure_tracer('analyze_results', args.trace, args.prometheus)
+    
+    project_dir = Path(__file__).parent.parent
+    results_dir = project_dir / 'results'
+    
+    # Load all evaluations
+    all_evals_file = results_dir / evals_filename
+    if not all_evals_file.exists():
+        print("No evaluations found!")
+        return
+    
+    with tracer.span('load'):
+        loaded = load_evaluations(all_evals_file)
+        methods = method_counts(loaded)
+        exemplars = [e.request_id for e in loaded if e.exemplar is True]
+        entries = calibration_entries(loaded)
+        table = ScoreTable.from_entries(entries)
+    
+    with tracer.span('report'):
+        print_report(entries, table, methods, exemplars)
+    
+    # Variance of evaluations made with evaluator.py --samples
+    sampled = sampled_evaluations(entries)
+    if sampled:
+        print_uncertainty(sampled)
+    
+    # Nearest rating-5 petition for low-rated ones, when similarity.py built an index
+    similarity_file = project_dir / 'data' / SIMILARITY_INDEX_FILE
+    if similarity_file.exists():
+        with tracer.span('exemplars'):
+            nearest = nearest_exemplars(table, SimilarityIndex(similarity_file))
+        print_nearest_exemplars(nearest)
+    else:
+        print(f"\n(Run scripts/similarity.py build to list the nearest gold-standard exemplars)")
+    
+    # Save summary to file
+    with tracer.span('summary'):
+        summary = calibration_summary(loaded)
     
     summary_file = results_dir / 'calibration_summary.json'
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        json.dump(summary, f, indent=2, ensure_ascii=False)
+    with tracer.span('save'):
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
     
     print(f"\nSummary saved to: {summary_file}")
+    tracer.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Shared, lazily initialized Anthropic client
+
+The SDK import and client construction are deferred until the first API call,
+so modules that only need prompts or helpers stay cheap to import. One client
+(and its pooled HTTP connections) is reused by every caller in the process.
+use_cassette() swaps it for a recording or replaying wrapper (cassette.py).
+"""
+import threading
+
+from resilience import CircuitBreaker, RetryBudget, RetryPolicy
+
+_client = None
+_default_policy = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Anthropic client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from anthropic import Anthropic
+                # Will use ANTHROPIC_API_KEY / ANTHROPIC_BASE_URL from the environment.
+                # SDK retries are disabled: transient failures go through RetryPolicy.
+                _client = Anthropic(max_retries=0)
+    return _client
+
+
+def use_cassette(mode, path):
+    """Route get_client() through a cassette: 'record' wraps the real client, 'replay' replaces it"""
+    global _client
+    from cassette import RecordingClient, ReplayClient
+    with _lock:
+        if mode == 'replay':
+            _client = ReplayClient(path)
+        elif mode == 'record':
+            from anthropic import Anthropic
+            _client = RecordingClient(Anthropic(max_retries=0), path)
+        else:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+    return _client
+
+
+def transient_errors():
+    """SDK exception types that are always worth retrying (connection errors, timeouts)"""
+    if getattr(_client, 'offline', False):
+        return ()  # replayed responses never hit the network, and need no SDK import
+    from anthropic import APIConnectionError
+    return (APIConnectionError,)
+
+
+def build_retry_policy(max_attempts=6, retry_budget=100, failure_threshold=5, reset_timeout=30.0):
+    """Retry policy shared by all workers of a run"""
+    return RetryPolicy(
+        max_attempts=max_attempts,
+        budget=RetryBudget(retry_budget),
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout),
+        retry_on=transient_errors(),
+    )
+
+
+def get_default_policy():
+    """Return the process-wide retry policy, creating it on first use"""
+    global _default_policy
+    if _default_policy is None:
+        with _lock:
+            if _default_policy is None:
+                _default_policy = build_retry_policy()
+    return _default_policy
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the petition pipeline
+
+Generates a synthetic corpus (generate_corpus.py) and measures:
+  extract_docx     download_petitions.extract_text_from_docx
+  heuristics       evaluator_mock.analyze_petition_heuristics
+  evaluator        evaluator.evaluate_one end to end against the fake Messages API
+  evaluator_replay evaluator.evaluate_one replaying a cassette recorded from the fake API
+  analyze_results  analyze_results.build_summary + print_report
+
+Each benchmark runs in its own process so peak RSS is attributable. Results are
+saved to results/benchmarks/ and compared with the previous run.
+
+    python scripts/benchmark.py --count 50 --size 30000 --api-latency 0.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from instrumentation import percentile
+
+SCRIPTS_DIR = Path(__file__).parent
+BENCHMARKS = ('extract_docx', 'heuristics', 'evaluator', 'evaluator_replay', 'analyze_results')
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def load_corpus(corpus_dir):
+    with open(Path(corpus_dir) / 'data' / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_texts(corpus_dir, petitions):
+    texts = []
+    for petition in petitions:
+        with open(Path(corpus_dir) / 'petitions' / petition['txt_file'], 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    return texts
+
+
+def bench_extract_docx(corpus_dir, petitions, options):
+    from download_petitions import extract_text_from_docx
+    latencies = []
+    for petition in petitions:
+        started = time.perf_counter()
+        extract_text_from_docx(Path(corpus_dir) / 'petitions' / petition['docx_file'])
+        latencies.append(time.perf_counter() - started)
+    return latencies, len(petitions)
+
+
+def bench_heuristics(corpus_dir, petitions, options):
+    from evaluator_mock import analyze_petition_heuristics
+    texts = read_texts(corpus_dir, petitions)
+    latencies = []
+    for _ in range(options['repeat']):
+        for text in texts:
+            started = time.perf_counter()
+            analyze_petition_heuristics(text)
+            latencies.append(time.perf_counter() - started)
+    return latencies, len(latencies)
+
+
+def bench_evaluator(corpus_dir, petitions, options):
+    from fake_messages_api import start_server
+    server, base_url = start_server(latency=options['api_latency'], jitter=options['api_latency'] / 4, seed=0)
+    os.environ['ANTHROPIC_BASE_URL'] = base_url
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'benchmark')
+
+    from anthropic_client import build_retry_policy
+    from evaluator import evaluate_one
+    from records import PetitionRecord
+    policy = build_retry_policy()
+    petitions_dir = Path(corpus_dir) / 'petitions'
+    petitions = [PetitionRecord.from_dict(p) for p in petitions]
+
+    latencies = []
+
+    def timed(petition):
+        started = time.perf_counter()
+        evaluate_one(petition, petitions_dir, results_dir, policy)
+        latencies.append(time.perf_counter() - started)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results_dir = Path(tmp)
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            list(executor.map(timed, petitions))
+    server.shutdown()
+    return latencies, len(petitions)
+
+
+def bench_evaluator_replay(corpus_dir, petitions, options):
+    from fake_messages_api import start_server
+    server, base_url = start_server(seed=0)
+    os.environ['ANTHROPIC_BASE_URL'] = base_url
+    os.environ.setdefault('ANTHROPIC_API_KEY', 'benchmark')
+
+    import anthropic_client
+    from evaluator import evaluate_one
+    from records import PetitionRecord
+    policy = anthropic_client.build_retry_policy()
+    petitions_dir = Path(corpus_dir) / 'petitions'
+    petitions = [PetitionRecord.from_dict(p) for p in petitions]
+
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        results_dir = Path(tmp)
+        cassette_path = results_dir / 'bench.cassette.gz'
+        with contextlib.redirect_stdout(io.StringIO()):
+            recorder = anthropic_client.use_cassette('record', cassette_path)
+            for petition in petitions:
+                evaluate_one(petition, petitions_dir, results_dir, policy)
+            recorder.close()
+        server.shutdown()
+
+        anthropic_client.use_cassette('replay', cassette_path)
+        replay_started = time.perf_counter()
+        for _ in range(options['repeat']):
+            for petition in petitions:
+                started = time.perf_counter()
+                evaluate_one(petition, petitions_dir, results_dir, policy)
+                latencies.append(time.perf_counter() - started)
+        replay_elapsed = time.perf_counter() - replay_started
+    # Recording is setup; throughput covers the replay passes only
+    return latencies, len(latencies), replay_elapsed
+
+
+def bench_analyze_results(corpus_dir, petitions, options):
+    from analyze_results import build_summary, print_report
+    from evaluator_mock import analyze_petition_heuristics
+    from records import EvaluationEntry, ScoreTable
+
+    evaluations = []
+    for petition, text in zip(petitions, read_texts(corpus_dir, petitions)):
+        evaluation = analyze_petition_heuristics(text)
+        evaluations.append({
+            'request_id': petition['request_id'],
+            'customer_rating': petition['rating'],
+            'ai_score': evaluation['score'],
+            'evaluation': evaluation,
+            'text_length': len(text)
+        })
+
+    latencies = []
+    for _ in range(options['repeat']):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            entries = [EvaluationEntry.from_dict(e) for e in evaluations]
+            table = ScoreTable.from_entries(entries)
+            print_report(entries, table)
+            build_summary(table)
+        latencies.append(time.perf_counter() - started)
+    return latencies, len(evaluations) * options['repeat']
+
+
+def run_child(name, corpus_dir, options):
+    """Run one benchmark in this process and return its result dict"""
+    petitions = load_corpus(corpus_dir)
+    started = time.perf_counter()
+    latencies, items, *timed = globals()[f"bench_{name}"](corpus_dir, petitions, options)
+    elapsed = timed[0] if timed else time.perf_counter() - started
+    return {
+        'benchmark': name,
+        'items': items,
+        'elapsed_s': round(elapsed, 4),
+        'petitions_per_s': round(items / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_run(output_dir):
+    runs = sorted(output_dir.glob('bench_*.json'))
+    if not runs:
+        return None
+    with open(runs[-1], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_table(results, previous):
+    baseline = {r['benchmark']: r for r in (previous or {}).get('results', [])}
+    print(f"\n{'benchmark':<16} {'pet/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'RSS MB':>8} {'Δ pet/s':>9}")
+    print("-" * 78)
+    for r in results:
+        delta = ''
+        before = baseline.get(r['benchmark'])
+        if before and before.get('petitions_per_s'):
+            delta = f"{(r['petitions_per_s'] / before['petitions_per_s'] - 1) * 100:+.1f}%"
+        print(f"{r['benchmark']:<16} {r['petitions_per_s']:>10.1f} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} "
+              f"{r['p99_ms']:>10.2f} {r['peak_rss_mb']:>8.1f} {delta:>9}")
+    if previous:
+        print(f"(Δ relative to {previous['revision']} at {previous['timestamp']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the petition pipeline')
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help='Comma-separated subset to run')
+    parser.add_argument('--count', type=int, default=50, help='Synthetic petitions to generate')
+    parser.add_argument('--size', type=int, default=30000, help='Average petition size in characters')
+    parser.add_argument('--corpus', help='Use an existing corpus directory instead of generating one')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions for CPU-bound benchmarks')
+    parser.add_argument('--api-latency', type=float, default=0.2, help='Injected fake API latency (seconds)')
+    parser.add_argument('--workers', type=int, default=4, help='Evaluator concurrency')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    options = {'repeat': args.repeat, 'api_latency': args.api_latency, 'workers': args.workers}
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.corpus, options)))
+        return
+
+    project_dir = SCRIPTS_DIR.parent
+    output_dir = project_dir / 'results' / 'benchmarks'
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus
+        if not corpus_dir:
+            from generate_corpus import generate_corpus
+            corpus_dir = tmp
+            print(f"Generating {args.count} synthetic petitions (~{args.size} chars)...")
+            generate_corpus(corpus_dir, args.count, args.size, seed=args.seed)
+
+        results = []
+        for name in args.benchmarks.split(','):
+            if name not in BENCHMARKS:
+                print(f"  ✗ Unknown benchmark: {name}")
+                continue
+            print(f"Running {name}...")
+            child = subprocess.run(
+                [sys.executable, __file__, '--child', name, '--corpus', str(corpus_dir),
+                 '--repeat', str(args.repeat), '--api-latency', str(args.api_latency),
+                 '--workers', str(args.workers)],
+                capture_output=True, text=True,
+            )
+            if child.returncode != 0:
+                print(f"  ✗ {name} failed:\n{child.stderr}")
+                continue
+            results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    previous = previous_run(output_dir)
+    print_table(results, previous)
+
+    now = datetime.now()
+    revision = git_revision()
+    run = {
+        'timestamp': now.isoformat(timespec='seconds'),
+        'revision': revision,
+        'config': {'count': args.count, 'size': args.size, 'corpus': args.corpus, **options},
+        'results': results,
+    }
+    output_file = output_dir / f"bench_{now:%Y%m%d_%H%M%S}_{revision}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults saved to: {output_file}")
+
+
+if __name__ == '__main__':
+    main()
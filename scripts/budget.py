@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Cost and deadline budget for evaluation runs
+
+BudgetController prices every API response from response.usage, keeps rolling
+averages of cost and latency per petition, and projects the cost and time of
+the petitions still to evaluate. When a --max-cost or --deadline limit is about
+to be exceeded it steps through, in order:
+
+  1. concurrency: more parallel calls (up to --max-workers) to meet a deadline
+  2. cheaper_model: low-priority petitions go to a cheaper model
+  3. heuristic: low-priority petitions get the local heuristic evaluation
+  4. paused: high-priority petitions wait once one more would cross a limit;
+     low-priority ones still get the heuristic until the deadline passes
+
+Petitions with priority > 0 (queue jobs, or a 'priority' key in
+processed_petitions.json) always keep the main model. Until the first responses
+are priced, costs are estimated from the prompt size, and petitions in flight
+count against --max-cost so concurrent calls cannot overshoot it together. Every
+decision is appended to a JSONL log so runs can be audited afterwards:
+
+    python scripts/evaluator.py --max-cost 5 --deadline 45m
+    python scripts/budget.py results/budget_decisions.jsonl
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+# USD per million tokens: input, output, cache write, cache read
+PRICING = {
+    'claude-sonnet-4-5': (3.00, 15.00, 3.75, 0.30),
+    'claude-haiku-4-5': (1.00, 5.00, 1.25, 0.10),
+}
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
+
+DEFAULT_MODEL = 'claude-sonnet-4-5'
+CHEAPER_MODEL = 'claude-haiku-4-5'
+HEURISTIC = 'heuristic'
+MODES = ('normal', 'cheaper_model', 'heuristic', 'paused')
+BUDGET_LOG_FILE = 'budget_decisions.jsonl'
+
+# Act once projections reach this share of a limit, and only step back to a
+# less degraded mode once they fall below RECOVERY of that, to avoid flapping
+SAFETY = 0.9
+RECOVERY = 0.9
+WINDOW = 20
+# A-priori estimate of one call before any response has been priced
+CHARS_PER_TOKEN = 4
+ESTIMATED_OUTPUT_TOKENS = 1000
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of starting a petition that can no longer run within the limits"""
+
+
+def cost_of(usage, model):
+    """USD cost of one response.usage (object or dict) at the model's prices"""
+    prices = PRICING.get(model, PRICING[DEFAULT_MODEL])
+    get = usage.get if isinstance(usage, dict) else lambda name, default: getattr(usage, name, default)
+    return sum((get(name, 0) or 0) * price for name, price in zip(USAGE_FIELDS, prices)) / 1_000_000
+
+
+def parse_deadline(value, now=None):
+    """'45m', '2h', '90s', '18:30' (next occurrence) or an ISO datetime -> epoch seconds"""
+    now = now or time.time()
+    value = value.strip()
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if value[-1:] in units:
+        try:
+            return now + float(value[:-1]) * units[value[-1]]
+        except ValueError:
+            pass
+    try:
+        clock = datetime.strptime(value, '%H:%M')
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise ValueError(f"Invalid deadline {value!r}, expected e.g. 45m, 2h, 18:30 or 2025-01-31T18:00")
+    current = datetime.fromtimestamp(now)
+    target = current.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    if target <= current:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+
+class ConcurrencyGate:
+    """A semaphore whose limit can be changed while threads wait on it"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def resize(self, limit):
+        with self._condition:
+            self.limit = limit
+            self._condition.notify_all()
+
+
+@dataclass(slots=True, eq=False)
+class Ticket:
+    """One admitted petition: the model it runs on, its estimated cost and the usage it accrued"""
+    controller: 'BudgetController'
+    model: str
+    priority: int
+    started: float
+    estimate: float = 0.0
+    gated: bool = True
+    cost: float = 0.0
+    tokens: list = field(default_factory=lambda: [0] * len(USAGE_FIELDS))
+
+    def add_usage(self, usage, model=None):
+        """on_usage callback for evaluate_petition"""
+        self.controller._add_usage(self, usage, model or self.model)
+
+
+class BudgetController:
+    """Tracks spend and progress of a run and degrades it to stay within its limits"""
+
+    def __init__(self, max_cost=None, deadline=None, workers=4, max_workers=None, model=DEFAULT_MODEL,
+                 cheaper_model=CHEAPER_MODEL, remaining=None, log_path=None, window=WINDOW):
+        self.max_cost = max_cost
+        self.deadline = deadline
+        self.workers = workers
+        self.max_workers = max(workers, max_workers or workers)
+        self.model = model
+        self.cheaper_model = cheaper_model
+        self.gate = ConcurrencyGate(workers)
+        self.mode = 'normal'
+        self.reason = None
+        self.started = time.time()
+        self.spent = 0.0
+        self.tokens = dict.fromkeys(USAGE_FIELDS, 0)
+        self.petitions = dict.fromkeys((model, cheaper_model, HEURISTIC), 0)
+        self.decisions = 0
+        self.in_flight = 0
+        self._expected = [0, 0]
+        self._remaining = remaining
+        self._tickets = set()
+        # model -> (cost, seconds, tokens) of its last finished petitions
+        self._window = window
+        self._recent = {}
+        # a-priori tokens of the last admitted petitions, until responses are priced
+        self._estimates = deque(maxlen=window)
+        self._lock = threading.RLock()
+        self._log = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    # Progress
+
+    def expect(self, high, low):
+        """Petitions still to come, when no remaining() callback was given: (priority > 0, the rest)"""
+        with self._lock:
+            self._expected = [high, low]
+
+    def remaining(self):
+        """(high, low) petitions not yet started"""
+        if self._remaining is not None:
+            return self._remaining()
+        return tuple(self._expected)
+
+    def admit(self, priority=0, prompt_chars=0, calls=1, gated=True):
+        """
+        Wait for a concurrency slot and choose how to evaluate the next petition.
+
+        prompt_chars and calls (samples per petition) estimate its cost until
+        responses have been priced. gated=False skips the slot, for callers
+        whose calls take slots of self.gate themselves (SamplingPolicy).
+        Returns a Ticket whose model is the main model, the cheaper model or
+        HEURISTIC; raises BudgetExhausted when the petition cannot run within
+        the limits.
+        """
+        with self._lock:
+            if prompt_chars:
+                self._estimates.append((prompt_chars / CHARS_PER_TOKEN * calls, ESTIMATED_OUTPUT_TOKENS * calls, 0, 0))
+            self._decide()
+            self._check(priority)
+        if gated:
+            self.gate.acquire()
+        with self._lock:
+            try:
+                self._check(priority)
+                model = self._model_for(priority)
+                if model != HEURISTIC and self._limit_reached(model):
+                    # Low-priority petitions fall back to the free heuristic rather than overshoot
+                    if priority > 0:
+                        raise BudgetExhausted(self._limit_reached(model))
+                    model = HEURISTIC
+            except BudgetExhausted:
+                if gated:
+                    self.gate.release()
+                raise
+            if self._remaining is None:
+                slot = 0 if priority > 0 else 1
+                self._expected[slot] = max(0, self._expected[slot] - 1)
+            self.in_flight += 1
+            ticket = Ticket(self, model, priority, time.time(), estimate=self.cost_per_petition(model) or 0.0,
+                            gated=gated)
+            self._tickets.add(ticket)
+            return ticket
+
+    def _check(self, priority):
+        # Paused stops high-priority petitions; the heuristic runs until the deadline itself
+        deadline_passed = self.deadline is not None and time.time() >= self.deadline
+        if self.mode == 'paused' and (priority > 0 or deadline_passed):
+            raise BudgetExhausted(self.reason)
+
+    def _model_for(self, priority):
+        if priority > 0 or self.mode == 'normal':
+            return self.model
+        if self.mode == 'cheaper_model':
+            return self.cheaper_model
+        return HEURISTIC
+
+    def _add_usage(self, ticket, usage, model):
+        cost = cost_of(usage, model)
+        get = usage.get if isinstance(usage, dict) else lambda name, default: getattr(usage, name, default)
+        with self._lock:
+            ticket.cost += cost
+            self.spent += cost
+            for i, name in enumerate(USAGE_FIELDS):
+                value = get(name, 0) or 0
+                ticket.tokens[i] += value
+                self.tokens[name] += value
+
+    def finish(self, ticket, ok=True):
+        """Release the ticket's slot and update the projections with its cost and latency"""
+        if ticket.gated:
+            self.gate.release()
+        with self._lock:
+            self.in_flight -= 1
+            self._tickets.discard(ticket)
+            self.petitions[ticket.model] = self.petitions.get(ticket.model, 0) + 1
+            if ok and ticket.model != HEURISTIC:
+                recent = self._recent.setdefault(ticket.model, deque(maxlen=self._window))
+                recent.append((ticket.cost, time.time() - ticket.started, tuple(ticket.tokens)))
+            self._decide()
+
+    # Projections
+
+    def _average(self, model, index):
+        values = [item[index] for item in self._recent.get(model, ())]
+        return sum(values) / len(values) if values else None
+
+    def cost_per_petition(self, model):
+        """
+        Rolling average cost of a petition on a model, or None before any data.
+
+        Unseen models are priced from the main model's tokens, and before any
+        response from the prompt-size estimates of the admitted petitions.
+        """
+        if model == HEURISTIC:
+            return 0.0
+        average = self._average(model, 0)
+        if average is None:
+            main = [item[2] for item in self._recent.get(self.model, ())] or list(self._estimates)
+            if not main:
+                return None
+            tokens = {name: sum(t[i] for t in main) / len(main) for i, name in enumerate(USAGE_FIELDS)}
+            average = cost_of(tokens, model)
+        return average
+
+    def seconds_per_petition(self, model):
+        if model == HEURISTIC:
+            return 0.0
+        average = self._average(model, 1)
+        if average is None:
+            average = self._average(self.model, 1)
+        return average
+
+    def _low_model(self, mode):
+        return {'normal': self.model, 'cheaper_model': self.cheaper_model}.get(mode, HEURISTIC)
+
+    def committed(self):
+        """Estimated cost still to come from the petitions in flight"""
+        return sum(max(0.0, ticket.estimate - ticket.cost) for ticket in self._tickets)
+
+    def projected_cost(self, mode):
+        """Spend at the end of the run if the rest ran in this mode, or None before any data"""
+        high, low = self.remaining()
+        main = self.cost_per_petition(self.model)
+        low_cost = self.cost_per_petition(self._low_model(mode))
+        if main is None or low_cost is None:
+            return None
+        return self.spent + self.committed() + high * main + low * low_cost
+
+    def projected_seconds(self, mode, concurrency):
+        """Wall time left for the run in this mode at this concurrency, or None before any data"""
+        high, low = self.remaining()
+        main = self.seconds_per_petition(self.model)
+        low_seconds = self.seconds_per_petition(self._low_model(mode))
+        if main is None or low_seconds is None:
+            return None
+        return ((high + self.in_flight) * main + low * low_seconds) / concurrency
+
+    # Decisions
+
+    def _limit_reached(self, model):
+        """Why one more petition on this model would cross a limit, or None"""
+        cost = self.cost_per_petition(model)
+        if self.max_cost is not None and cost is not None:
+            committed = self.spent + self.committed()
+            if committed + cost > self.max_cost:
+                return (f"${self.spent:.4f} spent and ${committed - self.spent:.4f} in flight; one more petition "
+                        f"would exceed --max-cost ${self.max_cost:g}")
+        seconds = self.seconds_per_petition(model)
+        if self.deadline and seconds is not None and self.deadline - time.time() < seconds:
+            return f"{max(0.0, self.deadline - time.time()):.0f}s left, less than one petition before --deadline"
+        return None
+
+    def _decide(self):
+        now = time.time()
+        time_left = self.deadline - now if self.deadline else None
+        high, low = self.remaining()
+        if not high and not low:
+            return
+
+        if time_left is not None and time_left <= 0:
+            self._set_mode('paused', 'the --deadline has passed')
+            return
+        # The cheapest mode still runs low-priority petitions on the heuristic for free;
+        # only high-priority petitions that cannot fit pause the run
+        limit = self._limit_reached(self.model)
+        if limit:
+            self._set_mode('paused' if high else 'heuristic', limit)
+            return
+
+        for mode in MODES[:-1]:
+            share = SAFETY if MODES.index(mode) >= MODES.index(self.mode) else SAFETY * RECOVERY
+            concurrency = self.gate.limit
+            if time_left is not None:
+                needed = self.projected_seconds(mode, 1)
+                if needed is not None:
+                    concurrency = min(self.max_workers, max(self.workers, math.ceil(needed / (time_left * share))))
+                    if needed / concurrency > time_left * share:
+                        continue
+            if self.max_cost is not None:
+                cost = self.projected_cost(mode)
+                if cost is not None and cost > self.max_cost * share:
+                    continue
+            self._set_concurrency(concurrency)
+            self._set_mode(mode, 'projections back within the limits' if mode == 'normal' else self._pressure(mode))
+            return
+
+        # Nothing fits: degrade as far as possible and let the per-petition limits stop the rest
+        if time_left is not None:
+            self._set_concurrency(self.max_workers)
+        self._set_mode('heuristic', self._pressure('heuristic'))
+
+    def _pressure(self, mode):
+        parts = []
+        if self.max_cost is not None:
+            cost = self.projected_cost('normal')
+            if cost is not None:
+                parts.append(f"projected ${cost:.2f} at full quality vs --max-cost ${self.max_cost:g}")
+        if self.deadline:
+            seconds = self.projected_seconds('normal', self.max_workers)
+            if seconds is not None:
+                parts.append(f"projected {seconds:.0f}s at {self.max_workers} workers vs "
+                             f"{self.deadline - time.time():.0f}s to --deadline")
+        return '; '.join(parts) or mode
+
+    def _set_mode(self, mode, reason):
+        if mode == self.mode:
+            return
+        previous, self.mode, self.reason = self.mode, mode, reason
+        self.log('mode', previous=previous, to=mode, reason=reason)
+
+    def _set_concurrency(self, limit):
+        previous = self.gate.limit
+        if limit == previous:
+            return
+        self.gate.resize(limit)
+        self.log('concurrency', previous=previous, to=limit,
+                 reason='behind the deadline' if limit > previous else 'back on schedule')
+
+    # Audit log
+
+    def snapshot(self):
+        high, low = self.remaining()
+        return {
+            'elapsed_s': round(time.time() - self.started, 3),
+            'spent_usd': round(self.spent, 6),
+            'projected_usd': None if self.projected_cost(self.mode) is None else round(self.projected_cost(self.mode), 6),
+            'time_left_s': None if not self.deadline else round(self.deadline - time.time(), 1),
+            'remaining': {'high': high, 'low': low, 'in_flight': self.in_flight},
+            'committed_usd': round(self.committed(), 6),
+            'concurrency': self.gate.limit,
+            'mode': self.mode,
+            'petitions': dict(self.petitions),
+        }
+
+    def log(self, event, **details):
+        with self._lock:
+            if event in ('mode', 'concurrency'):
+                self.decisions += 1
+            if self._log is None:
+                return
+            record = {'time': datetime.now().isoformat(timespec='seconds'), 'event': event, **details,
+                      **self.snapshot()}
+            self._log.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._log.flush()
+
+    def start(self):
+        self.log('start', max_cost=self.max_cost,
+                 deadline=datetime.fromtimestamp(self.deadline).isoformat(timespec='seconds') if self.deadline else None,
+                 model=self.model, cheaper_model=self.cheaper_model, workers=self.workers,
+                 max_workers=self.max_workers)
+
+    def close(self):
+        self.log('finish', tokens=dict(self.tokens))
+        if self._log:
+            self._log.close()
+
+    def summary(self):
+        used = ', '.join(f"{model}={count}" for model, count in self.petitions.items() if count)
+        return (f"Spent ${self.spent:.4f}" + (f" of ${self.max_cost:g}" if self.max_cost is not None else '')
+                + f" ({used or 'no petitions'}), final mode {self.mode}, {self.decisions} budget decisions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the budget decisions of evaluation runs')
+    parser.add_argument('log', help=f'Decision log (results/{BUDGET_LOG_FILE})')
+    args = parser.parse_args()
+
+    with open(args.log, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            event = record['event']
+            if event == 'start':
+                print(f"\n{record['time']} start: max cost {record['max_cost']}, deadline {record['deadline']}, "
+                      f"{record['workers']}-{record['max_workers']} workers")
+            elif event == 'finish':
+                print(f"{record['time']} finish after {record['elapsed_s']:.0f}s: ${record['spent_usd']:.4f} spent, "
+                      f"petitions {record['petitions']}")
+            else:
+                print(f"{record['time']} {event} {record['previous']} -> {record['to']} "
+                      f"(${record['spent_usd']:.4f} spent, projected {record['projected_usd']}): {record['reason']}")
+
+
+if __name__ == '__main__':
+    main()
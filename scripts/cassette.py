@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Record/replay of Messages API calls for offline runs
+
+A cassette is a gzip-compressed JSONL file with one line per API call: the
+SHA-256 fingerprint of the request arguments, how many times that request had
+already been recorded, and the raw response. With --record, evaluator.py calls
+the real API and appends every response; with --replay, responses are served
+from memory by fingerprint and the SDK is never imported, so parsing,
+aggregation and analysis can be re-run and benchmarked offline and
+deterministically. Repeated identical requests (--samples) get their recorded
+responses back in turn rather than the same one each time.
+
+    python scripts/evaluator.py --record results/run.cassette.gz
+    python scripts/evaluator.py --replay results/run.cassette.gz
+    python scripts/cassette.py info results/run.cassette.gz
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+
+class CassetteMiss(KeyError):
+    """A replayed request was never recorded"""
+
+
+def fingerprint(kwargs):
+    """Stable SHA-256 of the request arguments"""
+    canonical = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _response_dict(response):
+    if hasattr(response, 'to_dict'):
+        return response.to_dict()
+    return response.model_dump(mode='json')
+
+
+def _namespace(value):
+    """Attribute access over a raw response, like the SDK's Message objects"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+
+def load_cassette(path):
+    """fingerprint -> raw response dicts in recording order; a later recording session wins"""
+    responses = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                # Occurrence 0 starts a new session for the request (older cassettes have no field)
+                if record.get('occurrence', 0) == 0:
+                    responses[record['fingerprint']] = []
+                responses.setdefault(record['fingerprint'], []).append(record['response'])
+    return responses
+
+
+class _Messages:
+    def __init__(self, create):
+        self.create = create
+
+
+class RecordingClient:
+    """Wraps a real client and appends each messages.create response to the cassette"""
+
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.recorded = 0
+        self._occurrences = {}
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self.messages = _Messages(self._create)
+
+    def _create(self, **kwargs):
+        response = self._client.messages.create(**kwargs)
+        key = fingerprint(kwargs)
+        record = {
+            'fingerprint': key,
+            'model': kwargs.get('model'),
+            'recorded_at': round(time.time(), 3),
+            'response': _response_dict(response),
+        }
+        with self._lock:
+            record['occurrence'] = self._occurrences.get(key, 0)
+            self._occurrences[key] = record['occurrence'] + 1
+            line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.recorded += 1
+        return response
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class ReplayClient:
+    """
+    Serves messages.create from a cassette; unknown requests raise CassetteMiss.
+
+    The n-th call with a given fingerprint gets the n-th recorded response,
+    wrapping around once they run out.
+    """
+
+    offline = True
+
+    def __init__(self, path):
+        self.path = path
+        self._responses = load_cassette(path)
+        self._objects = {}
+        self._calls = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.messages = _Messages(self._create)
+
+    def __len__(self):
+        return len(self._responses)
+
+    @property
+    def max_occurrences(self):
+        """Most responses recorded for a single request (1 unless recorded with --samples)"""
+        return max((len(responses) for responses in self._responses.values()), default=0)
+
+    def _create(self, **kwargs):
+        key = fingerprint(kwargs)
+        recorded = self._responses.get(key)
+        with self._lock:
+            if recorded is None:
+                self.misses += 1
+                raise CassetteMiss(f"request {key[:12]} not in cassette {self.path}")
+            index = self._calls.get(key, 0)
+            self._calls[key] = index + 1
+            self.hits += 1
+        index %= len(recorded)
+        response = self._objects.get((key, index))
+        if response is None:
+            response = self._objects[(key, index)] = _namespace(recorded[index])
+        return response
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect a recorded API cassette')
+    parser.add_argument('command', choices=['info'])
+    parser.add_argument('cassette')
+    args = parser.parse_args()
+
+    lines = 0
+    by_model = {}
+    tokens = {'input_tokens': 0, 'output_tokens': 0}
+    with gzip.open(args.cassette, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            lines += 1
+            by_model[record.get('model')] = by_model.get(record.get('model'), 0) + 1
+            usage = record['response'].get('usage') or {}
+            for field in tokens:
+                tokens[field] += usage.get(field) or 0
+    unique = len(load_cassette(args.cassette))
+    print(f"{args.cassette}: {lines} recorded calls, {unique} distinct requests")
+    for model, count in sorted(by_model.items(), key=lambda item: -item[1]):
+        print(f"  {model}: {count}")
+    print(f"  tokens: input={tokens['input_tokens']}, output={tokens['output_tokens']}")
+
+
+if __name__ == '__main__':
+    main()
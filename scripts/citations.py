@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Normalized legal citations and a corpus-wide citation index
+
+Citation and precedent entities from the structure index (petition_structure.py)
+are normalized into canonical keys, so "art. 6º, VIII, do CDC",
+"Art. 6, inciso VIII, do Código de Defesa do Consumidor" and
+"art. 6o, VIII da Lei 8.078/90" are all "CDC art. 6, VIII", and
+"Súmula 297/STJ" / "Súmula nº 297 do STJ" are both "SUMULA 297/STJ".
+Precedents of classes judged by a single court carry that court whether or
+not the text names it: "REsp 1199782/PR" and "STJ, REsp 1.199.782/PR" are both
+"STJ REsp 1199782/PR".
+
+data/citation_index.json maps each petition to its citation counts and each
+citation to the petitions citing it. It is rebuilt incrementally: petitions
+whose text_sha256 did not change keep their entry.
+
+    python scripts/citations.py build
+    python scripts/citations.py query "Súmula 479"
+    python scripts/citations.py top -n 20
+"""
+import argparse
+import json
+import os
+import re
+from collections import Counter
+from itertools import product
+from pathlib import Path
+
+from petition_structure import PARSER_VERSION, QUALIFIER_PATTERN, parse_petition
+
+CITATION_INDEX_FILE = 'citation_index.json'
+# Bumped when normalization changes; an index of another version is rebuilt
+INDEX_VERSION = 3
+
+# Canonical names of the codes, by how they are written and by their law number
+CODE_ALIASES = {
+    'cdc': 'CDC', 'código de defesa do consumidor': 'CDC', 'codigo de defesa do consumidor': 'CDC',
+    'cc': 'CC', 'código civil': 'CC', 'codigo civil': 'CC',
+    'cpc': 'CPC', 'código de processo civil': 'CPC', 'codigo de processo civil': 'CPC',
+    'cf': 'CF', 'cf/88': 'CF', 'constituição federal': 'CF', 'constituicao federal': 'CF',
+}
+LAW_NUMBER_ALIASES = {'8078': 'CDC', '10406': 'CC', '13105': 'CPC'}
+# Case classes only one court judges; the court of other classes is left out of the key
+CASE_COURTS = {'REsp': 'STJ', 'AREsp': 'STJ', 'RE': 'STF', 'ARE': 'STF'}
+
+_ORDINAL_MARKS = re.compile(r'(?<=\d)[º°ªo]$')
+_LAW_NUMBER = re.compile(r'Lei\s+(?:Complementar\s+)?(?:n[º°.]*\s*)?(\d[\d.]*\d|\d)(?:/(\d{2,4}))?', re.IGNORECASE)
+_NUMBER_SEPARATOR = re.compile(r'\s*,\s*|\s+e\s+|\s+a\s+')
+_ROMAN = re.compile(r'\b[IVXLC]+\b')
+_CASE_PARTS = re.compile(r'^(?P<kind>.+?)\s+(?:n[º°.]*\s*)?(?P<number>\d.*)$')
+
+# Raw citation text -> canonical keys; petitions repeat the same few citations
+_cache = {}
+
+
+def _number(value):
+    """'1.026º' -> '1026'"""
+    return _ORDINAL_MARKS.sub('', value.strip()).replace('.', '')
+
+
+def _year(value):
+    if value is None:
+        return None
+    if len(value) == 2:
+        return ('19' if int(value) > 30 else '20') + value
+    return value
+
+
+def normalize_law(text):
+    """Canonical name of a code or law ('Lei 8.078/90' -> 'CDC', 'Lei 9.099/95' -> 'LEI 9099/1995')"""
+    text = ' '.join(text.split())
+    alias = CODE_ALIASES.get(text.lower())
+    if alias:
+        return alias
+    match = _LAW_NUMBER.match(text)
+    if not match:
+        return text.upper()
+    number = match.group(1).replace('.', '')
+    if number in LAW_NUMBER_ALIASES:
+        return LAW_NUMBER_ALIASES[number]
+    year = _year(match.group(2))
+    return f"LEI {number}" + (f"/{year}" if year else '')
+
+
+def _qualifiers(value):
+    """Canonical forms of one qualifier; "incisos III e VIII" gives one per inciso"""
+    value = ' '.join(value.split())
+    lowered = value.lower()
+    if value.startswith('§'):
+        return ['§ ' + _number(value[1:])]
+    if lowered.startswith('parágrafo') or lowered.startswith('paragrafo'):
+        return ['par. único']
+    if lowered.startswith('inciso'):
+        return _ROMAN.findall(value)
+    if lowered.startswith('alínea') or lowered.startswith('alinea'):
+        return [value.split()[-1].strip('"“”').lower()]
+    return [value]
+
+
+def _article_numbers(value):
+    parts = _NUMBER_SEPARATOR.split(value)
+    numbers = [_number(part) for part in parts if part.strip()]
+    # "arts. 186 a 188" is a range
+    if ' a ' in value and len(numbers) == 2 and numbers[0].isdigit() and numbers[1].isdigit():
+        first, last = int(numbers[0]), int(numbers[1])
+        if 0 < last - first <= 20:
+            return [str(n) for n in range(first, last + 1)]
+    return numbers
+
+
+def _normalize(attrs):
+    kind = attrs.get('type')
+    if kind == 'article':
+        law = normalize_law(attrs['art_law']) if attrs.get('art_law') else None
+        numbers = _article_numbers(attrs['art_num'])
+        if len(numbers) != 1:
+            return [f"{law + ' ' if law else ''}art. {number}" for number in numbers]
+        qualifiers = [_qualifiers(q) for q in QUALIFIER_PATTERN.findall(attrs.get('art_qual', ''))]
+        return [f"{law + ' ' if law else ''}art. {numbers[0]}" + ''.join(f", {q}" for q in chain)
+                for chain in product(*qualifiers)]
+    if kind == 'sumula':
+        if not attrs.get('sum_num'):
+            return []
+        vinculante = bool(attrs.get('sum_vinc'))
+        court = (attrs.get('sum_court') or ('STF' if vinculante else '')).upper()
+        return [f"SUMULA {'VINCULANTE ' if vinculante else ''}{attrs['sum_num']}" + (f"/{court}" if court else '')]
+    if kind == 'law':
+        return [normalize_law(f"Lei {attrs['law_num']}" + (f"/{attrs['law_year']}" if attrs.get('law_year') else ''))]
+    if kind in ('court', 'case') and attrs.get('case'):
+        match = _CASE_PARTS.match(' '.join(attrs['case'].split()))
+        if not match:
+            return []
+        case_kind, number = match.group('kind'), match.group('number')
+        # Superior court numbers are written with and without thousands separators
+        if not case_kind.lower().startswith('apela'):
+            number = number.replace('.', '')
+        # "AgInt no REsp" is judged by the court of the REsp
+        court = CASE_COURTS.get(case_kind.split()[-1])
+        return [f"{court + ' ' if court else ''}{case_kind} {number}"]
+    return []
+
+
+def normalize_entity(entity):
+    """Canonical keys of a citation/precedent Entity (empty for other kinds)"""
+    if entity.kind not in ('citation', 'precedent'):
+        return []
+    cache_key = (entity.attrs.get('type'), entity.text)
+    keys = _cache.get(cache_key)
+    if keys is None:
+        keys = _cache[cache_key] = _normalize(entity.attrs)
+    return keys
+
+
+def citation_counts(index):
+    """Counter of canonical citation keys for one PetitionIndex"""
+    counts = Counter()
+    for entity in index.entities:
+        counts.update(normalize_entity(entity))
+    return counts
+
+
+def normalize_query(text):
+    """Canonical keys mentioned in a free-form query such as 'Súmula 479' or 'art. 14 do CDC'"""
+    keys = []
+    for entity in parse_petition(text).entities:
+        keys.extend(normalize_entity(entity))
+    return keys
+
+
+class CitationIndex:
+    """Inverted index citation key -> request_ids, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.petitions = {}   # request_id -> {'text_sha256', 'citations': {key: count}}
+        self.citations = {}   # key -> set of request_ids
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Keys from other parser or normalization rules would never match the new ones
+            if data.get('version') != [PARSER_VERSION, INDEX_VERSION]:
+                data['petitions'] = {}
+            for request_id, entry in data['petitions'].items():
+                self.update(int(request_id), entry['text_sha256'], entry['citations'])
+
+    def is_current(self, request_id, text_sha256):
+        entry = self.petitions.get(request_id)
+        return entry is not None and text_sha256 is not None and entry['text_sha256'] == text_sha256
+
+    def update(self, request_id, text_sha256, counts):
+        self.remove(request_id)
+        self.petitions[request_id] = {'text_sha256': text_sha256, 'citations': dict(counts)}
+        for key in counts:
+            self.citations.setdefault(key, set()).add(request_id)
+
+    def remove(self, request_id):
+        entry = self.petitions.pop(request_id, None)
+        if entry is None:
+            return
+        for key in entry['citations']:
+            citing = self.citations.get(key)
+            if citing is not None:
+                citing.discard(request_id)
+                if not citing:
+                    del self.citations[key]
+
+    def retain(self, request_ids):
+        """Drop petitions no longer in the corpus"""
+        for request_id in set(self.petitions) - set(request_ids):
+            self.remove(request_id)
+
+    def petitions_citing(self, key):
+        return sorted(self.citations.get(key, ()))
+
+    def lookup(self, query):
+        """key -> request_ids for every indexed key matching the query
+
+        A query without a law or court ("Súmula 479", "art. 14") matches every
+        indexed key it is a prefix of; text that does not parse as a citation
+        is matched case-insensitively against the keys.
+        """
+        matches = {}
+        patterns = [re.compile(r'(?:^|\s)' + re.escape(key) + r'(?:$|[/,])') for key in normalize_query(query)]
+        for key in self.citations:
+            if any(pattern.search(key) for pattern in patterns):
+                matches[key] = self.petitions_citing(key)
+        if not patterns:
+            needle = query.lower()
+            for key in self.citations:
+                if needle in key.lower():
+                    matches[key] = self.petitions_citing(key)
+        return matches
+
+    def most_cited(self, n=20):
+        """(key, petitions citing it, total citations) for the n most widespread keys"""
+        totals = Counter()
+        for entry in self.petitions.values():
+            totals.update(entry['citations'])
+        ranked = sorted(self.citations, key=lambda key: (-len(self.citations[key]), -totals[key], key))
+        return [(key, len(self.citations[key]), totals[key]) for key in ranked[:n]]
+
+    def save(self):
+        data = {
+            'version': [PARSER_VERSION, INDEX_VERSION],
+            'petitions': {str(request_id): entry for request_id, entry in sorted(self.petitions.items())},
+            'citations': {key: sorted(ids) for key, ids in sorted(self.citations.items())},
+        }
+        tmp = self.path.with_suffix('.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def update_citation_index(path, petitions, get_index):
+    """Refresh the index at path for the given PetitionRecords.
+
+    get_index(petition) returns the petition's PetitionIndex and is only called
+    for petitions whose text_sha256 is new or changed. Returns (index, updated).
+    """
+    citation_index = CitationIndex(path)
+    citation_index.retain(p.request_id for p in petitions)
+    updated = 0
+    for petition in petitions:
+        text_sha256 = petition.text_sha256 if isinstance(petition.text_sha256, str) else None
+        if citation_index.is_current(petition.request_id, text_sha256):
+            continue
+        citation_index.update(petition.request_id, text_sha256, citation_counts(get_index(petition)))
+        updated += 1
+    citation_index.save()
+    return citation_index, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the corpus citation index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help='Index the citations of every processed petition')
+    query_parser = subparsers.add_parser('query', help='Petitions citing a reference')
+    query_parser.add_argument('citation', help='e.g. "Súmula 479" or "art. 14 do CDC"')
+    top_parser = subparsers.add_parser('top', help='Most cited references')
+    top_parser.add_argument('-n', type=int, default=20)
+    args = parser.parse_args()
+
+    project_dir = Path(__file__).parent.parent
+    data_dir = project_dir / 'data'
+    index_path = data_dir / CITATION_INDEX_FILE
+
+    if args.command == 'build':
+        from corpus import open_corpus, read_petition_text
+        from petition_structure import load_structure_index, lookup_index
+        from records import PetitionRecord
+
+        petitions_dir = project_dir / 'petitions'
+        with open(data_dir / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+            petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
+        corpus = open_corpus(petitions_dir)
+        structure_index = load_structure_index(petitions_dir)
+
+        def get_index(petition):
+            return lookup_index(structure_index, petition) or \
+                parse_petition(read_petition_text(petition, petitions_dir, corpus))
+
+        citation_index, updated = update_citation_index(index_path, petitions, get_index)
+        print(f"Indexed {len(citation_index.citations)} distinct citations across {len(citation_index.petitions)} "
+              f"petitions ({updated} re-indexed) into {index_path}")
+        return
+
+    if not index_path.exists():
+        parser.error(f"{index_path} not found; run 'citations.py build' first")
+    citation_index = CitationIndex(index_path)
+
+    if args.command == 'query':
+        matches = citation_index.lookup(args.citation)
+        if not matches:
+            print(f"No petitions cite {args.citation!r}")
+        for key, request_ids in sorted(matches.items()):
+            print(f"{key}: {len(request_ids)} petitions")
+            print("  " + ', '.join(str(request_id) for request_id in request_ids))
+        return
+
+    print(f"{'citation':<40} {'petitions':>9} {'citations':>9}")
+    for key, petitions, total in citation_index.most_cited(args.n):
+        print(f"{key:<40} {petitions:>9} {total:>9}")
+
+
+if __name__ == '__main__':
+    main()
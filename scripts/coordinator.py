@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Coordinator for sharded evaluation runs
+
+`launch` starts one evaluator.py --shard i/N process per shard on this host,
+each with its own log and, when ANTHROPIC_API_KEYS lists several keys, its own
+API key. `merge` combines the shard journals into all_evaluations.json,
+failed_evaluations.json and calibration_summary.json. To spread a run across
+hosts, run `evaluator.py --shard i/N --journal-dir <shared dir>` on each host
+and `coordinator.py merge --journal-dir <shared dir>` on any of them.
+
+    python scripts/coordinator.py launch --shards 4 --workers 2
+    python scripts/coordinator.py status
+    python scripts/coordinator.py merge
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from analyze_results import calibration_summary
+from records import EvaluationEntry, PetitionRecord
+from sharding import find_journals, is_current, journal_path, read_journal, shard_for
+
+SCRIPTS_DIR = Path(__file__).parent
+
+
+def load_petitions(data_dir):
+    with open(Path(data_dir) / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+        return [PetitionRecord.from_dict(p) for p in json.load(f)]
+
+
+def resolve_shard_count(journal_dir, count):
+    """The shard count to merge: the one given, or the only one present in journal_dir"""
+    journals = find_journals(journal_dir, count)
+    if count is not None:
+        return count
+    if not journals:
+        raise SystemExit(f"No shard journals found in {journal_dir}")
+    if len(journals) > 1:
+        raise SystemExit(f"Journals for several shard counts {sorted(journals)} in {journal_dir}; pass --shards")
+    return next(iter(journals))
+
+
+def collect(journal_dir, count, petitions):
+    """
+    Merge the shard journals: (entries, failed, missing) in processed_petitions.json order.
+
+    Records made from an older text of a petition are stale and count as missing.
+    """
+    records = {}
+    for index in range(count):
+        path = journal_path(journal_dir, index, count)
+        if path.exists():
+            records.update(read_journal(path))
+
+    entries, failed, missing = [], [], []
+    for petition in petitions:
+        record = records.get(petition.request_id)
+        if record is None or not is_current(record, petition):
+            missing.append(petition.request_id)
+        elif record['status'] == 'ok':
+            entry = EvaluationEntry.from_dict(record['entry'])
+            entry.petition = petition
+            entries.append(entry)
+        else:
+            failed.append({'request_id': petition.request_id, 'rating': petition.rating, 'error': record.get('error')})
+    return entries, failed, missing
+
+
+def merge(project_dir, journal_dir, count):
+    results_dir = project_dir / 'results'
+    petitions = load_petitions(project_dir / 'data')
+    count = resolve_shard_count(journal_dir, count)
+    entries, failed, missing = collect(journal_dir, count, petitions)
+
+    with open(results_dir / 'all_evaluations.json', 'w', encoding='utf-8') as f:
+        json.dump([e.to_dict() for e in entries], f, indent=2, ensure_ascii=False)
+
+    failed_file = results_dir / 'failed_evaluations.json'
+    if failed:
+        with open(failed_file, 'w', encoding='utf-8') as f:
+            json.dump(failed, f, indent=2, ensure_ascii=False)
+    elif failed_file.exists():
+        failed_file.unlink()
+
+    if entries:
+        with open(results_dir / 'calibration_summary.json', 'w', encoding='utf-8') as f:
+            json.dump(calibration_summary(entries), f, indent=2, ensure_ascii=False)
+
+    print(f"Merged {count} shards: {len(entries)} evaluations, {len(failed)} failed, {len(missing)} not yet evaluated")
+    if missing:
+        print("  Missing request_ids: " + ', '.join(str(request_id) for request_id in missing[:20])
+              + (' ...' if len(missing) > 20 else ''))
+    print(f"Results saved to: {results_dir}")
+
+
+def status(project_dir, journal_dir, count):
+    petitions = load_petitions(project_dir / 'data')
+    count = resolve_shard_count(journal_dir, count)
+    print(f"{'shard':<8} {'petitions':>9} {'done':>6} {'failed':>7} {'pending':>8}")
+    for index in range(count):
+        assigned = [p for p in petitions if shard_for(p.request_id, count) == index]
+        path = journal_path(journal_dir, index, count)
+        records = read_journal(path) if path.exists() else {}
+        current = [records[p.request_id] for p in assigned if p.request_id in records
+                   and is_current(records[p.request_id], p)]
+        done = sum(1 for record in current if record['status'] == 'ok')
+        failed = sum(1 for record in current if record['status'] == 'failed')
+        print(f"{f'{index}/{count}':<8} {len(assigned):>9} {done:>6} {failed:>7} {len(assigned) - done - failed:>8}")
+
+
+def launch(project_dir, journal_dir, count, workers, evaluator_args):
+    logs_dir = Path(journal_dir)
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    # ANTHROPIC_API_KEYS="key1,key2" gives shards their own keys, round-robin
+    keys = [key for key in os.environ.get('ANTHROPIC_API_KEYS', '').split(',') if key]
+
+    processes = []
+    for index in range(count):
+        env = dict(os.environ)
+        if keys and f'ANTHROPIC_API_KEY_SHARD_{index}' not in env:
+            env[f'ANTHROPIC_API_KEY_SHARD_{index}'] = keys[index % len(keys)]
+        log_path = logs_dir / f'shard-{index}-of-{count}.log'
+        log = open(log_path, 'w', encoding='utf-8')
+        command = [sys.executable, str(SCRIPTS_DIR / 'evaluator.py'), '--shard', f'{index}/{count}',
+                   '--journal-dir', str(journal_dir), '--workers', str(workers), *evaluator_args]
+        processes.append((index, subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env), log, log_path))
+        print(f"Started shard {index}/{count} (pid {processes[-1][1].pid}), log {log_path}")
+
+    started = time.time()
+    exit_codes = {}
+    for index, process, log, log_path in processes:
+        exit_codes[index] = process.wait()
+        log.close()
+        marker = '✓' if exit_codes[index] == 0 else f'✗ exit {exit_codes[index]}, see {log_path}'
+        print(f"  Shard {index}/{count} finished {marker}")
+    print(f"All shards finished in {time.time() - started:.1f}s")
+
+    merge(project_dir, journal_dir, count)
+    return 0 if all(code == 0 for code in exit_codes.values()) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Launch and merge sharded evaluation runs')
+    parser.add_argument('command', choices=['launch', 'merge', 'status'])
+    parser.add_argument('--shards', type=int, help='Number of shards (launch: required; merge/status: auto-detected)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent API calls per shard')
+    parser.add_argument('--journal-dir', help='Shard journal directory, shared between hosts (default: results/shards)')
+    parser.epilog = 'Options after -- are passed to every evaluator.py shard, e.g. -- --exemplars 4'
+    argv = sys.argv[1:]
+    evaluator_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, evaluator_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    project_dir = SCRIPTS_DIR.parent
+    journal_dir = Path(args.journal_dir) if args.journal_dir else project_dir / 'results' / 'shards'
+    (project_dir / 'results').mkdir(exist_ok=True)
+
+    if args.command == 'launch':
+        if not args.shards:
+            parser.error('launch requires --shards')
+        sys.exit(launch(project_dir, journal_dir, args.shards, args.workers, evaluator_args))
+    elif args.command == 'merge':
+        merge(project_dir, journal_dir, args.shards)
+    else:
+        status(project_dir, journal_dir, args.shards)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Packed petition text corpus with an offset index
+
+All extracted texts are concatenated into one UTF-8 blob (petitions/corpus.bin)
+with a binary index (petitions/corpus.idx) of (request_id, offset, length)
+records. Readers mmap the blob and slice it without copying, replacing one
+open/stat per petition with a single mapping. The loose petitions/*.txt layout
+remains the fallback for petitions missing from the corpus.
+
+    python scripts/corpus.py build    # pack the texts listed in processed_petitions.json
+"""
+import argparse
+import json
+import mmap
+import os
+from array import array
+from pathlib import Path
+
+CORPUS_FILE = 'corpus.bin'
+INDEX_FILE = 'corpus.idx'
+INDEX_MAGIC = b'PETIDX01'
+
+
+class CorpusWriter:
+    """Streams texts into a new corpus, replacing the old one atomically on close"""
+
+    def __init__(self, petitions_dir):
+        self.petitions_dir = Path(petitions_dir)
+        self._blob_tmp = self.petitions_dir / (CORPUS_FILE + '.tmp')
+        self._index_tmp = self.petitions_dir / (INDEX_FILE + '.tmp')
+        self._blob = open(self._blob_tmp, 'wb')
+        self._index = array('q')
+        self._seen = set()
+        self._offset = 0
+
+    def add(self, request_id, text):
+        if request_id in self._seen:
+            raise ValueError(f"Duplicate request_id {request_id} in corpus")
+        data = text.encode('utf-8')
+        self._blob.write(data)
+        self._index.extend((request_id, self._offset, len(data)))
+        self._seen.add(request_id)
+        self._offset += len(data)
+
+    def close(self):
+        self._blob.close()
+        with open(self._index_tmp, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            self._index.tofile(f)
+        # Blob first: an index never points past the end of its blob
+        os.replace(self._blob_tmp, self.petitions_dir / CORPUS_FILE)
+        os.replace(self._index_tmp, self.petitions_dir / INDEX_FILE)
+        return len(self._seen)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._blob.close()
+            for path in (self._blob_tmp, self._index_tmp):
+                if path.exists():
+                    path.unlink()
+
+
+class PetitionCorpus:
+    """Read-only, memory-mapped view of a packed corpus"""
+
+    def __init__(self, petitions_dir):
+        petitions_dir = Path(petitions_dir)
+        with open(petitions_dir / INDEX_FILE, 'rb') as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{INDEX_FILE} is not a petition corpus index")
+            records = array('q')
+            records.frombytes(f.read())
+
+        self.index = {
+            records[i]: (records[i + 1], records[i + 2])
+            for i in range(0, len(records), 3)
+        }
+        self._file = open(petitions_dir / CORPUS_FILE, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses empty files; an empty corpus simply has no entries
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b'')
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, request_id):
+        return request_id in self.index
+
+    def get_bytes(self, request_id):
+        """Zero-copy memoryview of a petition's UTF-8 text"""
+        offset, length = self.index[request_id]
+        return self._view[offset:offset + length]
+
+    def get_text(self, request_id):
+        return str(self.get_bytes(request_id), 'utf-8')
+
+    def close(self):
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_corpus(petitions_dir):
+    """Open the packed corpus if present, else return None (loose files only)"""
+    petitions_dir = Path(petitions_dir)
+    if not (petitions_dir / INDEX_FILE).exists() or not (petitions_dir / CORPUS_FILE).exists():
+        return None
+    return PetitionCorpus(petitions_dir)
+
+
+def read_petition_text(petition, petitions_dir, corpus=None):
+    """Petition text from the packed corpus, falling back to its loose .txt file"""
+    if corpus is not None and petition.request_id in corpus:
+        return corpus.get_text(petition.request_id)
+    with open(Path(petitions_dir) / petition.txt_file, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the packed petition corpus')
+    parser.add_argument('command', choices=['build', 'info'])
+    args = parser.parse_args()
+
+    project_dir = Path(__file__).parent.parent
+    petitions_dir = project_dir / 'petitions'
+
+    if args.command == 'build':
+        with open(project_dir / 'data' / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+            petitions = json.load(f)
+        with CorpusWriter(petitions_dir) as writer:
+            for petition in petitions:
+                with open(petitions_dir / petition['txt_file'], 'r', encoding='utf-8') as f:
+                    writer.add(petition['request_id'], f.read())
+        print(f"Packed {len(petitions)} petitions into {petitions_dir / CORPUS_FILE}")
+        return
+
+    corpus = open_corpus(petitions_dir)
+    if corpus is None:
+        print("No packed corpus found")
+        return
+    with corpus:
+        total = sum(length for _, length in corpus.index.values())
+        print(f"{len(corpus)} petitions, {total} bytes in {petitions_dir / CORPUS_FILE}")
+
+
+if __name__ == '__main__':
+    main()
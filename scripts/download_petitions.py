@@ -2,21 +2,18 @@
 """
 Download DOCX files and extract text from petitions
 """
+import argparse
 import json
-import requests
 from pathlib import Path
 from docx import Document
 import time
 
-def download_file(url, output_path):
-    """Download a file from URL"""
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
-    
-    with open(output_path, 'wb') as f:
-        f.write(response.content)
-    
-    return True
+from citations import CITATION_INDEX_FILE, update_citation_index
+from corpus import CORPUS_FILE, CorpusWriter
+from instrumentation import add_tracing_args, configure_tracer
+from manifest import CHANGED, MANIFEST_FILE, NEW, Manifest, fetch_document, sha256_text
+from petition_structure import PARSER_VERSION, STRUCTURE_INDEX_FILE, parse_petition, save_structure_index
+from records import PetitionRecord
 
 def extract_text_from_docx(docx_path):
     """Extract text from DOCX file"""
@@ -41,6 +38,11 @@ def extract_text_from_docx(docx_path):
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description='Download DOCX files and extract petition text')
+    add_tracing_args(parser)
+    args = parser.parse_args()
+    tracer = configure_tracer('download_petitions', args.trace, args.prometheus)
+    
     project_dir = Path(__file__).parent.parent
     data_dir = project_dir / 'data'
     petitions_dir = project_dir / 'petitions'
@@ -53,6 +55,15 @@ def main():
     
     print(f"Processing {len(petitions)} petitions...")
     
+    # Validators and hashes from previous runs drive conditional downloads
+    manifest = Manifest(data_dir / MANIFEST_FILE)
+    stats = {'downloaded': 0, 'not_modified': 0, 'unchanged': 0, 'text_changed': 0}
+    
+    # Texts are also packed into one mmap-able corpus for the evaluators
+    corpus_writer = CorpusWriter(petitions_dir)
+    structure_index = {}
+    parsed = {}
+    
     results = []
     for i, petition in enumerate(petitions, 1):
         request_id = petition['request_id']
@@ -64,35 +75,69 @@ def main():
         # Download DOCX
         docx_filename = f"{request_id}_rating{rating}.docx"
         docx_path = petitions_dir / docx_filename
+        txt_filename = f"{request_id}_rating{rating}.txt"
+        txt_path = petitions_dir / txt_filename
+        entry = manifest.get(request_id)
         
         try:
-            if not docx_path.exists():
-                print(f"  Downloading from {url}...")
-                download_file(url, docx_path)
-                time.sleep(0.5)  # Be polite to the server
+            # A changed rating only renames the files; the document is the same
+            if entry and entry.get('rating') != rating:
+                for old_name, new_path in ((entry.get('docx_file'), docx_path), (entry.get('txt_file'), txt_path)):
+                    old_path = petitions_dir / old_name if old_name else None
+                    if old_path and old_path.exists() and not new_path.exists():
+                        old_path.rename(new_path)
+                        print(f"  Renamed {old_name} -> {new_path.name} (rating changed)")
+            
+            if entry and docx_path.exists():
+                print(f"  Checking for updates...")
             else:
-                print(f"  File already exists: {docx_filename}")
+                print(f"  Downloading from {url}...")
+            with tracer.span('download', request_id):
+                status, fields = fetch_document(url, docx_path, entry)
             
-            # Extract text
-            txt_filename = f"{request_id}_rating{rating}.txt"
-            txt_path = petitions_dir / txt_filename
+            if status in (NEW, CHANGED):
+                print(f"  ✓ Downloaded {docx_filename} ({fields['content_length']} bytes, {status})")
+                stats['downloaded'] += 1
+                with tracer.span('sleep', request_id):
+                    time.sleep(0.5)  # Be polite to the server
+            else:
+                print(f"  Document unchanged ({status.replace('_', ' ')})")
+                stats[status] += 1
             
-            if not txt_path.exists():
+            # Extract text only when the document content changed
+            content_changed = status in (NEW, CHANGED)
+            if content_changed or not txt_path.exists():
                 print(f"  Extracting text...")
-                text = extract_text_from_docx(docx_path)
+                with tracer.span('extract', request_id):
+                    text = extract_text_from_docx(docx_path)
                 
                 if text:
-                    with open(txt_path, 'w', encoding='utf-8') as f:
-                        f.write(text)
+                    with tracer.span('write_text', request_id):
+                        with open(txt_path, 'w', encoding='utf-8') as f:
+                            f.write(text)
+                    text_sha256 = sha256_text(text)
+                    if entry and entry.get('text_sha256') not in (None, text_sha256):
+                        stats['text_changed'] += 1
                     print(f"  ✓ Saved to {txt_filename} ({len(text)} chars)")
                 else:
                     print(f"  ✗ Failed to extract text")
                     continue
             else:
                 print(f"  Text file already exists: {txt_filename}")
-                with open(txt_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
+                with tracer.span('read_text', request_id):
+                    with open(txt_path, 'r', encoding='utf-8') as f:
+                        text = f.read()
+                text_sha256 = (entry or {}).get('text_sha256') or sha256_text(text)
+            
+            # Recorded only once the text is extracted, so a failed extraction is retried next run
+            entry = manifest.update(request_id, rating=rating, docx_file=docx_filename, txt_file=txt_filename,
+                                    text_sha256=text_sha256, **fields)
             
+            corpus_writer.add(request_id, text)
+            with tracer.span('parse_structure', request_id):
+                parsed[request_id] = parse_petition(text)
+                structure_index[request_id] = {'text_sha256': entry['text_sha256'], 'parser_version': PARSER_VERSION,
+                                               'index': parsed[request_id].to_dict()}
             results.append({
                 'request_id': request_id,
                 'rating': rating,
@@ -101,21 +146,39 @@ def main():
                 'text_length': len(text),
                 'url': url,
                 'remark': petition.get('remark'),
-                'rating_text': petition.get('rating_text')
+                'rating_text': petition.get('rating_text'),
+                'text_sha256': entry['text_sha256']
             })
             
         except Exception as e:
             print(f"  ✗ Error: {e}")
             continue
     
+    with tracer.span('pack_corpus'):
+        corpus_writer.close()
+    save_structure_index(petitions_dir, structure_index)
+    manifest.save()
+    
     # Save processing results
     results_file = data_dir / 'processed_petitions.json'
     with open(results_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     
+    # Citations of new or changed texts go into the corpus-wide inverted index
+    with tracer.span('index_citations'):
+        citation_index, reindexed = update_citation_index(
+            data_dir / CITATION_INDEX_FILE, [PetitionRecord.from_dict(r) for r in results],
+            lambda petition: parsed[petition.request_id])
+    
     print(f"\n{'='*60}")
     print(f"Successfully processed {len(results)} out of {len(petitions)} petitions")
+    print(f"Downloaded {stats['downloaded']}, not modified {stats['not_modified']}, "
+          f"same content {stats['unchanged']}, text changed {stats['text_changed']}")
     print(f"Results saved to: {results_file}")
+    print(f"Packed corpus saved to: {petitions_dir / CORPUS_FILE}")
+    print(f"Structure index saved to: {petitions_dir / STRUCTURE_INDEX_FILE}")
+    print(f"Citation index saved to: {data_dir / CITATION_INDEX_FILE} "
+          f"({len(citation_index.citations)} distinct citations, {reindexed} petitions re-indexed)")
     
     # Summary by rating
     from collections import Counter
@@ -124,6 +187,8 @@ def main():
     for rating in sorted(rating_counts.keys(), reverse=True):
         avg_length = sum(r['text_length'] for r in results if r['rating'] == rating) / rating_counts[rating]
         print(f"  Rating {rating}: {rating_counts[rating]} petitions (avg {avg_length:.0f} chars)")
+    
+    tracer.close()
 
 if __name__ == '__main__':
     main()
@@ -1,27 +1,19 @@
 #!/usr/bin/env python3
 """
 Single petition evaluator - can be called with API key as argument
+
+When an evaluation daemon (evaluation_daemon.py) is listening, the petition is
+sent to it and this script stays a thin client that never imports the SDK.
+Otherwise the petition is evaluated in-process.
 """
 import sys
 import json
 import os
+import socket
 
-# Try to get API key from argument, environment, or stdin
-if len(sys.argv) > 2:
-    api_key = sys.argv[2]
-    os.environ['ANTHROPIC_API_KEY'] = api_key
-elif 'ANTHROPIC_API_KEY' not in os.environ:
-    print("ERROR: ANTHROPIC_API_KEY not provided", file=sys.stderr)
-    print("Usage: python evaluate_single.py <petition_file> [api_key]", file=sys.stderr)
-    sys.exit(1)
-
-from anthropic import Anthropic
+DEFAULT_SOCKET_PATH = os.environ.get('PETITION_EVALUATOR_SOCKET', '/tmp/petition-evaluator.sock')
 
-def evaluate_petition(text):
-    """Evaluate a single petition"""
-    client = Anthropic()
-    
-    prompt = f"""Você é um avaliador de petições jurídicas de Direito do Consumidor.
+QUICK_PROMPT = """Você é um avaliador de petições jurídicas de Direito do Consumidor.
 
 Avalie a petição abaixo usando estes critérios (0-100 total):
 - Estrutura (0-20): elementos obrigatórios, organização
@@ -48,40 +40,86 @@ Retorne JSON:
 }}
 
 PETIÇÃO:
-{text[:15000]}
+{text}
 """
-    
-    response = client.messages.create(
+
+def evaluate_petition(text):
+    """Evaluate a single petition"""
+    from anthropic_client import get_client, get_default_policy
+    from evaluator import parse_evaluation_response
+
+    prompt = QUICK_PROMPT.format(text=text[:15000])
+
+    response = get_default_policy().call(
+        get_client().messages.create,
         model="claude-sonnet-4-5",
         max_tokens=2000,
         temperature=0.3,
         messages=[{"role": "user", "content": prompt}]
     )
-    
-    result_text = response.content[0].text.strip()
-    
-    # Extract JSON
-    if result_text.startswith('```'):
-        result_text = result_text.split('```')[1]
-        if result_text.startswith('json'):
-            result_text = result_text[4:]
-        result_text = result_text.strip()
-    
-    return json.loads(result_text)
 
-if __name__ == '__main__':
+    return parse_evaluation_response(response.content[0].text)
+
+def request_daemon(payload, socket_path=DEFAULT_SOCKET_PATH, timeout=600):
+    """Send a request to the evaluation daemon; returns None if no daemon is listening"""
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError, AttributeError):
+        return None
+
+    # The daemon took the request and may already be paying for it, so a timeout,
+    # dropped connection or garbled reply is an error rather than a cue to evaluate again
+    try:
+        with sock:
+            sock.sendall(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        reply = json.loads(b''.join(chunks))
+    except (OSError, ValueError) as e:
+        return {'ok': False, 'error': f"evaluation daemon at {socket_path} failed ({type(e).__name__}: {e})"}
+    if not isinstance(reply, dict):
+        return {'ok': False, 'error': f"evaluation daemon at {socket_path} sent an invalid reply"}
+    return reply
+
+def main():
     if len(sys.argv) < 2:
         print("Usage: python evaluate_single.py <petition_file> [api_key]")
         sys.exit(1)
-    
-    petition_file = sys.argv[1]
-    
+
+    petition_file = os.path.abspath(sys.argv[1])
+
+    reply = request_daemon({'file': petition_file})
+    if reply is not None:
+        if not reply.get('ok'):
+            print(f"ERROR: {reply.get('error')}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(reply['evaluation'], indent=2, ensure_ascii=False))
+        return
+
+    # No daemon running: evaluate in-process.
+    # Try to get API key from argument or environment
+    if len(sys.argv) > 2:
+        os.environ['ANTHROPIC_API_KEY'] = sys.argv[2]
+    elif 'ANTHROPIC_API_KEY' not in os.environ:
+        print("ERROR: ANTHROPIC_API_KEY not provided", file=sys.stderr)
+        print("Usage: python evaluate_single.py <petition_file> [api_key]", file=sys.stderr)
+        sys.exit(1)
+
     with open(petition_file, 'r', encoding='utf-8') as f:
         text = f.read()
-    
+
     try:
         result = evaluate_petition(text)
         print(json.dumps(result, indent=2, ensure_ascii=False))
     except Exception as e:
         print(f"ERROR: {e}", file=sys.stderr)
         sys.exit(1)
+
+if __name__ == '__main__':
+    main()
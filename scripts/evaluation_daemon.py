@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Long-lived evaluation daemon on a local Unix socket
+
+Keeps the Anthropic SDK imported and one pooled client warm so interactive
+callers (evaluate_single.py) skip the cold start on every petition.
+
+Protocol: one JSON request per connection, terminated by a newline:
+    {"file": "/abs/path/petition.txt"}  or  {"text": "..."}
+    optional "prompt": "quick" (default, same as evaluate_single.py) or "full" (evaluator.py)
+Reply: {"ok": true, "evaluation": {...}, "elapsed": 3.2} or {"ok": false, "error": "..."}
+"""
+import argparse
+import json
+import os
+import socketserver
+import time
+
+from anthropic_client import get_client, get_default_policy
+from evaluate_single import DEFAULT_SOCKET_PATH, evaluate_petition as evaluate_quick
+from evaluator import evaluate_petition as evaluate_full
+
+
+def handle_request(request):
+    """Evaluate one decoded request and return the reply dict"""
+    if 'text' in request:
+        text = request['text']
+    elif 'file' in request:
+        with open(request['file'], 'r', encoding='utf-8') as f:
+            text = f.read()
+    else:
+        return {'ok': False, 'error': "Request needs 'file' or 'text'"}
+
+    prompt = request.get('prompt', 'quick')
+    if prompt == 'quick':
+        evaluation = evaluate_quick(text)
+    elif prompt == 'full':
+        evaluation = evaluate_full(text)
+        if evaluation is None:
+            return {'ok': False, 'error': 'Evaluation failed'}
+    else:
+        return {'ok': False, 'error': f"Unknown prompt '{prompt}'"}
+
+    return {'ok': True, 'evaluation': evaluation}
+
+
+class EvaluationHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        started = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.readline())
+            reply = handle_request(request)
+        except Exception as e:
+            reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        reply['elapsed'] = round(time.perf_counter() - started, 3)
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode('utf-8'))
+        print(f"  {'✓' if reply['ok'] else '✗'} Request served in {reply['elapsed']:.2f}s")
+
+
+class EvaluationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve petition evaluations over a Unix socket')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='Socket path')
+    args = parser.parse_args()
+
+    if 'ANTHROPIC_API_KEY' not in os.environ:
+        print("WARNING: ANTHROPIC_API_KEY not set, relying on SDK defaults")
+
+    # Warm up: import the SDK and build the pooled client before accepting requests
+    get_client()
+    get_default_policy()
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+
+    with EvaluationServer(args.socket, EvaluationHandler) as server:
+        os.chmod(args.socket, 0o600)
+        print(f"Evaluation daemon listening on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
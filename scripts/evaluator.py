@@ -2,14 +2,25 @@
 """
 Petition Quality Evaluator using Claude Sonnet 4.5
 """
+import argparse
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from anthropic import Anthropic
+import threading
 import time
 
-# Initialize Anthropic client (will use ANTHROPIC_API_KEY from environment or SDK defaults)
-client = Anthropic()
+from budget import (BUDGET_LOG_FILE, CHEAPER_MODEL, HEURISTIC, BudgetController, BudgetExhausted, ConcurrencyGate,
+                    parse_deadline)
+from anthropic_client import build_retry_policy, get_client, get_default_policy, use_cassette
+from corpus import open_corpus, read_petition_text
+from evaluator_mock import analyze_petition_heuristics
+from exemplars import build_exemplar_system
+from instrumentation import add_tracing_args, configure_tracer, get_tracer
+from job_queue import DEFAULT_LEASE_SECONDS, QUEUE_FILE, JobQueue, prompt_version, worker_id
+from sampling import DEFAULT_MARGIN, DEFAULT_TOLERANCE, SamplingPolicy
+from records import MISSING, EvaluationEntry, EvaluationRecord, PetitionRecord, ScoreTable
+from sharding import ShardJournal, parse_shard, shard_api_key, shard_for
 
 EVALUATION_PROMPT = """Você é um avaliador especializado em petições iniciais de Direito do Consumidor.
 
@@ -111,34 +122,67 @@ Retorne APENAS um JSON válido no seguinte formato:
 
 **IMPORTANTE:** Retorne APENAS o JSON, sem texto adicional antes ou depois."""
 
-def evaluate_petition(petition_text, model="claude-sonnet-4-5"):
-    """Evaluate a petition using Claude"""
+# Queue jobs are keyed by (request_id, PROMPT_VERSION): editing the prompt re-queues everything
+PROMPT_VERSION = prompt_version(EVALUATION_PROMPT)
+
+def parse_evaluation_response(response_text):
+    """Parse the evaluation JSON from a model response"""
+    response_text = response_text.strip()
+    
+    # Try to extract JSON if wrapped in code blocks
+    if response_text.startswith('```'):
+        # Remove code block markers
+        response_text = response_text.split('```')[1]
+        if response_text.startswith('json'):
+            response_text = response_text[4:]
+        response_text = response_text.strip()
+    
+    return json.loads(response_text)
+
+def retry_logger(request_id=None):
+    """Build an on_retry callback that reports and traces a retried API call"""
+    def log_retry(attempt, exc, delay):
+        print(f"  ↻ Attempt {attempt} failed ({type(exc).__name__}: {exc}), retrying in {delay:.1f}s")
+        get_tracer().record_retry(attempt, exc, delay, request_id=request_id)
+    return log_retry
+
+def evaluate_petition(petition_text, model="claude-sonnet-4-5", policy=None, request_id=None, system=None,
+                      on_usage=None):
+    """Evaluate a petition using Claude
     
-    prompt = EVALUATION_PROMPT.format(petition_text=petition_text)
+    system, when given, is sent as the system prompt (e.g. the cached exemplar
+    blocks from exemplars.build_exemplar_system). on_usage(usage, model) is
+    called with each response's token usage (e.g. budget.Ticket.add_usage).
+    """
+    
+    tracer = get_tracer()
+    with tracer.span('format_prompt', request_id):
+        prompt = EVALUATION_PROMPT.format(petition_text=petition_text)
+    policy = policy or get_default_policy()
+    extra = {'system': system} if system else {}
     
     try:
-        response = client.messages.create(
-            model=model,
-            max_tokens=4000,
-            temperature=0.3,
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }]
-        )
+        with tracer.span('api_call', request_id, model=model):
+            response = policy.call(
+                get_client().messages.create,
+                on_retry=retry_logger(request_id),
+                model=model,
+                max_tokens=4000,
+                temperature=0.3,
+                messages=[{
+                    "role": "user",
+                    "content": prompt
+                }],
+                **extra
+            )
+        tracer.record_usage(response.usage, request_id)
+        if on_usage:
+            on_usage(response.usage, model)
         
         # Extract JSON from response
-        response_text = response.content[0].text.strip()
-        
-        # Try to extract JSON if wrapped in code blocks
-        if response_text.startswith('```'):
-            # Remove code block markers
-            response_text = response_text.split('```')[1]
-            if response_text.startswith('json'):
-                response_text = response_text[4:]
-            response_text = response_text.strip()
-        
-        evaluation = json.loads(response_text)
+        with tracer.span('parse_json', request_id):
+            response_text = response.content[0].text.strip()
+            evaluation = parse_evaluation_response(response_text)
         
         return evaluation
         
@@ -147,89 +191,515 @@ def evaluate_petition(petition_text, model="claude-sonnet-4-5"):
         print(f"Response: {response_text if 'response_text' in locals() else 'N/A'}")
         return None
 
+def load_unchanged_evaluation(petition, results_dir):
+    """Previous evaluation of this petition if its extracted text is unchanged, else None"""
+    if petition.text_sha256 is MISSING:
+        return None
+    eval_file = results_dir / f'eval_{petition.request_id}_rating{petition.rating}.json'
+    if not eval_file.exists():
+        return None
+    with open(eval_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('metadata', {}).get('text_sha256') != petition.text_sha256:
+        return None
+    # Evaluations downgraded by the budget controller are redone at full quality
+    if data.get('method') is not None:
+        return None
+    entry = EvaluationEntry.from_eval_file_dict(data)
+    entry.petition = petition
+    return entry
+
+def petition_priority(petition):
+    """Optional 'priority' of a processed_petitions.json entry; > 0 keeps the main model under budget pressure"""
+    priority = petition.extra.get('priority', 0)
+    return priority if isinstance(priority, int) else 0
+
+def evaluate_one(petition, petitions_dir, results_dir, policy, submitted_at=None, corpus=None, system=None,
+                 sampling=None, budget=None, priority=0, exemplar=False):
+    """Evaluate one petition and save its individual result; returns the summary entry or None
+
+    sampling, when given, is a SamplingPolicy: the petition is evaluated
+    several times concurrently and the merged evaluation is kept. budget, when
+    given, is a BudgetController that picks the model (or the heuristic) and
+    may raise BudgetExhausted instead, leaving the petition for a later run.
+    exemplar marks a petition that is itself one of the exemplars in system,
+    so that analyze_results.py leaves it out of the calibration.
+    """
+    tracer = get_tracer()
+    request_id = petition.request_id
+    rating = petition.rating
+    
+    if submitted_at is not None:
+        tracer.record_queue_wait(time.perf_counter() - submitted_at, request_id)
+    
+    # Read petition text
+    with tracer.span('read_file', request_id):
+        petition_text = read_petition_text(petition, petitions_dir, corpus)
+    
+    ticket = None
+    if budget:
+        # Samples take their own slots of the budget's concurrency gate
+        ticket = budget.admit(priority, len(EVALUATION_PROMPT) + len(petition_text),
+                              sampling.samples if sampling else 1, gated=sampling is None)
+    evaluation = None
+    try:
+        # Evaluate
+        call = {'policy': policy, 'request_id': request_id, 'system': system}
+        if ticket:
+            call.update(model=ticket.model, on_usage=ticket.add_usage)
+        if ticket and ticket.model == HEURISTIC:
+            with tracer.span('heuristics', request_id):
+                evaluation = analyze_petition_heuristics(petition_text)
+        elif sampling:
+            evaluation = sampling.evaluate(lambda: evaluate_petition(petition_text, **call),
+                                           gate=budget.gate if budget else None)
+        else:
+            evaluation = evaluate_petition(petition_text, **call)
+    finally:
+        if ticket:
+            budget.finish(ticket, ok=bool(evaluation))
+    if not evaluation:
+        return None
+    
+    entry = EvaluationEntry(
+        request_id=request_id,
+        customer_rating=rating,
+        ai_score=evaluation.get('score', 0),
+        evaluation=EvaluationRecord.from_dict(evaluation),
+        text_length=len(petition_text),
+        petition=petition
+    )
+    if ticket and ticket.model != budget.model:
+        entry.method = ticket.model
+    if exemplar:
+        entry.exemplar = True
+    
+    # Save individual evaluation
+    eval_file = results_dir / f'eval_{request_id}_rating{rating}.json'
+    with tracer.span('save_result', request_id):
+        with open(eval_file, 'w', encoding='utf-8') as f:
+            json.dump(entry.to_eval_file_dict(), f, indent=2, ensure_ascii=False)
+    
+    return entry
+
+def score_label(entry):
+    """'Score: 83/100', with the sample spread in multi-sample mode"""
+    sampling = entry.evaluation.extra.get('sampling') if isinstance(entry.evaluation, EvaluationRecord) else None
+    downgraded = '' if entry.method is MISSING else f" [{entry.method}]"
+    if not sampling:
+        return f"Score: {entry.ai_score}/100{downgraded}"
+    return (f"Score: {entry.ai_score}/100 ±{sampling['score']['stdev']} "
+            f"({sampling['samples']}/{sampling['requested']} samples, {sampling['stopped']}){downgraded}")
+
+def build_budget(args, results_dir, remaining=None):
+    """BudgetController for --max-cost/--deadline, or None when the run has no limits"""
+    if args.max_cost is None and args.deadline is None:
+        return None
+    log_path = Path(args.budget_log) if args.budget_log else results_dir / BUDGET_LOG_FILE
+    budget = BudgetController(
+        max_cost=args.max_cost,
+        deadline=args.deadline,
+        workers=args.workers,
+        max_workers=args.max_workers or args.workers * 2,
+        cheaper_model=args.cheaper_model,
+        remaining=remaining,
+        log_path=log_path,
+    )
+    limits = []
+    if args.max_cost is not None:
+        limits.append(f"max cost ${args.max_cost:.2f}")
+    if args.deadline is not None:
+        limits.append(f"deadline {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(args.deadline))}")
+    print(f"Budget: {', '.join(limits)}; {budget.workers}-{budget.max_workers} workers, "
+          f"fallback {budget.cheaper_model} then heuristic; decisions logged to {log_path}")
+    return budget
+
+def petition_catalog(processed_file):
+    """request_id -> PetitionRecord lookup that reloads processed_petitions.json when it changes"""
+    lock = threading.Lock()
+    state = {'mtime': None, 'petitions': {}}
+
+    def lookup(request_id):
+        with lock:
+            mtime = processed_file.stat().st_mtime
+            if mtime != state['mtime']:
+                with open(processed_file, 'r', encoding='utf-8') as f:
+                    state['petitions'] = {p['request_id']: PetitionRecord.from_dict(p) for p in json.load(f)}
+                state['mtime'] = mtime
+            return state['petitions'].get(request_id)
+    return lookup
+
+def queue_worker(queue, catalog, petitions_dir, results_dir, policy, corpus, system, exemplar_ids, sampling, budget,
+                 args, totals, totals_lock):
+    """Lease and evaluate jobs until the queue is drained (--drain) or forever"""
+    owner = worker_id()
+    while True:
+        job = queue.lease(PROMPT_VERSION, owner, args.lease_seconds)
+        if job is None:
+            if args.drain and not queue.pending(PROMPT_VERSION):
+                return
+            time.sleep(args.poll_interval)
+            continue
+        
+        label = f"request_id={job.request_id}, rating={job.rating}, priority={job.priority}"
+        petition = catalog(job.request_id)
+        entry = None
+        if petition is None:
+            error = 'not in processed_petitions.json'
+        else:
+            try:
+                # Retries, samples and budget waits can outlast the lease; keep it alive meanwhile
+                with queue.heartbeat(job, args.lease_seconds):
+                    entry = evaluate_one(petition, petitions_dir, results_dir, policy, corpus=corpus, system=system,
+                                         sampling=sampling, budget=budget, priority=job.priority,
+                                         exemplar=job.request_id in exemplar_ids)
+                error = None if entry else 'evaluation failed'
+            except BudgetExhausted as e:
+                # Paused: the job goes back untouched for a later run
+                queue.release(job)
+                print(f"[queue] {label} ⏸ Budget paused ({e}); worker stopping")
+                return
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        
+        if entry:
+            fresh = queue.complete(job, entry.to_dict())
+            with totals_lock:
+                totals['done'] += 1
+            print(f"[queue] {label} ✓ {score_label(entry)}" + ('' if fresh else ' (already completed)'))
+        else:
+            status = queue.fail(job, error)
+            with totals_lock:
+                totals['dead' if status == 'dead' else 'failed'] += 1
+            print(f"[queue] {label} ✗ Attempt {job.attempts}/{job.max_attempts} failed ({error})"
+                  + (', dead-lettered' if status == 'dead' else ''))
+
+def run_queue(args, queue_path, processed_file, petitions_dir, results_dir, policy, sampling):
+    """Worker mode: args.workers threads (budget.max_workers under a budget) pulling jobs from the SQLite queue"""
+    queue = JobQueue(queue_path)
+    counts = queue.counts(PROMPT_VERSION)
+    print(f"Queue {queue_path}: prompt version {PROMPT_VERSION}, {counts['queued']} queued, "
+          f"{counts['leased']} leased, {counts['done']} done, {counts['dead']} dead")
+    
+    system, exemplar_ids = None, []
+    if args.exemplars:
+        with open(processed_file, 'r', encoding='utf-8') as f:
+            petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
+        system, exemplar_ids, digest = build_exemplar_system(petitions, petitions_dir, results_dir, args.exemplars)
+        if system:
+            print(f"Using {len(exemplar_ids)} exemplars {exemplar_ids} (block {digest}, prompt-cached)")
+    
+    budget = build_budget(args, results_dir, remaining=lambda: queue.pending_by_priority(PROMPT_VERSION))
+    workers = budget.max_workers if budget else args.workers
+    if budget:
+        budget.start()
+    print(f"Pulling jobs with {workers} workers" + (" until the queue is drained..." if args.drain else
+                                                    " (Ctrl+C to stop)..."))
+    print("="*60)
+    catalog = petition_catalog(processed_file)
+    corpus = open_corpus(petitions_dir)
+    totals = {'done': 0, 'failed': 0, 'dead': 0}
+    totals_lock = threading.Lock()
+    # Daemon threads: on Ctrl+C their leases simply expire and the jobs return to the queue
+    threads = [threading.Thread(target=queue_worker, daemon=True,
+                                args=(queue, catalog, petitions_dir, results_dir, policy, corpus, system,
+                                      set(exemplar_ids), sampling, budget, args, totals, totals_lock))
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        print("\nStopping; jobs still leased return to the queue when their lease expires")
+    
+    counts = queue.counts(PROMPT_VERSION)
+    print(f"\n{'='*60}")
+    print(f"Completed {totals['done']} jobs, {totals['failed']} failed attempts, {totals['dead']} dead-lettered")
+    print(f"Queue now: {counts['queued']} queued, {counts['leased']} leased, {counts['done']} done, "
+          f"{counts['dead']} dead (export with job_queue.py export)")
+    print(f"Retries used: {policy.budget.used}/{policy.budget.max_retries}, "
+          f"circuit opened {policy.breaker.times_opened}x")
+    if budget:
+        budget.close()
+        print(budget.summary())
+    queue.close()
+
 def main():
+    parser = argparse.ArgumentParser(description='Evaluate petitions using Claude Sonnet 4.5')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent API calls')
+    parser.add_argument('--max-attempts', type=int, default=6, help='Attempts per petition for transient errors')
+    parser.add_argument('--retry-budget', type=int, default=100, help='Total retries allowed for the whole run')
+    parser.add_argument('--breaker-threshold', type=int, default=5,
+                        help='Consecutive failures that open the circuit and pause all workers')
+    parser.add_argument('--breaker-timeout', type=float, default=30.0, help='Seconds to pause when the circuit opens')
+    parser.add_argument('--changed-only', action='store_true',
+                        help='Reuse saved evaluations of petitions whose extracted text is unchanged')
+    parser.add_argument('--exemplars', type=int, default=0, metavar='N',
+                        help='Add N past gold-standard/low-rated evaluations as a cached few-shot system prompt')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', metavar='CASSETTE', help='Record API responses to this .jsonl.gz cassette')
+    cassette_group.add_argument('--replay', metavar='CASSETTE',
+                                help='Serve API responses from a recorded cassette (no network calls)')
+    parser.add_argument('--shard', metavar='I/N',
+                        help='Evaluate only shard I of N (by request_id hash) and append results to its journal')
+    parser.add_argument('--journal-dir', help='Directory for shard journals (default: results/shards)')
+    parser.add_argument('--samples', type=int, default=1, metavar='K',
+                        help='Evaluate each petition up to K times concurrently and report score variance')
+    parser.add_argument('--agreement-tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='With --samples, points within which samples agree (stop early when all do)')
+    parser.add_argument('--threshold-margin', type=float, default=DEFAULT_MARGIN,
+                        help='With --samples, stop early when the mean is this far from 85')
+    parser.add_argument('--queue', nargs='?', const='', metavar='DB',
+                        help=f'Pull jobs from the SQLite job queue (default: results/{QUEUE_FILE}) instead of '
+                             'evaluating processed_petitions.json once')
+    parser.add_argument('--drain', action='store_true', help='With --queue, exit once no jobs are left')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                        help='With --queue, time a worker may hold a job before it is handed to another')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='With --queue, seconds between polls when idle')
+    parser.add_argument('--max-cost', type=float, metavar='USD', help='Spend limit for the run, in dollars')
+    parser.add_argument('--deadline', help='Finish by: 45m, 2h, 18:30 or an ISO datetime')
+    parser.add_argument('--max-workers', type=int,
+                        help='Concurrency the budget controller may scale up to for --deadline (default: 2x --workers)')
+    parser.add_argument('--cheaper-model', default=CHEAPER_MODEL,
+                        help='Model for low-priority petitions when the budget gets tight')
+    parser.add_argument('--budget-log', help=f'Budget decision log (default: results/{BUDGET_LOG_FILE})')
+    add_tracing_args(parser)
+    args = parser.parse_args()
+    if args.deadline is not None:
+        try:
+            args.deadline = parse_deadline(args.deadline)
+        except ValueError as e:
+            parser.error(str(e))
+    try:
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    if shard and args.queue is not None:
+        parser.error('--shard and --queue are alternative ways to split a run; use one')
+    tracer = configure_tracer('evaluator' if shard is None else f'evaluator-shard-{shard[0]}-of-{shard[1]}',
+                              args.trace, args.prometheus)
+    
+    # Each shard can draw on its own API key / quota
+    if shard and shard_api_key(shard[0]):
+        os.environ['ANTHROPIC_API_KEY'] = shard_api_key(shard[0])
+    
     project_dir = Path(__file__).parent.parent
     data_dir = project_dir / 'data'
     petitions_dir = project_dir / 'petitions'
     results_dir = project_dir / 'results'
     results_dir.mkdir(exist_ok=True)
     
+    cassette = None
+    if args.record:
+        cassette = use_cassette('record', args.record)
+        print(f"Recording API responses to {args.record}")
+    elif args.replay:
+        cassette = use_cassette('replay', args.replay)
+        print(f"Replaying {len(cassette)} recorded responses from {args.replay}")
+    
+    policy = build_retry_policy(
+        max_attempts=args.max_attempts,
+        retry_budget=args.retry_budget,
+        failure_threshold=args.breaker_threshold,
+        reset_timeout=args.breaker_timeout,
+    )
+    
+    sampling = None
+    if args.samples > 1:
+        # --workers bounds the API calls in flight, samples included
+        sampling = SamplingPolicy(args.samples, args.agreement_tolerance, args.threshold_margin,
+                                  gate=ConcurrencyGate(args.workers))
+        print(f"Multi-sample mode: up to {args.samples} samples per petition, sharing the worker slots "
+              f"(tolerance {args.agreement_tolerance:g} points, margin {args.threshold_margin:g} from 85)")
+        if args.replay and cassette.max_occurrences < args.samples:
+            print(f"  ⚠ The cassette holds at most {cassette.max_occurrences} response(s) per request; "
+                  f"replayed samples will repeat them and understate the disagreement")
+    
+    if args.queue is not None:
+        run_queue(args, Path(args.queue) if args.queue else results_dir / QUEUE_FILE,
+                  data_dir / 'processed_petitions.json', petitions_dir, results_dir, policy, sampling)
+        if args.record:
+            cassette.close()
+        tracer.close()
+        return
+    
     # Load processed petitions
     processed_file = data_dir / 'processed_petitions.json'
     with open(processed_file, 'r', encoding='utf-8') as f:
-        petitions = json.load(f)
+        petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
     
-    print(f"Evaluating {len(petitions)} petitions using Claude Sonnet 4.5...")
+    # One exemplar block for the whole run, so every call shares the cached prefix; chosen
+    # before the shard filter so that every shard sends the same block
+    system, exemplar_ids = None, []
+    if args.exemplars:
+        system, exemplar_ids, digest = build_exemplar_system(petitions, petitions_dir, results_dir, args.exemplars)
+        if system:
+            print(f"Using {len(exemplar_ids)} exemplars {exemplar_ids} (block {digest}, "
+                  f"{len(system[0]['text'])} chars, prompt-cached)")
+        else:
+            print("No saved evaluations to draw exemplars from; evaluating without exemplars")
+    exemplar_ids = set(exemplar_ids)
+    
+    journal = None
+    if shard:
+        index, count = shard
+        petitions = [p for p in petitions if shard_for(p.request_id, count) == index]
+        journal = ShardJournal(args.journal_dir or results_dir / 'shards', index, count)
+        print(f"Shard {index}/{count}: {len(petitions)} petitions, journal {journal.path}")
+    
+    print(f"Evaluating {len(petitions)} petitions using Claude Sonnet 4.5 ({args.workers} workers)...")
     print("="*60)
     
     evaluations = []
+    failed = []
+    deferred = []
     
-    for i, petition in enumerate(petitions, 1):
-        request_id = petition['request_id']
-        rating = petition['rating']
-        txt_file = petitions_dir / petition['txt_file']
-        
-        print(f"\n[{i}/{len(petitions)}] Evaluating request_id={request_id}, rating={rating}")
-        
-        # Read petition text
-        with open(txt_file, 'r', encoding='utf-8') as f:
-            petition_text = f.read()
-        
-        # Evaluate
-        print(f"  Sending to Claude...")
-        evaluation = evaluate_petition(petition_text)
-        
-        if evaluation:
-            score = evaluation.get('score', 0)
-            print(f"  ✓ Score: {score}/100")
-            
-            evaluations.append({
-                'request_id': request_id,
-                'customer_rating': rating,
-                'ai_score': score,
-                'evaluation': evaluation,
-                'text_length': len(petition_text)
-            })
+    reused = {}
+    if journal:
+        # A restarted shard picks up where its journal left off
+        for petition in petitions:
+            if journal.is_done(petition):
+                reused[petition.request_id] = EvaluationEntry.from_dict(journal.previous[petition.request_id]['entry'])
+                reused[petition.request_id].petition = petition
+        if reused:
+            print(f"Resuming shard: {len(reused)} petitions already in the journal")
+    if args.changed_only:
+        for petition in petitions:
+            if petition.request_id in reused:
+                continue
+            entry = load_unchanged_evaluation(petition, results_dir)
+            if entry:
+                reused[petition.request_id] = entry
+                if journal:
+                    journal.record_success(entry)
+        print(f"Reusing {len(reused)} evaluations of unchanged petitions")
+    for request_id in exemplar_ids & reused.keys():
+        reused[request_id].exemplar = True
+    
+    budget = build_budget(args, results_dir)
+    if budget:
+        budget.expect(sum(1 for p in petitions if p.request_id not in reused and petition_priority(p) > 0),
+                      sum(1 for p in petitions if p.request_id not in reused and petition_priority(p) <= 0))
+        budget.start()
+    
+    # Packed corpus when download_petitions.py built one, loose .txt files otherwise
+    corpus = open_corpus(petitions_dir)
+    
+    # The budget controller gates concurrency itself and may scale it up to max_workers
+    with ThreadPoolExecutor(max_workers=budget.max_workers if budget else args.workers) as executor:
+        futures = []
+        primed = system is None
+        for petition in petitions:
+            if petition.request_id in reused:
+                futures.append(None)
+                continue
+            futures.append(executor.submit(evaluate_one, petition, petitions_dir, results_dir, policy,
+                                           time.perf_counter(), corpus, system, sampling, budget,
+                                           petition_priority(petition), petition.request_id in exemplar_ids))
+            # Let the first call write the exemplar cache before the others read it
+            if not primed:
+                wait(futures[-1:])
+                primed = True
+        for i, (petition, future) in enumerate(zip(petitions, futures), 1):
+            request_id = petition.request_id
+            rating = petition.rating
+            if future is None:
+                print(f"[{i}/{len(petitions)}] request_id={request_id}, rating={rating} ↺ Unchanged, "
+                      f"reusing score {reused[request_id].ai_score}/100")
+                evaluations.append(reused[request_id])
+                continue
+            try:
+                result = future.result()
+                error = None if result else 'evaluation failed'
+            except BudgetExhausted as e:
+                # Not a failure: the petition is left for the next run within budget
+                print(f"[{i}/{len(petitions)}] request_id={request_id}, rating={rating} ⏸ Deferred ({e})")
+                deferred.append({'request_id': request_id, 'rating': rating, 'reason': str(e)})
+                continue
+            except Exception as e:
+                result = None
+                error = f"{type(e).__name__}: {e}"
             
-            # Save individual evaluation
-            eval_file = results_dir / f'eval_{request_id}_rating{rating}.json'
-            with open(eval_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'request_id': request_id,
-                    'customer_rating': rating,
-                    'evaluation': evaluation,
-                    'metadata': petition
-                }, f, indent=2, ensure_ascii=False)
-        else:
-            print(f"  ✗ Failed to evaluate")
-        
-        # Rate limiting
-        time.sleep(2)
+            if result:
+                print(f"[{i}/{len(petitions)}] request_id={request_id}, rating={rating} ✓ {score_label(result)}")
+                evaluations.append(result)
+                if journal:
+                    journal.record_success(result)
+            else:
+                print(f"[{i}/{len(petitions)}] request_id={request_id}, rating={rating} ✗ Failed to evaluate ({error})")
+                failed.append({'request_id': request_id, 'rating': rating, 'error': error})
+                if journal:
+                    journal.record_failure(petition, error)
     
-    # Save all evaluations
-    all_evals_file = results_dir / 'all_evaluations.json'
-    with open(all_evals_file, 'w', encoding='utf-8') as f:
-        json.dump(evaluations, f, indent=2, ensure_ascii=False)
+    failed_file = results_dir / 'failed_evaluations.json'
+    deferred_file = results_dir / 'deferred_evaluations.json'
+    if journal:
+        # Shards only write their journal; coordinator.py merges them
+        journal.close()
+        failed_file = journal.path
+    else:
+        # Save all evaluations
+        all_evals_file = results_dir / 'all_evaluations.json'
+        with open(all_evals_file, 'w', encoding='utf-8') as f:
+            json.dump([e.to_dict() for e in evaluations], f, indent=2, ensure_ascii=False)
+        
+        # Failed petitions are recorded so they can be retried instead of silently dropped
+        if failed:
+            with open(failed_file, 'w', encoding='utf-8') as f:
+                json.dump(failed, f, indent=2, ensure_ascii=False)
+        elif failed_file.exists():
+            failed_file.unlink()
+        if deferred:
+            with open(deferred_file, 'w', encoding='utf-8') as f:
+                json.dump(deferred, f, indent=2, ensure_ascii=False)
+        elif deferred_file.exists():
+            deferred_file.unlink()
     
     print(f"\n{'='*60}")
     print(f"Completed {len(evaluations)} evaluations")
+    if failed:
+        print(f"Failed {len(failed)} evaluations (see {failed_file.name})")
+    if deferred:
+        print(f"Deferred {len(deferred)} petitions by the budget"
+              + ('' if journal else f" (see {deferred_file.name})") + "; rerun with --changed-only to evaluate them")
+    print(f"Retries used: {policy.budget.used}/{policy.budget.max_retries}, "
+          f"circuit opened {policy.breaker.times_opened}x")
+    if budget:
+        budget.close()
+        print(budget.summary())
+    if args.record:
+        cassette.close()
+        print(f"Recorded {cassette.recorded} responses to {args.record}")
+    elif args.replay:
+        print(f"Replayed {cassette.hits} responses ({cassette.misses} requests missing from the cassette)")
     print(f"Results saved to: {results_dir}")
+    if journal:
+        print(f"Shard journal: {journal.path} (merge shards with coordinator.py merge)")
     
-    # Calculate statistics
-    if evaluations:
-        rating_5_scores = [e['ai_score'] for e in evaluations if e['customer_rating'] == 5]
-        low_rating_scores = [e['ai_score'] for e in evaluations if e['customer_rating'] <= 3]
+    # Calculate statistics, without exemplars or budget-downgraded evaluations
+    from analyze_results import calibration_entries
+    calibrated = calibration_entries(evaluations)
+    if calibrated:
+        table = ScoreTable.from_entries(calibrated)
+        by_rating = table.rows_by_rating()
+        rating_5_scores = table.scores_for(by_rating.get(5, []))
+        low_rating_scores = table.scores_for([i for r, rows in by_rating.items() if r <= 3 for i in rows])
         
         print("\n📊 CALIBRATION RESULTS:")
+        if len(calibrated) < len(evaluations):
+            print(f"  ({len(evaluations) - len(calibrated)} exemplar or budget-downgraded evaluations left out)")
         print(f"\nRating 5 petitions (n={len(rating_5_scores)}):")
         if rating_5_scores:
             print(f"  Average AI score: {sum(rating_5_scores)/len(rating_5_scores):.1f}")
-            print(f"  Min: {min(rating_5_scores)}, Max: {max(rating_5_scores)}")
+            print(f"  Min: {min(rating_5_scores):g}, Max: {max(rating_5_scores):g}")
         
         print(f"\nRating 1-3 petitions (n={len(low_rating_scores)}):")
         if low_rating_scores:
             print(f"  Average AI score: {sum(low_rating_scores)/len(low_rating_scores):.1f}")
-            print(f"  Min: {min(low_rating_scores)}, Max: {max(low_rating_scores)}")
+            print(f"  Min: {min(low_rating_scores):g}, Max: {max(low_rating_scores):g}")
+    
+    tracer.close()
 
 if __name__ == '__main__':
     main()
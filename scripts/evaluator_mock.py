@@ -3,24 +3,38 @@
 Mock petition evaluator for demonstration purposes
 Generates realistic evaluations based on heuristics until API key is available
 """
+import argparse
 import json
-import re
 from pathlib import Path
 import time
 
-def analyze_petition_heuristics(text):
-    """Analyze petition using heuristics to generate realistic scores"""
+from citations import citation_counts
+from corpus import open_corpus, read_petition_text
+from instrumentation import add_tracing_args, configure_tracer
+from petition_structure import load_structure_index, lookup_index, parse_petition
+from records import EvaluationEntry, EvaluationRecord, PetitionRecord, ScoreTable
+
+def analyze_petition_heuristics(text, index=None):
+    """Analyze petition using heuristics to generate realistic scores
+    
+    index is the petition's PetitionIndex when one was already built (see
+    petition_structure.py); otherwise the text is parsed here.
+    """
+    if index is None:
+        index = parse_petition(text)
+    features = index.features
     
     # Basic metrics
     length = len(text)
-    has_articles = len(re.findall(r'Art\.|Artigo|art\.', text))
-    has_jurisprudence = len(re.findall(r'STJ|STF|TJ[A-Z]{2}|Súmula', text, re.IGNORECASE))
-    has_cdc = len(re.findall(r'CDC|Código de Defesa do Consumidor', text, re.IGNORECASE))
-    paragraphs = len([p for p in text.split('\n') if p.strip()])
-    has_parties = 'em desfavor de' in text or 'em face de' in text
-    has_requests = 'pedidos' in text.lower() or 'requer' in text.lower()
-    has_value = re.search(r'R\$\s*[\d.,]+', text) is not None
-    has_placeholders = '___' in text or '  ' in text  # Generic placeholders
+    has_articles = features['articles']
+    has_jurisprudence = features['jurisprudence']
+    has_cdc = features['cdc']
+    paragraphs = features['paragraphs']
+    has_parties = features['has_parties']
+    has_requests = features['has_requests']
+    has_value = features['has_value']
+    has_placeholders = features['has_placeholders']  # Generic placeholders
+    distinct_citations = len(citation_counts(index))  # e.g. 30 mentions of one article count once
     
     # Base scores
     estrutura_score = min(20, (15 if has_parties else 10) + (3 if has_requests else 0) + (2 if paragraphs > 20 else 0))
@@ -66,7 +80,8 @@ def analyze_petition_heuristics(text):
             "fundamentacao_juridica": {
                 "score": fundamentacao_score,
                 "max": 25,
-                "comentario": f"{has_articles} artigos citados, {has_jurisprudence} precedentes"
+                "comentario": f"{has_articles} artigos citados, {has_jurisprudence} precedentes, "
+                              f"{distinct_citations} citações distintas"
             },
             "coerencia_clareza": {
                 "score": coerencia_score,
@@ -97,6 +112,11 @@ def analyze_petition_heuristics(text):
     }
 
 def main():
+    parser = argparse.ArgumentParser(description='Evaluate petitions using the heuristic MOCK evaluator')
+    add_tracing_args(parser)
+    args = parser.parse_args()
+    tracer = configure_tracer('evaluator_mock', args.trace, args.prometheus)
+    
     project_dir = Path(__file__).parent.parent
     data_dir = project_dir / 'data'
     petitions_dir = project_dir / 'petitions'
@@ -106,7 +126,7 @@ def main():
     # Load processed petitions
     processed_file = data_dir / 'processed_petitions.json'
     with open(processed_file, 'r', encoding='utf-8') as f:
-        petitions = json.load(f)
+        petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
     
     print(f"Evaluating {len(petitions)} petitions using MOCK evaluator (heuristic-based)...")
     print("="*60)
@@ -116,50 +136,53 @@ def main():
     
     evaluations = []
     
+    # Packed corpus when download_petitions.py built one, loose .txt files otherwise
+    corpus = open_corpus(petitions_dir)
+    # Structure indexes saved by download_petitions.py spare re-parsing each text
+    structure_index = load_structure_index(petitions_dir)
+    
     for i, petition in enumerate(petitions, 1):
-        request_id = petition['request_id']
-        rating = petition['rating']
-        txt_file = petitions_dir / petition['txt_file']
+        request_id = petition.request_id
+        rating = petition.rating
         
         print(f"\n[{i}/{len(petitions)}] Evaluating request_id={request_id}, rating={rating}")
         
         # Read petition text
-        with open(txt_file, 'r', encoding='utf-8') as f:
-            petition_text = f.read()
+        with tracer.span('read_file', request_id):
+            petition_text = read_petition_text(petition, petitions_dir, corpus)
         
         # Evaluate using heuristics
         print(f"  Analyzing with heuristics...")
-        evaluation = analyze_petition_heuristics(petition_text)
+        with tracer.span('heuristics', request_id):
+            evaluation = analyze_petition_heuristics(petition_text, lookup_index(structure_index, petition))
         score = evaluation['score']
         
         print(f"  ✓ Score: {score}/100")
         
-        evaluations.append({
-            'request_id': request_id,
-            'customer_rating': rating,
-            'ai_score': score,
-            'evaluation': evaluation,
-            'text_length': len(petition_text),
-            'method': 'heuristic'
-        })
+        entry = EvaluationEntry(
+            request_id=request_id,
+            customer_rating=rating,
+            ai_score=score,
+            evaluation=EvaluationRecord.from_dict(evaluation),
+            text_length=len(petition_text),
+            method='heuristic',
+            petition=petition
+        )
+        evaluations.append(entry)
         
         # Save individual evaluation
         eval_file = results_dir / f'eval_{request_id}_rating{rating}_mock.json'
-        with open(eval_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'request_id': request_id,
-                'customer_rating': rating,
-                'evaluation': evaluation,
-                'metadata': petition,
-                'method': 'heuristic'
-            }, f, indent=2, ensure_ascii=False)
+        with tracer.span('save_result', request_id):
+            with open(eval_file, 'w', encoding='utf-8') as f:
+                json.dump(entry.to_eval_file_dict(), f, indent=2, ensure_ascii=False)
         
-        time.sleep(0.1)  # Simulate processing time
+        with tracer.span('sleep', request_id):
+            time.sleep(0.1)  # Simulate processing time
     
     # Save all evaluations
     all_evals_file = results_dir / 'all_evaluations_mock.json'
     with open(all_evals_file, 'w', encoding='utf-8') as f:
-        json.dump(evaluations, f, indent=2, ensure_ascii=False)
+        json.dump([e.to_dict() for e in evaluations], f, indent=2, ensure_ascii=False)
     
     print(f"\n{'='*60}")
     print(f"Completed {len(evaluations)} evaluations (MOCK/Heuristic)")
@@ -167,22 +190,26 @@ def main():
     
     # Calculate statistics
     if evaluations:
-        rating_5_scores = [e['ai_score'] for e in evaluations if e['customer_rating'] == 5]
-        low_rating_scores = [e['ai_score'] for e in evaluations if e['customer_rating'] <= 3]
+        table = ScoreTable.from_entries(evaluations)
+        by_rating = table.rows_by_rating()
+        rating_5_scores = table.scores_for(by_rating.get(5, []))
+        low_rating_scores = table.scores_for([i for r, rows in by_rating.items() if r <= 3 for i in rows])
         
         print("\n📊 MOCK CALIBRATION RESULTS:")
         print(f"\nRating 5 petitions (n={len(rating_5_scores)}):")
         if rating_5_scores:
             print(f"  Average AI score: {sum(rating_5_scores)/len(rating_5_scores):.1f}")
-            print(f"  Min: {min(rating_5_scores)}, Max: {max(rating_5_scores)}")
+            print(f"  Min: {min(rating_5_scores):g}, Max: {max(rating_5_scores):g}")
         
         print(f"\nRating 1-3 petitions (n={len(low_rating_scores)}):")
         if low_rating_scores:
             print(f"  Average AI score: {sum(low_rating_scores)/len(low_rating_scores):.1f}")
-            print(f"  Min: {min(low_rating_scores)}, Max: {max(low_rating_scores)}")
+            print(f"  Min: {min(low_rating_scores):g}, Max: {max(low_rating_scores):g}")
         
         print(f"\n⚠️  These are HEURISTIC-BASED scores, not real AI evaluations")
         print(f"Set ANTHROPIC_API_KEY to use real Claude Sonnet 4.5 evaluation")
+    
+    tracer.close()
 
 if __name__ == '__main__':
     main()
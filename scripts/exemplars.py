@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Few-shot calibration exemplars for the evaluation prompt
+
+A small set of past evaluations is picked once per run: the best-scored
+rating-5 petitions (gold standard) and the lowest-scored rating 1-3 petitions,
+each with a section-balanced excerpt of its text and its saved evaluation.
+The block is rendered deterministically, so every call of the run sends a
+byte-identical system prompt that the API can serve from its prompt cache.
+
+    python scripts/exemplars.py -n 4     # preview the block evaluator.py --exemplars 4 would send
+"""
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+from corpus import open_corpus, read_petition_text
+from petition_structure import parse_petition
+
+EXCERPT_CHARS = 4000
+MAX_PROBLEMS = 5
+
+EXEMPLARS_HEADER = """Você avalia petições iniciais de Direito do Consumidor. Para calibrar suas notas, seguem avaliações de referência de petições já avaliadas por clientes: petições com nota 5 do cliente são o padrão de qualidade e devem receber score ≥ 85; petições com nota 1 a 3 devem receber score < 85.
+"""
+
+
+def load_candidates(petitions, results_dir):
+    """(petition, evaluation dict) for petitions with a saved evaluation of their current text"""
+    candidates = []
+    for petition in petitions:
+        eval_file = Path(results_dir) / f'eval_{petition.request_id}_rating{petition.rating}.json'
+        if not eval_file.exists():
+            continue
+        with open(eval_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        text_sha256 = data.get('metadata', {}).get('text_sha256')
+        if isinstance(petition.text_sha256, str) and text_sha256 not in (None, petition.text_sha256):
+            continue
+        evaluation = data.get('evaluation')
+        if isinstance(evaluation, dict) and isinstance(evaluation.get('score'), (int, float)):
+            candidates.append((petition, evaluation))
+    return candidates
+
+
+def select_exemplars(candidates, count):
+    """Pick ceil(count/2) gold and floor(count/2) low-rated exemplars, best calibrated first"""
+    gold = sorted((c for c in candidates if c[0].rating == 5),
+                  key=lambda c: (-c[1]['score'], c[0].request_id))
+    low = sorted((c for c in candidates if c[0].rating <= 3),
+                 key=lambda c: (c[1]['score'], c[0].request_id))
+    return gold[:(count + 1) // 2] + low[:count // 2]
+
+
+def excerpt(text, max_chars=EXCERPT_CHARS):
+    """Head of each section of the petition, sharing max_chars between them"""
+    if len(text) <= max_chars:
+        return text
+    sections = parse_petition(text).sections
+    if not sections:
+        return text[:max_chars] + '\n[...]'
+    share = max_chars // len(sections)
+    parts = []
+    for section in sections:
+        body = text[section.start:section.end].strip()
+        parts.append(body if len(body) <= share else body[:share].rstrip() + '\n[...]')
+    return '\n'.join(parts)
+
+
+def _compact_evaluation(evaluation):
+    breakdown = evaluation.get('breakdown') or {}
+    return {
+        'score': evaluation['score'],
+        'breakdown': {
+            name: {'score': value.get('score'), 'max': value.get('max')}
+            for name, value in breakdown.items() if isinstance(value, dict)
+        },
+        'problemas': (evaluation.get('problemas') or [])[:MAX_PROBLEMS],
+        'summary': evaluation.get('summary', ''),
+    }
+
+
+def render_block(exemplars, petitions_dir, corpus=None, max_chars=EXCERPT_CHARS):
+    """The system prompt text for the selected exemplars"""
+    parts = [EXEMPLARS_HEADER]
+    for number, (petition, evaluation) in enumerate(exemplars, 1):
+        text = read_petition_text(petition, petitions_dir, corpus)
+        label = 'padrão de qualidade' if petition.rating == 5 else 'baixa qualidade'
+        parts.append(
+            f"\n### EXEMPLO {number} — nota do cliente {petition.rating}/5 ({label})\n\n"
+            f"<peticao>\n{excerpt(text, max_chars)}\n</peticao>\n\n"
+            f"<avaliacao>\n{json.dumps(_compact_evaluation(evaluation), ensure_ascii=False, sort_keys=True)}\n</avaliacao>\n"
+        )
+    return ''.join(parts)
+
+
+def build_exemplar_system(petitions, petitions_dir, results_dir, count, max_chars=EXCERPT_CHARS):
+    """
+    System blocks for messages.create with a cached exemplar block, or None.
+
+    Returns (system, request_ids, digest); system is None when there are no
+    past evaluations to draw from.
+    """
+    exemplars = select_exemplars(load_candidates(petitions, results_dir), count)
+    if not exemplars:
+        return None, [], None
+    corpus = open_corpus(petitions_dir)
+    try:
+        block = render_block(exemplars, petitions_dir, corpus, max_chars)
+    finally:
+        if corpus is not None:
+            corpus.close()
+    system = [{'type': 'text', 'text': block, 'cache_control': {'type': 'ephemeral'}}]
+    digest = hashlib.sha256(block.encode('utf-8')).hexdigest()[:12]
+    return system, [petition.request_id for petition, _ in exemplars], digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Preview the few-shot exemplar block')
+    parser.add_argument('-n', '--count', type=int, default=4, help='Number of exemplars')
+    parser.add_argument('--max-chars', type=int, default=EXCERPT_CHARS, help='Excerpt size per exemplar')
+    args = parser.parse_args()
+
+    from records import PetitionRecord
+
+    project_dir = Path(__file__).parent.parent
+    with open(project_dir / 'data' / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+        petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
+    system, request_ids, digest = build_exemplar_system(
+        petitions, project_dir / 'petitions', project_dir / 'results', args.count, args.max_chars)
+    if system is None:
+        print("No saved evaluations to draw exemplars from; run evaluator.py first")
+        return
+    print(system[0]['text'])
+    print(f"\n# exemplars {request_ids}, block {digest}, {len(system[0]['text'])} chars")
+
+
+if __name__ == '__main__':
+    main()
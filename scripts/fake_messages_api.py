@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Anthropic Messages API with fault injection
+
+Answers POST /v1/messages with a heuristic evaluation of the petition in the
+prompt, and can inject latency, error statuses (429/529/5xx) with retry-after
+(or retry-after-ms) headers, hung requests and full outages. With --score-noise,
+criterion scores are jittered in proportion to the request temperature, so
+repeated samples of one petition disagree like a real model's would. Point the
+evaluator at it with:
+
+    python scripts/fake_messages_api.py --port 8765 --error-rate 0.2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=fake python scripts/evaluator.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from evaluator_mock import analyze_petition_heuristics
+
+ERROR_TYPES = {
+    429: 'rate_limit_error',
+    500: 'api_error',
+    503: 'api_error',
+    529: 'overloaded_error',
+}
+
+
+class FaultConfig:
+    """Fault injection settings shared by all request handlers"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=529,
+                 retry_after=None, retry_after_ms=None, hang_rate=0.0, hang_seconds=120.0,
+                 outage_requests=0, score_noise=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.retry_after_ms = retry_after_ms
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.outage_requests = outage_requests
+        self.score_noise = score_noise
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        """Register a request and decide its fate: 'ok', 'error' or 'hang'"""
+        with self._lock:
+            self.request_count += 1
+            if self.request_count <= self.outage_requests:
+                self.error_count += 1
+                return 'error'
+            roll = self.random.random()
+            if roll < self.hang_rate:
+                return 'hang'
+            if roll < self.hang_rate + self.error_rate:
+                self.error_count += 1
+                return 'error'
+            return 'ok'
+
+    def sample_latency(self):
+        with self._lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+
+def extract_petition_text(prompt):
+    """Pull the petition out of an evaluator prompt, falling back to the whole prompt"""
+    for marker in ('**PETIÇÃO A AVALIAR:**', 'PETIÇÃO:'):
+        if marker in prompt:
+            text = prompt.split(marker, 1)[1]
+            return text.split('**IMPORTANTE:**', 1)[0].strip()
+    return prompt
+
+
+# Prefixes marked with cache_control that a previous request already sent
+_prompt_cache = set()
+_prompt_cache_lock = threading.Lock()
+
+
+def cache_usage(body):
+    """(cache_creation, cache_read) token counts for the system blocks marked cacheable"""
+    system = body.get('system')
+    if not isinstance(system, list):
+        return 0, 0
+    prefix = []
+    cached = None
+    for block in system:
+        prefix.append(block.get('text', ''))
+        if block.get('cache_control'):
+            cached = '\n'.join(prefix)
+    if cached is None:
+        return 0, 0
+    tokens = max(1, len(cached) // 4)
+    with _prompt_cache_lock:
+        if cached in _prompt_cache:
+            return 0, tokens
+        _prompt_cache.add(cached)
+    return tokens, 0
+
+
+def add_score_noise(evaluation, noise, temperature, rng=random):
+    """Jitter each criterion by up to noise * temperature points and recompute the total"""
+    spread = noise * temperature
+    if spread <= 0:
+        return evaluation
+    total = 0
+    for criterion in evaluation['breakdown'].values():
+        score = criterion['score'] + round(rng.uniform(-spread, spread))
+        criterion['score'] = min(criterion['max'], max(0, score))
+        total += criterion['score']
+    evaluation['score'] = total
+    return evaluation
+
+
+def build_message(body, score_noise=0.0):
+    """Build a Messages API response carrying a heuristic evaluation"""
+    prompt_parts = []
+    for message in body.get('messages', []):
+        content = message.get('content')
+        if isinstance(content, str):
+            prompt_parts.append(content)
+        else:
+            prompt_parts.extend(block.get('text', '') for block in content or [])
+    prompt = '\n'.join(prompt_parts)
+
+    evaluation = analyze_petition_heuristics(extract_petition_text(prompt))
+    if score_noise:
+        add_score_noise(evaluation, score_noise, body.get('temperature', 1.0))
+    text = json.dumps(evaluation, ensure_ascii=False)
+    cache_creation, cache_read = cache_usage(body)
+
+    return {
+        'id': f"msg_fake_{random.getrandbits(48):012x}",
+        'type': 'message',
+        'role': 'assistant',
+        'model': body.get('model', 'claude-sonnet-4-5'),
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': {
+            'input_tokens': max(1, len(prompt) // 4),
+            'output_tokens': max(1, len(text) // 4),
+            'cache_creation_input_tokens': cache_creation,
+            'cache_read_input_tokens': cache_read,
+        },
+    }
+
+
+class MessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    faults = FaultConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+
+        if self.path.split('?', 1)[0] != '/v1/messages':
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+            return
+
+        faults = self.faults
+        fate = faults.next_request()
+        if fate == 'hang':
+            time.sleep(faults.hang_seconds)
+        time.sleep(faults.sample_latency())
+
+        if fate == 'error':
+            status = faults.error_status
+            headers = {}
+            if faults.retry_after is not None:
+                headers['retry-after'] = str(faults.retry_after)
+            if faults.retry_after_ms is not None:
+                headers['retry-after-ms'] = str(faults.retry_after_ms)
+            self._send_json(status, {
+                'type': 'error',
+                'error': {'type': ERROR_TYPES.get(status, 'api_error'), 'message': 'Injected fault'},
+            }, headers)
+            return
+
+        try:
+            body = json.loads(raw or b'{}')
+        except json.JSONDecodeError as e:
+            self._send_json(400, {'type': 'error', 'error': {'type': 'invalid_request_error', 'message': str(e)}})
+            return
+
+        self._send_json(200, build_message(body, faults.score_noise))
+
+
+def start_server(host='127.0.0.1', port=0, **fault_options):
+    """Start the fake API in a background thread and return (server, base_url)"""
+    handler = type('ConfiguredMessagesHandler', (MessagesHandler,), {'faults': FaultConfig(**fault_options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Anthropic Messages API with fault injection')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Base latency per request (seconds)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform latency jitter (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=529, help='Status code for injected failures')
+    parser.add_argument('--retry-after', type=float, default=None, help='retry-after header on failures')
+    parser.add_argument('--retry-after-ms', type=float, default=None, help='retry-after-ms header on failures')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='Fraction of requests that hang')
+    parser.add_argument('--hang-seconds', type=float, default=120.0)
+    parser.add_argument('--outage-requests', type=int, default=0, help='Fail the first N requests')
+    parser.add_argument('--score-noise', type=float, default=0.0,
+                        help='Jitter criterion scores by up to this many points per unit of temperature')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server, base_url = start_server(
+        args.host, args.port,
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, error_status=args.error_status,
+        retry_after=args.retry_after, retry_after_ms=args.retry_after_ms, hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds, outage_requests=args.outage_requests,
+        score_noise=args.score_noise, seed=args.seed,
+    )
+    print(f"Fake Messages API listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Synthetic petition corpus generator for benchmarks
+
+Produces realistic Portuguese consumer-law initial petitions (petições iniciais)
+as DOCX and/or TXT, plus a processed_petitions.json in the same format as
+download_petitions.py, so every pipeline stage can run on the generated corpus.
+"""
+import argparse
+import hashlib
+import json
+import random
+from pathlib import Path
+
+COMARCAS = ['São Paulo/SP', 'Belo Horizonte/MG', 'Curitiba/PR', 'Porto Alegre/RS', 'Salvador/BA',
+            'Recife/PE', 'Goiânia/GO', 'Fortaleza/CE', 'Campinas/SP', 'Florianópolis/SC']
+NOMES = ['Maria Aparecida da Silva', 'José Carlos Pereira', 'Ana Paula Oliveira', 'João Batista Santos',
+         'Francisca Souza Lima', 'Antônio Ferreira Costa', 'Juliana Rodrigues Alves', 'Paulo Henrique Gomes']
+PROFISSOES = ['aposentada', 'professor', 'comerciante', 'auxiliar administrativo', 'motorista', 'enfermeira']
+REUS = [('BANCO ALFA S.A.', 'instituição financeira'), ('TELEFÔNICA BETA S.A.', 'operadora de telefonia'),
+        ('GAMA VAREJO LTDA.', 'rede varejista'), ('DELTA LINHAS AÉREAS S.A.', 'companhia aérea'),
+        ('ÔMEGA ENERGIA S.A.', 'concessionária de energia elétrica')]
+FATOS = [
+    'A parte autora foi surpreendida com descontos indevidos em seu benefício previdenciário, referentes a '
+    'contrato de empréstimo consignado que jamais celebrou.',
+    'Após diversas tentativas de solução administrativa, inclusive com registro de protocolo junto ao SAC, a '
+    'requerida permaneceu inerte, mantendo a cobrança de valores manifestamente indevidos.',
+    'O nome da parte autora foi inscrito nos órgãos de proteção ao crédito em razão de débito inexistente, '
+    'o que lhe causou constrangimento e impediu a obtenção de crédito no comércio local.',
+    'O voo contratado foi cancelado sem aviso prévio, e a companhia não prestou a assistência material '
+    'devida, deixando a parte autora por mais de doze horas no aeroporto.',
+    'O produto adquirido apresentou vício no prazo de garantia e, encaminhado à assistência técnica, não foi '
+    'reparado no prazo legal de trinta dias.',
+    'As faturas passaram a apresentar valores incompatíveis com o consumo médio histórico da unidade, sem '
+    'qualquer justificativa técnica por parte da concessionária.',
+]
+ARTIGOS = [
+    'art. 6º, VIII, do CDC', 'art. 14 do Código de Defesa do Consumidor', 'art. 42, parágrafo único, do CDC',
+    'art. 18, § 1º, do CDC', 'art. 186 do Código Civil', 'art. 927 do Código Civil', 'art. 5º, X, da Constituição Federal',
+    'art. 300 do CPC', 'art. 319 do Código de Processo Civil', 'art. 39, III, do CDC', 'Art. 2º da Lei 8.078/90',
+]
+SUMULAS = ['Súmula 297/STJ', 'Súmula 479 do STJ', 'Súmula 385 do STJ', 'Súmula 532/STJ', 'Súmula 54 do STJ']
+PRECEDENTES = [
+    'STJ, REsp 1.199.782/PR, Rel. Min. Luis Felipe Salomão, Segunda Seção, julgado em 24/08/2011',
+    'STJ, AgInt no AREsp 1.234.567/SP, Rel. Min. Nancy Andrighi, Terceira Turma',
+    'TJSP, Apelação Cível 1001234-56.2020.8.26.0100, 22ª Câmara de Direito Privado',
+    'TJMG, Apelação Cível 1.0000.19.123456-7/001, 12ª Câmara Cível',
+    'STF, RE 636.331, Rel. Min. Gilmar Mendes, Tribunal Pleno',
+]
+ARGUMENTOS = [
+    'A relação jurídica estabelecida entre as partes é nitidamente de consumo, nos termos dos arts. 2º e 3º '
+    'do CDC, devendo a controvérsia ser solucionada à luz do microssistema consumerista.',
+    'A responsabilidade do fornecedor é objetiva, respondendo independentemente de culpa pelos danos causados '
+    'aos consumidores por defeitos relativos à prestação dos serviços.',
+    'Presentes a verossimilhança das alegações e a hipossuficiência técnica da parte autora, impõe-se a '
+    'inversão do ônus da prova.',
+    'O dano moral, na hipótese, é presumido (in re ipsa), decorrendo do próprio fato da inscrição indevida.',
+    'A repetição do indébito deve se dar em dobro, uma vez que a cobrança indevida não decorreu de engano '
+    'justificável.',
+]
+PEDIDOS = [
+    'a concessão da tutela de urgência para determinar a imediata suspensão das cobranças;',
+    'a inversão do ônus da prova, nos termos do art. 6º, VIII, do CDC;',
+    'a declaração de inexistência do débito objeto da presente demanda;',
+    'a condenação da requerida à repetição do indébito em dobro;',
+    'a condenação da requerida ao pagamento de indenização por danos morais;',
+    'a citação da requerida para, querendo, apresentar contestação;',
+    'a condenação da requerida ao pagamento das custas processuais e honorários advocatícios.',
+]
+
+
+def money(rng):
+    value = rng.randint(1000, 60000) + rng.randint(0, 99) / 100
+    return 'R$ ' + f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def generate_petition(rng, target_chars=30000, rating=5):
+    """Generate one petition as a list of paragraphs; lower ratings get sloppier drafts"""
+    sloppy = rating <= 3
+    autor = rng.choice(NOMES)
+    reu, tipo_reu = rng.choice(REUS)
+
+    paragraphs = [
+        f"EXCELENTÍSSIMO(A) SENHOR(A) DOUTOR(A) JUIZ(A) DE DIREITO DO JUIZADO ESPECIAL CÍVEL DA COMARCA DE "
+        f"{rng.choice(COMARCAS).upper()}",
+        f"{autor.upper()}, brasileira(o), {rng.choice(PROFISSOES)}, inscrita(o) no CPF sob o nº "
+        + ('___.___.___-__' if sloppy and rng.random() < 0.7 else f"{rng.randint(100, 999)}.{rng.randint(100, 999)}."
+           f"{rng.randint(100, 999)}-{rng.randint(10, 99)}")
+        + ", residente e domiciliada(o) na Rua das Flores, nº 123, vem, respeitosamente, à presença de Vossa "
+        f"Excelência, por seu advogado, propor a presente AÇÃO DECLARATÓRIA DE INEXISTÊNCIA DE DÉBITO C/C "
+        f"INDENIZAÇÃO POR DANOS MORAIS em face de {reu}, {tipo_reu}, pelos fatos e fundamentos a seguir expostos.",
+        "I – DOS FATOS",
+    ]
+
+    citation_rate = 0.4 if sloppy else 0.9
+    body_budget = target_chars * 0.45
+    size = sum(len(p) for p in paragraphs)
+    while size < body_budget:
+        paragraph = rng.choice(FATOS)
+        if sloppy and rng.random() < 0.2:
+            paragraph += '  Conforme documento ___ em anexo.'
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+
+    paragraphs.append('II – DO DIREITO')
+    while size < target_chars * 0.9:
+        paragraph = rng.choice(ARGUMENTOS)
+        if rng.random() < citation_rate:
+            paragraph += f" Nesse sentido, dispõe o {rng.choice(ARTIGOS)}."
+        if rng.random() < citation_rate / 2:
+            paragraph += f" É o entendimento consolidado na {rng.choice(SUMULAS)}."
+        if rng.random() < citation_rate / 3:
+            paragraph += f" Confira-se: {rng.choice(PRECEDENTES)}."
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+
+    paragraphs.append('III – DOS PEDIDOS')
+    paragraphs.append('Diante do exposto, requer:')
+    for letter, pedido in zip('abcdefg', PEDIDOS[:rng.randint(4, len(PEDIDOS))]):
+        paragraphs.append(f"{letter}) {pedido}")
+
+    if not sloppy or rng.random() < 0.5:
+        paragraphs.append('IV – DO VALOR DA CAUSA')
+        paragraphs.append(f"Dá-se à causa o valor de {money(rng)}.")
+    paragraphs.append('Nestes termos, pede deferimento.')
+    paragraphs.append(f"{rng.choice(COMARCAS).split('/')[0]}, {rng.randint(1, 28)} de março de 2024.")
+    paragraphs.append('ADVOGADO(A) – OAB/' + ('__ nº ____' if sloppy else f"SP nº {rng.randint(100000, 499999)}"))
+    return paragraphs
+
+
+def write_docx(paragraphs, path):
+    from docx import Document
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def generate_corpus(output_dir, count=24, target_chars=30000, formats=('docx', 'txt'), seed=42,
+                    start_id=100000):
+    """Write a synthetic corpus and its processed_petitions.json; returns the metadata list"""
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    petitions_dir = output_dir / 'petitions'
+    data_dir = output_dir / 'data'
+    petitions_dir.mkdir(parents=True, exist_ok=True)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    processed = []
+    for i in range(count):
+        request_id = start_id + i
+        # Roughly the real mix: ~60% gold standard, the rest rated 1-3
+        rating = 5 if rng.random() < 0.6 else rng.choice([1, 2, 3])
+        size = max(2000, int(rng.gauss(target_chars, target_chars * 0.25)))
+        paragraphs = generate_petition(rng, size, rating)
+        text = '\n'.join(paragraphs)
+
+        docx_filename = f"{request_id}_rating{rating}.docx"
+        txt_filename = f"{request_id}_rating{rating}.txt"
+        if 'docx' in formats:
+            write_docx(paragraphs, petitions_dir / docx_filename)
+        if 'txt' in formats:
+            with open(petitions_dir / txt_filename, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+        processed.append({
+            'request_id': request_id,
+            'rating': rating,
+            'docx_file': docx_filename,
+            'txt_file': txt_filename,
+            'text_length': len(text),
+            'url': f"https://example.invalid/{request_id}.docx",
+            'remark': None,
+            'rating_text': None,
+            'text_sha256': hashlib.sha256(text.encode('utf-8')).hexdigest()
+        })
+
+    with open(data_dir / 'processed_petitions.json', 'w', encoding='utf-8') as f:
+        json.dump(processed, f, indent=2, ensure_ascii=False)
+
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic petition corpus')
+    parser.add_argument('--output', default='synthetic', help='Output directory (gets petitions/ and data/)')
+    parser.add_argument('--count', type=int, default=24)
+    parser.add_argument('--size', type=int, default=30000, help='Average petition size in characters')
+    parser.add_argument('--formats', default='docx,txt', help='Comma-separated: docx, txt')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    processed = generate_corpus(args.output, args.count, args.size, tuple(args.formats.split(',')), args.seed)
+    total_chars = sum(p['text_length'] for p in processed)
+    print(f"Generated {len(processed)} petitions ({total_chars} chars) in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
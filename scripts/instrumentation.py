@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and token instrumentation for pipeline runs
+
+Scripts record spans per petition per stage, token usage from response.usage,
+retries and queue waits on the process-wide tracer. Events are appended to a
+JSONL trace file (--trace), optionally exported in Prometheus text format
+(--prometheus), and summarized in a table at the end of each run.
+"""
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+TOKEN_FIELDS = ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens')
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (0.0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class Tracer:
+    """Collects spans and counters for one run and writes them as JSONL events"""
+
+    def __init__(self, run_name='run', trace_file=None, prometheus_file=None):
+        self.run_name = run_name
+        self.trace_file = trace_file
+        self.prometheus_file = prometheus_file
+        self.started = time.time()
+        self.durations = {}
+        self.errors = {}
+        self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.retries = 0
+        self.queue_waits = []
+        self._lock = threading.Lock()
+        self._file = open(trace_file, 'a', encoding='utf-8') if trace_file else None
+
+    def _emit(self, event):
+        if self._file is None:
+            return
+        event = {'run': self.run_name, 'ts': round(time.time(), 6), **event}
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    @contextmanager
+    def span(self, stage, request_id=None, **attrs):
+        """Time a pipeline stage for one petition"""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            with self._lock:
+                self.durations.setdefault(stage, []).append(duration)
+                if error:
+                    self.errors[stage] = self.errors.get(stage, 0) + 1
+            event = {'type': 'span', 'stage': stage, 'request_id': request_id,
+                     'duration_ms': round(duration * 1000, 3), **attrs}
+            if error:
+                event['error'] = error
+            self._emit(event)
+
+    def record_usage(self, usage, request_id=None):
+        """Record token counts from an API response.usage object"""
+        counts = {field: getattr(usage, field, None) or 0 for field in TOKEN_FIELDS}
+        with self._lock:
+            for field, value in counts.items():
+                self.tokens[field] += value
+        self._emit({'type': 'usage', 'request_id': request_id, **counts})
+
+    def record_retry(self, attempt, error, delay, request_id=None):
+        with self._lock:
+            self.retries += 1
+        self._emit({'type': 'retry', 'request_id': request_id, 'attempt': attempt,
+                    'error': f"{type(error).__name__}: {error}", 'delay_s': round(delay, 3)})
+
+    def record_queue_wait(self, seconds, request_id=None):
+        with self._lock:
+            self.queue_waits.append(seconds)
+        self._emit({'type': 'queue_wait', 'request_id': request_id, 'wait_ms': round(seconds * 1000, 3)})
+
+    def prometheus_text(self):
+        """Render the run's aggregates in Prometheus text exposition format"""
+        run = self.run_name
+        lines = [
+            '# HELP petition_stage_duration_seconds Time spent per pipeline stage',
+            '# TYPE petition_stage_duration_seconds summary',
+        ]
+        with self._lock:
+            for stage, values in sorted(self.durations.items()):
+                labels = f'run="{run}",stage="{stage}"'
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'petition_stage_duration_seconds{{{labels},quantile="{q}"}} '
+                                 f'{percentile(values, q * 100):.6f}')
+                lines.append(f'petition_stage_duration_seconds_sum{{{labels}}} {sum(values):.6f}')
+                lines.append(f'petition_stage_duration_seconds_count{{{labels}}} {len(values)}')
+
+            lines += ['# HELP petition_stage_errors_total Failed spans per stage',
+                      '# TYPE petition_stage_errors_total counter']
+            for stage, count in sorted(self.errors.items()):
+                lines.append(f'petition_stage_errors_total{{run="{run}",stage="{stage}"}} {count}')
+
+            lines += ['# HELP petition_tokens_total Tokens reported by response.usage',
+                      '# TYPE petition_tokens_total counter']
+            for field, value in self.tokens.items():
+                kind = field.replace('_tokens', '')
+                lines.append(f'petition_tokens_total{{run="{run}",kind="{kind}"}} {value}')
+
+            lines += ['# HELP petition_retries_total API calls retried',
+                      '# TYPE petition_retries_total counter',
+                      f'petition_retries_total{{run="{run}"}} {self.retries}',
+                      '# HELP petition_queue_wait_seconds Time petitions waited for a worker',
+                      '# TYPE petition_queue_wait_seconds summary',
+                      f'petition_queue_wait_seconds_sum{{run="{run}"}} {sum(self.queue_waits):.6f}',
+                      f'petition_queue_wait_seconds_count{{run="{run}"}} {len(self.queue_waits)}']
+        return '\n'.join(lines) + '\n'
+
+    def print_summary(self):
+        """Print a per-stage timing table plus token/retry totals"""
+        print(f"\n⏱  STAGE TIMINGS ({self.run_name}, {time.time() - self.started:.1f}s wall)")
+        print(f"  {'stage':<16} {'count':>6} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        with self._lock:
+            for stage, values in sorted(self.durations.items(), key=lambda item: -sum(item[1])):
+                errors = self.errors.get(stage)
+                print(f"  {stage:<16} {len(values):>6} {sum(values):>9.2f} {sum(values) / len(values) * 1000:>9.1f} "
+                      f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+                      f"{max(values) * 1000:>9.1f}" + (f"  ({errors} errors)" if errors else ''))
+            if any(self.tokens.values()):
+                print("  tokens: " + ', '.join(f"{field.replace('_tokens', '')}={value}"
+                                              for field, value in self.tokens.items()))
+            if self.retries:
+                print(f"  retries: {self.retries}")
+            if self.queue_waits:
+                print(f"  queue wait: mean {sum(self.queue_waits) / len(self.queue_waits) * 1000:.1f} ms, "
+                      f"max {max(self.queue_waits) * 1000:.1f} ms")
+
+    def close(self):
+        """Print the summary, write the Prometheus file and close the trace"""
+        self.print_summary()
+        if self.prometheus_file:
+            with open(self.prometheus_file, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            print(f"  Prometheus metrics written to: {self.prometheus_file}")
+        if self._file:
+            self._file.close()
+            self._file = None
+            print(f"  Trace written to: {self.trace_file}")
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """Return the process-wide tracer"""
+    return _tracer
+
+
+def configure_tracer(run_name, trace_file=None, prometheus_file=None):
+    """Replace the process-wide tracer for a new run"""
+    global _tracer
+    _tracer = Tracer(run_name, trace_file, prometheus_file)
+    return _tracer
+
+
+def add_tracing_args(parser):
+    """Add the --trace/--prometheus options shared by the pipeline scripts"""
+    parser.add_argument('--trace', metavar='FILE', help='Append per-stage spans to this JSONL file')
+    parser.add_argument('--prometheus', metavar='FILE', help='Write Prometheus text metrics at the end of the run')
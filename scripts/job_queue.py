@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Durable SQLite job queue for evaluation runs
+
+Each job is one petition under one prompt version; (request_id, prompt_version)
+is unique, so enqueueing a petition twice or completing it twice is a no-op and
+changing EVALUATION_PROMPT queues fresh jobs next to the old results. Workers
+(evaluator.py --queue) lease the highest-priority job for a fixed time; a lease
+that expires because its worker crashed puts the job back in the queue, and a
+job that fails max_attempts times is moved to the dead-letter state. Workers
+renew their lease while a job runs, so a slow evaluation is not handed out twice.
+
+    python scripts/job_queue.py enqueue --priority 10 --request-ids 123 456
+    python scripts/job_queue.py enqueue --rating 5
+    python scripts/evaluator.py --queue --drain
+    python scripts/job_queue.py status
+    python scripts/job_queue.py export        # done jobs -> results/all_evaluations.json
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+QUEUE_FILE = 'jobs.sqlite'
+DEFAULT_LEASE_SECONDS = 900.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 30.0
+
+STATUSES = ('queued', 'leased', 'done', 'dead')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    request_id INTEGER NOT NULL,
+    rating INTEGER,
+    prompt_version TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    result TEXT,
+    UNIQUE (request_id, prompt_version)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (prompt_version, status, priority DESC, available_at, id);
+"""
+
+
+def prompt_version(prompt):
+    """Short hash identifying a version of the evaluation prompt"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+@dataclass(slots=True)
+class Job:
+    id: int
+    request_id: int
+    rating: int
+    prompt_version: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    lease_owner: str
+    lease_expires: float
+
+
+class JobQueue:
+    """Jobs table in one SQLite file, safe to share between threads and processes"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def _transaction(self, statements):
+        """Run statements(db) inside BEGIN IMMEDIATE, so concurrent workers serialize"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                result = statements(self._db)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+            return result
+
+    def enqueue(self, petitions, version, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Queue petitions under a prompt version; returns the number of new jobs.
+
+        Petitions already queued keep their place but can be raised to a higher
+        priority; done and dead jobs are left alone (see requeue_dead).
+        """
+        now = time.time()
+
+        def insert(db):
+            new = 0
+            for petition in petitions:
+                cursor = db.execute(
+                    'INSERT OR IGNORE INTO jobs (request_id, rating, prompt_version, priority, max_attempts, '
+                    'available_at, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (petition.request_id, petition.rating, version, priority, max_attempts, now, now, now))
+                if cursor.rowcount:
+                    new += 1
+                else:
+                    db.execute(
+                        "UPDATE jobs SET priority = ?, updated_at = ? WHERE request_id = ? AND prompt_version = ? "
+                        "AND status IN ('queued', 'leased') AND priority < ?",
+                        (priority, now, petition.request_id, version, priority))
+            return new
+        return self._transaction(insert)
+
+    def _expire_leases(self, db, now):
+        # A lease that ran out belongs to a crashed or stuck worker
+        db.execute(
+            "UPDATE jobs SET status = 'dead', last_error = 'lease expired', lease_owner = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts", (now, now))
+        db.execute(
+            "UPDATE jobs SET status = 'queued', last_error = 'lease expired', lease_owner = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?", (now, now))
+
+    def lease(self, version, owner=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Claim the next ready job (highest priority, then oldest), or None"""
+        owner = owner or worker_id()
+
+        def claim(db):
+            now = time.time()
+            self._expire_leases(db, now)
+            row = db.execute(
+                "SELECT id FROM jobs WHERE prompt_version = ? AND status = 'queued' AND available_at <= ? "
+                "ORDER BY priority DESC, available_at, id LIMIT 1", (version, now)).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                "updated_at = ? WHERE id = ?", (owner, now + lease_seconds, now, row[0]))
+            return Job(*db.execute(
+                'SELECT id, request_id, rating, prompt_version, priority, attempts, max_attempts, lease_owner, '
+                'lease_expires FROM jobs WHERE id = ?', (row[0],)).fetchone())
+        return self._transaction(claim)
+
+    def extend(self, job, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Renew a lease still held by job.lease_owner; False if it was lost"""
+        def renew(db):
+            now = time.time()
+            cursor = db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'leased' "
+                "AND lease_owner = ?", (now + lease_seconds, now, job.id, job.lease_owner))
+            return cursor.rowcount == 1
+        return self._transaction(renew)
+
+    @contextlib.contextmanager
+    def heartbeat(self, job, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Keep renewing the job's lease every third of lease_seconds while the block runs"""
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(lease_seconds / 3):
+                if not self.extend(job, lease_seconds):
+                    print(f"[queue] request_id={job.request_id}: lease lost, another worker may redo the job")
+                    return
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, job, result):
+        """
+        Store a job's result; False if the job was already done.
+
+        A result that arrives after the lease expired is still accepted as long
+        as no other worker completed the job first.
+        """
+        def finish(db):
+            now = time.time()
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL, "
+                "last_error = NULL, updated_at = ? WHERE id = ? AND status != 'done'",
+                (json.dumps(result, ensure_ascii=False), now, job.id))
+            return cursor.rowcount == 1
+        return self._transaction(finish)
+
+    def release(self, job):
+        """Hand a leased job back untouched, without spending one of its attempts"""
+        def give_back(db):
+            now = time.time()
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now, job.id, job.lease_owner))
+            return cursor.rowcount == 1
+        return self._transaction(give_back)
+
+    def fail(self, job, error, backoff=RETRY_BACKOFF):
+        """Requeue a failed job with exponential backoff, or dead-letter it; returns the new status"""
+        def record(db):
+            now = time.time()
+            row = db.execute('SELECT status, attempts, max_attempts, lease_owner FROM jobs WHERE id = ?',
+                             (job.id,)).fetchone()
+            if row is None:
+                return None
+            if row[0] != 'leased' or row[3] != job.lease_owner:
+                # Done meanwhile, or the lease expired and another worker holds the job now
+                return row[0]
+            status = 'dead' if row[1] >= row[2] else 'queued'
+            db.execute(
+                'UPDATE jobs SET status = ?, last_error = ?, available_at = ?, lease_owner = NULL, '
+                'lease_expires = NULL, updated_at = ? WHERE id = ?',
+                (status, error, now + backoff * 2 ** (row[1] - 1), now, job.id))
+            return status
+        return self._transaction(record)
+
+    def requeue_dead(self, version=None):
+        """Give dead-lettered jobs a fresh set of attempts; returns how many"""
+        def revive(db):
+            now = time.time()
+            query = ("UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+                     "WHERE status = 'dead'")
+            params = [now, now]
+            if version:
+                query += ' AND prompt_version = ?'
+                params.append(version)
+            return db.execute(query, params).rowcount
+        return self._transaction(revive)
+
+    def counts(self, version=None):
+        """{status: jobs} for one prompt version or all of them"""
+        query = 'SELECT status, COUNT(*) FROM jobs'
+        params = ()
+        if version:
+            query += ' WHERE prompt_version = ?'
+            params = (version,)
+        with self._lock:
+            rows = self._db.execute(query + ' GROUP BY status', params).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    def pending(self, version):
+        """Jobs that a worker could still lease, now or after a backoff or an expired lease"""
+        counts = self.counts(version)
+        return counts['queued'] + counts['leased']
+
+    def pending_by_priority(self, version):
+        """(priority > 0, the rest) queued jobs of a prompt version"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COALESCE(SUM(priority > 0), 0), COALESCE(SUM(priority <= 0), 0) FROM jobs "
+                "WHERE prompt_version = ? AND status = 'queued'", (version,)).fetchone()
+        return row[0], row[1]
+
+    def dead_letters(self, version=None):
+        query = ('SELECT request_id, rating, prompt_version, attempts, last_error, updated_at FROM jobs '
+                 "WHERE status = 'dead'")
+        params = ()
+        if version:
+            query += ' AND prompt_version = ?'
+            params = (version,)
+        with self._lock:
+            rows = self._db.execute(query + ' ORDER BY updated_at', params).fetchall()
+        return [dict(zip(('request_id', 'rating', 'prompt_version', 'attempts', 'error', 'updated_at'), row))
+                for row in rows]
+
+    def results(self, version):
+        """Result dicts of the done jobs of a prompt version, by request_id"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT request_id, result FROM jobs WHERE prompt_version = ? AND status = 'done' "
+                'ORDER BY request_id', (version,)).fetchall()
+        return {request_id: json.loads(result) for request_id, result in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the evaluation job queue')
+    parser.add_argument('command', choices=['enqueue', 'status', 'dead', 'requeue-dead', 'export'])
+    parser.add_argument('--queue', help=f'Queue database (default: results/{QUEUE_FILE})')
+    parser.add_argument('--request-ids', type=int, nargs='+', help='enqueue: only these petitions')
+    parser.add_argument('--rating', type=int, help='enqueue: only petitions with this customer rating')
+    parser.add_argument('--priority', type=int, default=0, help='enqueue: higher runs first')
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help='enqueue: attempts before a job is dead-lettered')
+    args = parser.parse_args()
+
+    from evaluator import PROMPT_VERSION
+    from records import EvaluationEntry, PetitionRecord
+
+    project_dir = Path(__file__).parent.parent
+    results_dir = project_dir / 'results'
+    queue = JobQueue(args.queue or results_dir / QUEUE_FILE)
+    with open(project_dir / 'data' / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+        petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
+
+    if args.command == 'enqueue':
+        selected = petitions
+        if args.request_ids:
+            wanted = set(args.request_ids)
+            selected = [p for p in selected if p.request_id in wanted]
+            unknown = wanted - {p.request_id for p in selected}
+            if unknown:
+                print(f"Not in processed_petitions.json: {sorted(unknown)}")
+        if args.rating is not None:
+            selected = [p for p in selected if p.rating == args.rating]
+        new = queue.enqueue(selected, PROMPT_VERSION, args.priority, args.max_attempts)
+        print(f"Enqueued {new} new jobs ({len(selected) - new} already queued or done), "
+              f"prompt version {PROMPT_VERSION}, priority {args.priority}")
+    elif args.command == 'status':
+        counts = queue.counts(PROMPT_VERSION)
+        print(f"Prompt version {PROMPT_VERSION}: " + ', '.join(f'{s}={counts[s]}' for s in STATUSES))
+        others = {s: n - counts[s] for s, n in queue.counts().items() if n - counts[s]}
+        if others:
+            print("Other prompt versions: " + ', '.join(f'{s}={n}' for s, n in others.items()))
+    elif args.command == 'dead':
+        for job in queue.dead_letters():
+            print(f"request_id={job['request_id']} rating={job['rating']} version={job['prompt_version']} "
+                  f"attempts={job['attempts']}: {job['error']}")
+    elif args.command == 'requeue-dead':
+        print(f"Requeued {queue.requeue_dead(PROMPT_VERSION)} dead-lettered jobs")
+    else:
+        by_id = {p.request_id: p for p in petitions}
+        entries = []
+        for request_id, result in queue.results(PROMPT_VERSION).items():
+            entry = EvaluationEntry.from_dict(result)
+            entry.petition = by_id.get(request_id)
+            entries.append(entry)
+        with open(results_dir / 'all_evaluations.json', 'w', encoding='utf-8') as f:
+            json.dump([e.to_dict() for e in entries], f, indent=2, ensure_ascii=False)
+        if entries:
+            from analyze_results import calibration_summary
+            with open(results_dir / 'calibration_summary.json', 'w', encoding='utf-8') as f:
+                json.dump(calibration_summary(entries), f, indent=2, ensure_ascii=False)
+        print(f"Exported {len(entries)} evaluations (prompt version {PROMPT_VERSION}) to {results_dir}")
+    queue.close()
+
+
+if __name__ == '__main__':
+    main()
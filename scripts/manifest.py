@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Download manifest for incremental petition syncs
+
+data/download_manifest.json records, per request_id, the document URL, its
+ETag/Last-Modified validators, the SHA-256 of the DOCX content and of the
+extracted text. download_petitions.py uses it to make conditional requests
+(If-None-Match / If-Modified-Since) and to re-extract only documents whose
+bytes actually changed; the text hash lets evaluator.py skip re-evaluating
+unchanged petitions.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+MANIFEST_FILE = 'download_manifest.json'
+
+# Outcomes of fetch_document
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'          # 200 but identical bytes
+NOT_MODIFIED = 'not_modified'    # 304, nothing transferred
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class Manifest:
+    """Per-request_id download state, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, request_id):
+        return self.entries.get(str(request_id))
+
+    def update(self, request_id, **fields):
+        entry = self.entries.setdefault(str(request_id), {})
+        entry.update(fields)
+        entry['checked_at'] = _now()
+        return entry
+
+    def save(self):
+        tmp = self.path.with_suffix('.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+def fetch_document(url, output_path, entry=None, timeout=30):
+    """
+    Download url to output_path, conditionally when the manifest has validators.
+
+    Returns (status, fields) where status is NEW, CHANGED, UNCHANGED or
+    NOT_MODIFIED and fields are the manifest fields to record. The file on disk
+    is only replaced when its content changed.
+    """
+    output_path = Path(output_path)
+    headers = {}
+    same_url = entry is not None and entry.get('url') == url
+    if same_url and output_path.exists():
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    response = requests.get(url, headers=headers, timeout=timeout, stream=True)
+    if response.status_code == 304:
+        response.close()
+        return NOT_MODIFIED, {'url': url}
+    response.raise_for_status()
+
+    fields = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+    # Hash while streaming to a temp file; only swap it in if the bytes differ
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = output_path.with_suffix(output_path.suffix + '.part')
+    with open(tmp_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=1 << 16):
+            digest.update(chunk)
+            size += len(chunk)
+            f.write(chunk)
+    fields['content_sha256'] = digest.hexdigest()
+    fields['content_length'] = size
+
+    previous_hash = entry.get('content_sha256') if entry else None
+    if previous_hash is None and output_path.exists():
+        previous_hash = sha256_file(output_path)
+
+    if previous_hash == fields['content_sha256'] and output_path.exists():
+        tmp_path.unlink()
+        return UNCHANGED, fields
+
+    os.replace(tmp_path, output_path)
+    fields['changed_at'] = _now()
+    return (CHANGED if previous_hash else NEW), fields
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Structural index of a petition's extracted text
+
+parse_petition() makes one pass over the lines to split the text into sections
+(endereçamento, qualificação, fatos, direito, pedidos, valor da causa,
+encerramento) and one regex scan for entities (legal citations, court
+precedents, monetary values, placeholders). Offsets are kept both as str
+indices and as UTF-8 byte offsets, so sections can be sliced straight out of
+the packed corpus (corpus.py) without decoding the whole petition.
+
+The index also carries the counts analyze_petition_heuristics() used to get by
+rescanning the text, and download_petitions.py persists it per petition in
+petitions/structure_index.json.
+
+    python scripts/petition_structure.py build          # index every processed petition
+    python scripts/petition_structure.py show 123456    # print one petition's sections and entities
+"""
+import argparse
+import json
+import os
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from corpus import open_corpus, read_petition_text
+
+STRUCTURE_INDEX_FILE = 'structure_index.json'
+# Bumped when parsing changes, so stored indexes of unchanged texts are rebuilt
+PARSER_VERSION = 3
+
+SECTION_NAMES = ('enderecamento', 'qualificacao', 'fatos', 'direito', 'pedidos', 'valor_causa', 'encerramento')
+
+# Headings may be numbered ("I –", "2.", "III)") and are matched on short lines only
+_HEADING_PREFIX = r'^(?:(?:[IVXLC]+|\d+(?:\.\d+)*)\s*[-–—.)]+\s*)?'
+HEADING_PATTERNS = [
+    ('fatos', re.compile(_HEADING_PREFIX + r'(?:D[OA]S?\s+)?(?:FATOS?|S[IÍ]NTESE\s+F[ÁA]TICA|RELAT[OÓ]RIO)\b',
+                         re.IGNORECASE)),
+    ('direito', re.compile(_HEADING_PREFIX + r'(?:D[OA]S?\s+)?(?:DIREITO|FUNDAMENTOS?\s+JUR[IÍ]DICOS?|'
+                                             r'FUNDAMENTA[ÇC][ÃA]O|M[ÉE]RITO)\b', re.IGNORECASE)),
+    ('pedidos', re.compile(_HEADING_PREFIX + r'(?:D[OA]S?\s+)?(?:PEDIDOS?|REQUERIMENTOS?)\b', re.IGNORECASE)),
+    ('valor_causa', re.compile(_HEADING_PREFIX + r'(?:D[OA]\s+)?VALOR\s+DA\s+CAUSA\b', re.IGNORECASE)),
+]
+HEADING_MAX_CHARS = 80
+ADDRESS_PATTERN = re.compile(r'^(?:EXCELENT|EXM[OA]|ILUSTR[IÍ]SSIM|AO\s+(?:JU[IÍ]ZO|EXCELENT|EXM|DOUT|MM)|'
+                             r'MM\.?\s+JU[IÍ]Z|MERIT[IÍ]SSIM)', re.IGNORECASE)
+# Sections without a heading of their own start at their opening formula
+VALUE_PATTERN = re.compile(r'^(?:D[áa]-se|Atribui-se)\s+(?:à|a)\s+(?:presente\s+)?causa', re.IGNORECASE)
+CLOSING_PATTERN = re.compile(r'^(?:Nestes|Nesses|Termos\s+em\s+que)\b', re.IGNORECASE)
+
+_ORDINAL = r'(?:[º°ª]|o(?![a-zà-ú]))?'
+_ARTICLE_NUMBER = r'\d+(?:\.\d{3})*' + _ORDINAL
+_ARTICLE_QUALIFIER = (r'(?:§\s*\d+\s*[º°]?|par[áa]grafo\s+[úu]nico|'
+                      r'incisos?\s+[IVXLC]+\b(?:(?:\s*,\s*|\s+e\s+)[IVXLC]+\b)*|[IVXLC]+\b|'
+                      r'al[íi]nea\s+["“]?[a-z]["”]?|caput)')
+# Splits an article's art_qual group back into its qualifiers; a list of incisos is one
+QUALIFIER_PATTERN = re.compile(_ARTICLE_QUALIFIER)
+_LAW = (r'(?:CDC|C[óo]digo\s+de\s+Defesa\s+do\s+Consumidor|C[óo]digo\s+de\s+Processo\s+Civil|C[óo]digo\s+Civil|'
+        r'CPC|CC|CF(?:/88)?|Constitui[çc][ãa]o\s+Federal|Lei\s+(?:n[º°.]*\s*)?\d[\d.]*(?:/\d+)?)(?!\w)')
+_CASE = (r'(?:(?:AgInt|AgRg|EDcl)\s+no\s+)?(?:REsp|AREsp|RE|ARE|AI|HC|MS|Apela[çc][ãa]o(?:\s+C[íi]vel)?)'
+         r'\s+(?:n[º°.]*\s*)?\d(?:[\d.\-/]*\d)?(?:/[A-Z]{2})?')
+
+# One scan finds every entity; the alternatives are tried in order at each position,
+# behind a lookahead on their possible first characters so most positions fail fast
+ENTITY_PATTERN = re.compile(
+    r'(?=[AaSsTtCcREHMLX_\[])'
+    r'(?:(?P<article>(?P<art_kw>(?i:arts?\.|artigos?))'
+    r'(?:\s*(?P<art_num>' + _ARTICLE_NUMBER + r'(?:(?:\s*,\s*|\s+e\s+|\s+a\s+)' + _ARTICLE_NUMBER + r')*)'
+    r'(?P<art_qual>(?:\s*,\s*' + _ARTICLE_QUALIFIER + r')*)'
+    r'(?:,?\s+(?:d[oa]s?)\s+(?P<art_law>' + _LAW + r'))?)?)'
+    r'|(?P<sumula>(?i:s[úu]mula)(?:\s+(?P<sum_vinc>(?i:vinculante)))?(?:\s+(?:n[º°.]*\s*)?(?P<sum_num>\d+))?'
+    r'(?:\s*(?:/|,?\s+d[oa])\s*(?P<sum_court>STJ|STF|TST|TJ[A-Z]{2}))?)'
+    r'|(?P<court>(?P<court_name>(?i:STJ|STF|TJ[A-Z]{2}))(?:\s*[,–-]\s*(?P<court_case>' + _CASE + r'))?)'
+    r'|(?<!\w)(?P<case>' + _CASE + r')'
+    r'|(?P<law>Lei\s+(?:Complementar\s+)?(?:n[º°.]*\s*)?(?P<law_num>\d[\d.]*\d)(?:/(?P<law_year>\d{2,4}))?)'
+    r'|(?P<code>(?i:CDC|Código de Defesa do Consumidor))'
+    r'|(?P<money>R\$\s*[\d.,]+)'
+    r'|(?P<placeholder>_{3,}(?:[.\-/]_{2,})*|\[\s*[A-ZÀ-Ú][A-ZÀ-Ú0-9 /_-]{2,}\]|(?<!\w)X{3,}(?!\w)))'
+)
+
+# The patterns analyze_petition_heuristics() has always counted; each entity match
+# is re-counted with them so the heuristic scores do not change
+LEGACY_ARTICLE = re.compile(r'Art\.|Artigo|art\.')
+LEGACY_JURISPRUDENCE = re.compile(r'STJ|STF|TJ[A-Z]{2}|Súmula', re.IGNORECASE)
+LEGACY_CDC = re.compile(r'CDC|Código de Defesa do Consumidor', re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class Section:
+    name: str
+    start: int
+    end: int
+    byte_start: int
+    byte_end: int
+    heading: str = None
+
+    def to_list(self):
+        return [self.name, self.start, self.end, self.byte_start, self.byte_end, self.heading]
+
+
+@dataclass(slots=True)
+class Entity:
+    """A citation, precedent, monetary value or placeholder found in the text"""
+    kind: str
+    text: str
+    start: int
+    end: int
+    byte_start: int
+    byte_end: int
+    attrs: dict = field(default_factory=dict)
+
+    def to_list(self):
+        return [self.kind, self.text, self.start, self.end, self.byte_start, self.byte_end, self.attrs]
+
+
+@dataclass(slots=True)
+class PetitionIndex:
+    length: int
+    byte_length: int
+    sections: list
+    entities: list
+    features: dict
+
+    def section(self, name):
+        """First section with this name, or None"""
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    def section_text(self, text, name):
+        """Text of a section (all of its occurrences joined), '' when absent"""
+        return '\n'.join(text[s.start:s.end] for s in self.sections if s.name == name)
+
+    def entities_of(self, kind):
+        return [entity for entity in self.entities if entity.kind == kind]
+
+    def to_dict(self):
+        return {
+            'length': self.length,
+            'byte_length': self.byte_length,
+            'sections': [section.to_list() for section in self.sections],
+            'entities': [entity.to_list() for entity in self.entities],
+            'features': self.features,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            length=data['length'],
+            byte_length=data['byte_length'],
+            sections=[Section(*values) for values in data['sections']],
+            entities=[Entity(*values) for values in data['entities']],
+            features=data['features'],
+        )
+
+
+def _heading_section(line):
+    if len(line) > HEADING_MAX_CHARS or line.endswith(('.', ';', ',')):
+        return None
+    for name, pattern in HEADING_PATTERNS:
+        if pattern.match(line):
+            return name
+    return None
+
+
+def _parse_amount(value):
+    """'R$ 12.345,67' -> 12345.67, None when the digits do not form a number"""
+    digits = value[2:].strip().rstrip('.,')
+    try:
+        return float(digits.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _entity_attrs(kind, groups):
+    if kind == 'article':
+        return {key: groups[key] for key in ('art_num', 'art_qual', 'art_law') if groups[key]}
+    if kind == 'sumula':
+        return {key: groups[key] for key in ('sum_vinc', 'sum_num', 'sum_court') if groups[key]}
+    if kind == 'court':
+        attrs = {'court': groups['court_name'].upper()}
+        if groups['court_case']:
+            attrs['case'] = groups['court_case']
+        return attrs
+    if kind == 'case':
+        return {'case': groups['case']}
+    if kind == 'law':
+        return {key: groups[key] for key in ('law_num', 'law_year') if groups[key]}
+    if kind == 'money':
+        return {'amount': _parse_amount(groups['money'])}
+    return {}
+
+
+# Entity kinds as stored in the index
+ENTITY_KINDS = {
+    'article': 'citation',
+    'sumula': 'citation',
+    'law': 'citation',
+    'court': 'precedent',
+    'case': 'precedent',
+    'money': 'money',
+    'placeholder': 'placeholder',
+}
+
+
+def parse_petition(text):
+    """Build the PetitionIndex of a petition's extracted text"""
+    # Lines: char/byte offset of each line start, non-empty count and sections
+    line_starts = []
+    line_bytes = []
+    boundaries = []   # (section name, char start, byte start, heading)
+    paragraphs = 0
+    char_offset = byte_offset = 0
+    current = None
+    for line in text.split('\n'):
+        line_starts.append(char_offset)
+        line_bytes.append(byte_offset)
+        stripped = line.strip()
+        if stripped:
+            paragraphs += 1
+            name = heading = None
+            if current is None:
+                name = 'enderecamento' if ADDRESS_PATTERN.match(stripped) else 'qualificacao'
+            elif current == 'enderecamento' and stripped != stripped.upper():
+                name = 'qualificacao'
+            else:
+                heading_name = _heading_section(stripped)
+                if heading_name:
+                    name, heading = heading_name, stripped
+                elif current not in ('valor_causa', 'encerramento') and VALUE_PATTERN.match(stripped):
+                    name = 'valor_causa'
+                elif current != 'encerramento' and CLOSING_PATTERN.match(stripped):
+                    name = 'encerramento'
+            if name and (name != current or heading):
+                boundaries.append((name, char_offset, byte_offset, heading))
+                current = name
+        char_offset += len(line) + 1
+        byte_offset += (len(line) if line.isascii() else len(line.encode('utf-8'))) + 1
+    byte_length = byte_offset - 1
+
+    sections = []
+    for i, (name, start, byte_start, heading) in enumerate(boundaries):
+        end, byte_end = (boundaries[i + 1][1], boundaries[i + 1][2]) if i + 1 < len(boundaries) else (len(text), byte_length)
+        sections.append(Section(name, start, end, byte_start, byte_end, heading))
+
+    def to_bytes(position):
+        line = bisect_right(line_starts, position) - 1
+        prefix = text[line_starts[line]:position]
+        return line_bytes[line] + (len(prefix) if prefix.isascii() else len(prefix.encode('utf-8')))
+
+    entities = []
+    articles = jurisprudence = cdc = 0
+    has_value = False
+    for match in ENTITY_PATTERN.finditer(text):
+        span = match.group()
+        articles += len(LEGACY_ARTICLE.findall(span))
+        jurisprudence += len(LEGACY_JURISPRUDENCE.findall(span))
+        cdc += len(LEGACY_CDC.findall(span))
+        kind = match.lastgroup
+        groups = match.groupdict()
+        if kind == 'money':
+            has_value = True
+        if kind not in ENTITY_KINDS or (kind == 'article' and not groups['art_num']):
+            continue  # bare "CDC" or "artigo" mentions are counted, not indexed
+        start, end = match.span()
+        byte_start = to_bytes(start)
+        attrs = _entity_attrs(kind, groups)
+        attrs['type'] = kind
+        entities.append(Entity(ENTITY_KINDS[kind], span, start, end, byte_start,
+                               byte_start + len(span.encode('utf-8')), attrs))
+
+    lowered = text.lower()
+    features = {
+        'articles': articles,
+        'jurisprudence': jurisprudence,
+        'cdc': cdc,
+        'paragraphs': paragraphs,
+        'has_parties': 'em desfavor de' in text or 'em face de' in text,
+        'has_requests': 'pedidos' in lowered or 'requer' in lowered,
+        'has_value': has_value,
+        'has_placeholders': '___' in text or '  ' in text,
+    }
+    return PetitionIndex(len(text), byte_length, sections, entities, features)
+
+
+def load_structure_index(petitions_dir):
+    """request_id -> stored entry ({'text_sha256', 'index'}), empty when never built"""
+    path = Path(petitions_dir) / STRUCTURE_INDEX_FILE
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return {int(request_id): entry for request_id, entry in json.load(f).items()}
+
+
+def save_structure_index(petitions_dir, entries):
+    path = Path(petitions_dir) / STRUCTURE_INDEX_FILE
+    tmp = path.with_suffix('.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({str(request_id): entry for request_id, entry in entries.items()}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def lookup_index(entries, petition):
+    """Stored PetitionIndex for a PetitionRecord, None when missing, stale or built from other text"""
+    entry = entries.get(petition.request_id)
+    if entry is None or entry.get('text_sha256') != getattr(petition, 'text_sha256', None):
+        return None
+    if entry.get('parser_version', 1) != PARSER_VERSION:
+        return None
+    return PetitionIndex.from_dict(entry['index'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or inspect the petition structure index')
+    parser.add_argument('command', choices=['build', 'show'])
+    parser.add_argument('request_id', nargs='?', type=int)
+    args = parser.parse_args()
+
+    from manifest import sha256_text
+    from records import PetitionRecord
+
+    project_dir = Path(__file__).parent.parent
+    petitions_dir = project_dir / 'petitions'
+    with open(project_dir / 'data' / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+        petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
+    corpus = open_corpus(petitions_dir)
+
+    if args.command == 'build':
+        entries = {}
+        for petition in petitions:
+            text = read_petition_text(petition, petitions_dir, corpus)
+            entries[petition.request_id] = {'text_sha256': sha256_text(text), 'parser_version': PARSER_VERSION,
+                                            'index': parse_petition(text).to_dict()}
+        save_structure_index(petitions_dir, entries)
+        print(f"Indexed {len(entries)} petitions into {petitions_dir / STRUCTURE_INDEX_FILE}")
+        return
+
+    petition = next((p for p in petitions if p.request_id == args.request_id), None)
+    if petition is None:
+        parser.error(f"request_id {args.request_id} not found in processed_petitions.json")
+    text = read_petition_text(petition, petitions_dir, corpus)
+    index = parse_petition(text)
+    print(f"request_id={petition.request_id} ({index.length} chars, {index.byte_length} bytes)")
+    print("\nSections:")
+    for section in index.sections:
+        print(f"  {section.name:<14} chars {section.start:>7}-{section.end:<7} bytes {section.byte_start:>7}-{section.byte_end:<7}"
+              + (f"  {section.heading}" if section.heading else ''))
+    print("\nEntities:")
+    for entity in index.entities:
+        print(f"  {entity.kind:<12} {entity.byte_start:>7}  {entity.text}")
+    print("\nFeatures: " + ', '.join(f"{key}={value}" for key, value in index.features.items()))
+
+
+if __name__ == '__main__':
+    main()
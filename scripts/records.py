@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory records for petitions and evaluations
+
+Petitions and evaluations are held as __slots__ dataclasses instead of dicts,
+repeated strings (criterion comments, problems) are interned, and eval files
+reference the shared PetitionRecord instead of copying its metadata. ScoreTable
+keeps one fixed-width array row per evaluation for the numeric analyses.
+
+Conversion to and from the JSON schema written by the evaluators is lossless:
+keys not modelled here are kept in `extra`, and absent keys stay absent.
+"""
+import sys
+from array import array
+from dataclasses import dataclass, field
+
+# Criteria in the order used by EVALUATION_PROMPT, with their maximum scores
+CRITERIA = (
+    'estrutura_formatacao',
+    'fundamentacao_juridica',
+    'coerencia_clareza',
+    'qualidade_textual',
+    'personalizacao_contexto',
+    'completude',
+)
+CRITERIA_MAX = (20, 25, 20, 15, 10, 10)
+
+# Marks a key that was absent from the source JSON
+MISSING = type('Missing', (), {'__repr__': lambda self: 'MISSING', '__slots__': ()})()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _split(data, fields):
+    """Pick known fields (MISSING when absent) and collect the rest as extras"""
+    values = [data.get(name, MISSING) for name in fields]
+    extra = {key: value for key, value in data.items() if key not in fields}
+    return values, extra
+
+
+def _join(fields, values, extra):
+    result = {name: value for name, value in zip(fields, values) if value is not MISSING}
+    result.update(extra)
+    return result
+
+
+@dataclass(slots=True)
+class PetitionRecord:
+    """One entry of processed_petitions.json"""
+    request_id: int
+    rating: int
+    docx_file: str = MISSING
+    txt_file: str = MISSING
+    text_length: int = MISSING
+    url: str = MISSING
+    remark: str = MISSING
+    rating_text: str = MISSING
+    text_sha256: str = MISSING
+    extra: dict = field(default_factory=dict)
+
+    FIELDS = ('request_id', 'rating', 'docx_file', 'txt_file', 'text_length', 'url', 'remark', 'rating_text',
+              'text_sha256')
+
+    @classmethod
+    def from_dict(cls, data):
+        values, extra = _split(data, cls.FIELDS)
+        return cls(*values, extra=extra)
+
+    def to_dict(self):
+        return _join(self.FIELDS, (getattr(self, name) for name in self.FIELDS), self.extra)
+
+
+@dataclass(slots=True)
+class CriterionScore:
+    """One criterion of an evaluation breakdown"""
+    score: int = MISSING
+    max: int = MISSING
+    comentario: str = MISSING
+    extra: dict = field(default_factory=dict)
+
+    FIELDS = ('score', 'max', 'comentario')
+
+    @classmethod
+    def from_dict(cls, data):
+        (score, max_score, comentario), extra = _split(data, cls.FIELDS)
+        return cls(score, max_score, _intern(comentario), extra)
+
+    def to_dict(self):
+        return _join(self.FIELDS, (self.score, self.max, self.comentario), self.extra)
+
+
+@dataclass(slots=True)
+class EvaluationRecord:
+    """The evaluation JSON returned by the model (or the heuristic evaluator)"""
+    score: int = MISSING
+    breakdown: dict = MISSING
+    problemas: list = MISSING
+    pontos_fortes: list = MISSING
+    summary: str = MISSING
+    extra: dict = field(default_factory=dict)
+
+    FIELDS = ('score', 'breakdown', 'problemas', 'pontos_fortes', 'summary')
+
+    @classmethod
+    def from_dict(cls, data):
+        (score, breakdown, problemas, pontos_fortes, summary), extra = _split(data, cls.FIELDS)
+        if isinstance(breakdown, dict):
+            breakdown = {
+                _intern(name): CriterionScore.from_dict(value) if isinstance(value, dict) else value
+                for name, value in breakdown.items()
+            }
+        if isinstance(problemas, list):
+            problemas = [_intern(p) for p in problemas]
+        if isinstance(pontos_fortes, list):
+            pontos_fortes = [_intern(p) for p in pontos_fortes]
+        return cls(score, breakdown, problemas, pontos_fortes, summary, extra)
+
+    def to_dict(self):
+        breakdown = self.breakdown
+        if isinstance(breakdown, dict):
+            breakdown = {
+                name: value.to_dict() if isinstance(value, CriterionScore) else value
+                for name, value in breakdown.items()
+            }
+        values = (self.score, breakdown, self.problemas, self.pontos_fortes, self.summary)
+        return _join(self.FIELDS, values, self.extra)
+
+    def criterion_scores(self):
+        """Scores for CRITERIA in order, None where missing or non-numeric"""
+        scores = []
+        breakdown = self.breakdown if isinstance(self.breakdown, dict) else {}
+        for name in CRITERIA:
+            criterion = breakdown.get(name)
+            value = criterion.score if isinstance(criterion, CriterionScore) else None
+            scores.append(value if isinstance(value, (int, float)) and not isinstance(value, bool) else None)
+        return scores
+
+
+@dataclass(slots=True)
+class EvaluationEntry:
+    """One entry of all_evaluations.json; `petition` backs the eval file's metadata"""
+    request_id: int
+    customer_rating: int
+    ai_score: int = MISSING
+    evaluation: EvaluationRecord = MISSING
+    text_length: int = MISSING
+    method: str = MISSING
+    exemplar: bool = MISSING
+    extra: dict = field(default_factory=dict)
+    petition: PetitionRecord = None
+
+    FIELDS = ('request_id', 'customer_rating', 'ai_score', 'evaluation', 'text_length', 'method', 'exemplar')
+
+    @classmethod
+    def from_dict(cls, data):
+        values, extra = _split(data, cls.FIELDS)
+        if isinstance(values[3], dict):
+            values[3] = EvaluationRecord.from_dict(values[3])
+        values[5] = _intern(values[5])
+        return cls(*values, extra=extra)
+
+    def to_dict(self):
+        values = [getattr(self, name) for name in self.FIELDS]
+        if isinstance(values[3], EvaluationRecord):
+            values[3] = values[3].to_dict()
+        return _join(self.FIELDS, values, self.extra)
+
+    def to_eval_file_dict(self):
+        """The individual eval_*.json payload"""
+        result = {
+            'request_id': self.request_id,
+            'customer_rating': self.customer_rating,
+            'evaluation': self.evaluation.to_dict(),
+            'metadata': self.petition.to_dict(),
+        }
+        if self.method is not MISSING:
+            result['method'] = self.method
+        if self.exemplar is not MISSING:
+            result['exemplar'] = self.exemplar
+        return result
+
+    @classmethod
+    def from_eval_file_dict(cls, data, petitions=None):
+        """Rebuild an entry from an eval_*.json payload, sharing PetitionRecords by request_id"""
+        metadata = data.get('metadata')
+        petition = None
+        if petitions is not None:
+            petition = petitions.get(data['request_id'])
+        if petition is None and isinstance(metadata, dict):
+            petition = PetitionRecord.from_dict(metadata)
+            if petitions is not None:
+                petitions[petition.request_id] = petition
+        evaluation = EvaluationRecord.from_dict(data['evaluation'])
+        return cls(
+            request_id=data['request_id'],
+            customer_rating=data['customer_rating'],
+            ai_score=evaluation.score,
+            evaluation=evaluation,
+            text_length=petition.text_length if petition else MISSING,
+            method=_intern(data.get('method', MISSING)),
+            exemplar=data.get('exemplar', MISSING),
+            petition=petition,
+        )
+
+    @property
+    def problemas(self):
+        evaluation = self.evaluation
+        if isinstance(evaluation, EvaluationRecord) and isinstance(evaluation.problemas, list):
+            return evaluation.problemas
+        return []
+
+
+class ScoreTable:
+    """
+    Array-backed score table with one fixed-width row per evaluation.
+
+    Columns: request_id (int64), customer_rating (int8), ai_score (float64) and
+    the six CRITERIA scores (float64, row-major). Missing values are stored as
+    -1; scores stay exact, since multi-sample means are fractional.
+    """
+
+    def __init__(self):
+        self.request_ids = array('q')
+        self.customer_ratings = array('b')
+        self.ai_scores = array('d')
+        self.criteria = array('d')
+
+    def __len__(self):
+        return len(self.request_ids)
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return -1.0
+        return float(value)
+
+    def append(self, entry):
+        self.request_ids.append(entry.request_id)
+        self.customer_ratings.append(entry.customer_rating)
+        self.ai_scores.append(self._cell(entry.ai_score))
+        evaluation = entry.evaluation
+        if isinstance(evaluation, EvaluationRecord):
+            scores = evaluation.criterion_scores()
+        else:
+            scores = [None] * len(CRITERIA)
+        self.criteria.extend(self._cell(score) for score in scores)
+
+    @classmethod
+    def from_entries(cls, entries):
+        table = cls()
+        for entry in entries:
+            table.append(entry)
+        return table
+
+    def row(self, index):
+        """Criterion scores of one evaluation as a tuple"""
+        width = len(CRITERIA)
+        return tuple(self.criteria[index * width:(index + 1) * width])
+
+    def criterion_column(self, name):
+        """All scores for one criterion, in row order"""
+        return self.criteria[CRITERIA.index(name)::len(CRITERIA)]
+
+    def rows_by_rating(self):
+        """Map customer rating -> list of row indices, in row order"""
+        groups = {}
+        for index, rating in enumerate(self.customer_ratings):
+            groups.setdefault(rating, []).append(index)
+        return groups
+
+    def scores_for(self, rows):
+        """AI scores of the given rows, without missing values"""
+        return [score for score in (self.ai_scores[i] for i in rows) if score >= 0]
+
+    def rated_scores(self):
+        """(customer ratings, AI scores) of the rows that have an AI score, paired for correlation"""
+        rows = [i for i, score in enumerate(self.ai_scores) if score >= 0]
+        return [self.customer_ratings[i] for i in rows], [self.ai_scores[i] for i in rows]
+
+    def criterion_means(self, rows):
+        """Mean score per criterion over the given rows, ignoring missing values"""
+        width = len(CRITERIA)
+        means = {}
+        for offset, name in enumerate(CRITERIA):
+            values = [self.criteria[i * width + offset] for i in rows]
+            values = [v for v in values if v >= 0]
+            means[name] = sum(values) / len(values) if values else None
+        return means
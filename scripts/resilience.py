@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Retry, backoff and circuit breaker helpers for Anthropic API calls
+"""
+import random
+import threading
+import time
+
+# Status codes worth retrying: request timeout, conflict, rate limit,
+# server errors and Anthropic's 529 "overloaded"
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class RetryBudgetExceeded(Exception):
+    """Raised when the run-level retry budget has been used up"""
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker refuses a call"""
+
+
+def get_status_code(exc):
+    """Return the HTTP status code carried by an API exception, if any"""
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        response = getattr(exc, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status
+
+
+def get_retry_after(exc):
+    """Return the server-requested delay (seconds) from a retry-after header"""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    # Anthropic sends a millisecond variant alongside the standard header
+    value = headers.get('retry-after-ms')
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form is not used by the API, treat it as absent
+        return None
+
+
+def is_retryable(exc, retry_on=()):
+    """Check whether an exception is a transient failure worth retrying"""
+    if retry_on and isinstance(exc, retry_on):
+        return True
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return get_status_code(exc) in RETRYABLE_STATUS_CODES
+
+
+class RetryBudget:
+    """Per-run cap on the total number of retries shared by all workers"""
+
+    def __init__(self, max_retries=100):
+        self.max_retries = max_retries
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Consume one retry, returning False when the budget is exhausted"""
+        with self._lock:
+            if self.max_retries is not None and self.used >= self.max_retries:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def remaining(self):
+        if self.max_retries is None:
+            return None
+        return max(0, self.max_retries - self.used)
+
+
+class CircuitBreaker:
+    """
+    Shared breaker that pauses every worker during a sustained outage.
+
+    After `failure_threshold` consecutive transient failures the circuit opens
+    and callers block in `before_call` until `reset_timeout` has elapsed. Then a
+    single probe call is let through (half-open); its outcome closes the circuit
+    or re-opens it with a doubled timeout, capped at `max_reset_timeout`.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=300.0,
+                 max_wait=None, clock=time.monotonic, sleep=time.sleep):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.max_wait = max_wait
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Block while the circuit is open; raise CircuitOpenError past max_wait"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self.state == self.CLOSED:
+                    return
+
+                if self.state == self.OPEN:
+                    remaining = self.opened_at + self.reset_timeout - self._clock()
+                    if remaining <= 0:
+                        self.state = self.HALF_OPEN
+                        self._probe_in_flight = False
+
+                if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    return
+
+                if self.state == self.OPEN:
+                    delay = remaining
+                else:
+                    # Another worker is probing, check back shortly
+                    delay = 0.5
+
+            if self.max_wait is not None and waited + delay > self.max_wait:
+                raise CircuitOpenError(f"Circuit open, API unavailable for over {self.max_wait:.0f}s")
+            self._sleep(delay)
+            waited += delay
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self._probe_in_flight = False
+
+    def record_ignored(self):
+        """An outcome that says nothing about availability (e.g. a 400): free the probe slot, keep the state"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN:
+                # Probe failed, back off harder before the next one
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = self._clock()
+        self.times_opened += 1
+        self._probe_in_flight = False
+        print(f"  ⚠ Circuit opened after {self.consecutive_failures} consecutive failures, "
+              f"pausing calls for {self.reset_timeout:.0f}s")
+
+
+class RetryPolicy:
+    """Jittered exponential backoff that honors retry-after headers"""
+
+    def __init__(self, max_attempts=6, base_delay=1.0, max_delay=60.0,
+                 budget=None, breaker=None, retry_on=(), sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.breaker = breaker
+        self.retry_on = retry_on
+        self._sleep = sleep
+
+    def compute_delay(self, attempt, exc=None):
+        """Full-jitter backoff for the given (1-based) attempt, or retry-after if larger"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        retry_after = get_retry_after(exc) if exc is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def call(self, fn, *args, on_retry=None, **kwargs):
+        """
+        Call fn(*args, **kwargs), retrying transient failures.
+
+        on_retry(attempt, exc, delay) is invoked before each sleep. Non-retryable
+        errors propagate immediately; the last transient error propagates once
+        attempts or the retry budget run out.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.breaker:
+                self.breaker.before_call()
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e, self.retry_on):
+                    if self.breaker:
+                        # Not an availability problem; don't leave a probe hanging
+                        self.breaker.record_ignored()
+                    raise
+
+                if self.breaker:
+                    self.breaker.record_failure()
+                if attempt >= self.max_attempts:
+                    raise
+                if self.budget and not self.budget.acquire():
+                    raise RetryBudgetExceeded(f"Retry budget of {self.budget.max_retries} exhausted") from e
+
+                delay = self.compute_delay(attempt, e)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                self._sleep(delay)
+                continue
+
+            if self.breaker:
+                self.breaker.record_success()
+            return result
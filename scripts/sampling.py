@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Multi-sample evaluation for estimating score variance
+
+evaluate_petition samples the model at temperature 0.3, so one call says
+nothing about how stable a score is near the 85 threshold. SamplingPolicy runs
+a first batch of samples concurrently and stops there when they agree or their
+mean is far from the threshold; otherwise it fires the rest of the k samples
+concurrently. Each sample takes a slot of the run's concurrency gate, so
+--samples does not multiply the concurrency set by --workers. The merged
+evaluation carries the mean total and criterion scores, the comments of the
+sample closest to the mean, and a `sampling` block with mean, variance and
+pairwise agreement per criterion.
+"""
+import copy
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+from records import CRITERIA, CRITERIA_MAX
+
+THRESHOLD = 85
+DEFAULT_TOLERANCE = 5.0
+DEFAULT_MARGIN = 15.0
+FIRST_BATCH = 2
+
+
+def agreement(values, tolerance):
+    """Fraction of sample pairs whose scores differ by at most tolerance"""
+    pairs = list(combinations(values, 2))
+    if not pairs:
+        return 1.0
+    return sum(1 for a, b in pairs if abs(a - b) <= tolerance) / len(pairs)
+
+
+def describe(values, tolerance):
+    """mean, variance, stdev, range and agreement of one score over the samples"""
+    variance = statistics.variance(values) if len(values) > 1 else 0.0
+    return {
+        'mean': round(statistics.mean(values), 2),
+        'variance': round(variance, 2),
+        'stdev': round(variance ** 0.5, 2),
+        'min': min(values),
+        'max': max(values),
+        'agreement': round(agreement(values, tolerance), 3),
+    }
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _criterion_score(evaluation, name):
+    criterion = (evaluation.get('breakdown') or {}).get(name)
+    value = criterion.get('score') if isinstance(criterion, dict) else None
+    return value if _number(value) else None
+
+
+def summarize(evaluations, tolerance=DEFAULT_TOLERANCE, threshold=THRESHOLD):
+    """
+    Per-sample statistics of the total and of each criterion.
+
+    tolerance is in points of the 0-100 total; criteria use the same share of
+    their own maximum (5 points of 100 -> 1.25 of 25).
+    """
+    scores = [e['score'] for e in evaluations]
+    summary = {
+        'samples': len(scores),
+        'scores': scores,
+        'score': describe(scores, tolerance),
+        'above_threshold': round(sum(1 for s in scores if s >= threshold) / len(scores), 3),
+        'criteria': {},
+    }
+    for name, max_score in zip(CRITERIA, CRITERIA_MAX):
+        values = [v for v in (_criterion_score(e, name) for e in evaluations) if v is not None]
+        if values:
+            summary['criteria'][name] = describe(values, tolerance * max_score / 100)
+    return summary
+
+
+def stop_reason(scores, samples, tolerance=DEFAULT_TOLERANCE, margin=DEFAULT_MARGIN, threshold=THRESHOLD):
+    """Why sampling can stop after these scores, or None to keep sampling"""
+    if not scores:
+        return None
+    if abs(statistics.mean(scores) - threshold) >= margin:
+        return 'far_from_threshold'
+    same_side = len({s >= threshold for s in scores}) == 1
+    if len(scores) > 1 and same_side and agreement(scores, tolerance) == 1.0:
+        return 'agreement'
+    if len(scores) >= samples:
+        return 'max_samples'
+    return None
+
+
+def merge_samples(evaluations, summary):
+    """The sample closest to the mean, with mean scores and the sampling statistics"""
+    mean = summary['score']['mean']
+    closest = min(evaluations, key=lambda e: abs(e['score'] - mean))
+    merged = copy.deepcopy(closest)
+    merged['score'] = round(mean, 1)
+    for name, stats in summary['criteria'].items():
+        criterion = (merged.get('breakdown') or {}).get(name)
+        if isinstance(criterion, dict):
+            criterion['score'] = round(stats['mean'], 1)
+    merged['sampling'] = summary
+    return merged
+
+
+class SamplingPolicy:
+    """
+    Up to `samples` concurrent evaluations of one petition, with early stopping.
+
+    gate (acquire/release, e.g. budget.ConcurrencyGate) bounds the samples in
+    flight across all petitions; the caller must not hold a slot of it itself.
+    """
+
+    def __init__(self, samples, tolerance=DEFAULT_TOLERANCE, margin=DEFAULT_MARGIN, threshold=THRESHOLD, gate=None):
+        self.samples = samples
+        self.tolerance = tolerance
+        self.margin = margin
+        self.threshold = threshold
+        self.gate = gate
+
+    def _batch(self, evaluate, count, gate):
+        def sample(_):
+            if gate is None:
+                return evaluate()
+            gate.acquire()
+            try:
+                return evaluate()
+            finally:
+                gate.release()
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            results = list(executor.map(sample, range(count)))
+        return [r for r in results if isinstance(r, dict) and _number(r.get('score'))]
+
+    def evaluate(self, evaluate, gate=None):
+        """
+        Merged evaluation of up to self.samples calls of evaluate(), or None.
+
+        evaluate() returns one evaluation dict, or None when the call failed;
+        failed samples are left out of the statistics. gate overrides
+        self.gate (e.g. the budget controller's).
+        """
+        gate = gate or self.gate
+        attempted = min(FIRST_BATCH, self.samples)
+        evaluations = self._batch(evaluate, attempted, gate)
+        scores = [e['score'] for e in evaluations]
+        reason = stop_reason(scores, self.samples, self.tolerance, self.margin, self.threshold)
+        if reason is None and attempted < self.samples:
+            evaluations += self._batch(evaluate, self.samples - attempted, gate)
+            scores = [e['score'] for e in evaluations]
+            reason = stop_reason(scores, self.samples, self.tolerance, self.margin, self.threshold) or 'max_samples'
+        if not evaluations:
+            return None
+        summary = summarize(evaluations, self.tolerance, self.threshold)
+        summary['requested'] = self.samples
+        summary['stopped'] = reason or 'max_samples'
+        return merge_samples(evaluations, summary)
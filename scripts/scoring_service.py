@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Local HTTP scoring service for on-demand petition evaluation
+
+Endpoints:
+    POST /score        {"text": "..."}             -> evaluation JSON
+    POST /score/batch  {"texts": ["...", ...]}     -> {"results": [...]}
+    GET  /metrics                                  -> per-endpoint latency histograms
+    GET  /health                                   -> {"status": "ok", "backend": "..."}
+
+Concurrent submissions of the same text share one in-flight evaluation, and
+requests arriving close together are grouped into micro-batches before being
+handed to the backend. Run offline with the heuristic backend:
+
+    python scripts/scoring_service.py --backend heuristic --port 8080
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error', 502: 'Bad Gateway'}
+
+
+class PayloadTooLarge(ValueError):
+    """Raised by read_request for a body over max_body; other ValueErrors are malformed requests"""
+
+
+class HeuristicBackend:
+    """Offline backend using the mock heuristic evaluator"""
+    name = 'heuristic'
+
+    def __init__(self):
+        from evaluator_mock import analyze_petition_heuristics
+        self._analyze = analyze_petition_heuristics
+
+    def evaluate(self, text):
+        return self._analyze(text)
+
+    def evaluate_batch(self, texts):
+        # Cheap and CPU-bound: one executor hop for the whole batch
+        return [self.evaluate(text) for text in texts]
+
+
+class ClaudeBackend:
+    """Backend calling Claude through evaluator.evaluate_petition"""
+    name = 'claude'
+
+    def __init__(self, max_concurrency=8):
+        from evaluator import evaluate_petition
+        self._evaluate = evaluate_petition
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def evaluate(self, text):
+        evaluation = self._evaluate(text)
+        if evaluation is None:
+            raise RuntimeError('Claude evaluation failed')
+        return evaluation
+
+    def evaluate_batch(self, texts):
+        # Network-bound: fan the batch out over the pooled client
+        futures = [self._pool.submit(self.evaluate, text) for text in texts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+BACKENDS = {
+    'heuristic': HeuristicBackend,
+    'claude': ClaudeBackend,
+}
+
+
+def load_backend(spec):
+    """Instantiate a backend by registry name or 'module:ClassName' spec"""
+    if spec in BACKENDS:
+        return BACKENDS[spec]()
+    if ':' in spec:
+        module_name, attr = spec.split(':', 1)
+        return getattr(importlib.import_module(module_name), attr)()
+    raise ValueError(f"Unknown backend '{spec}' (choose from {', '.join(BACKENDS)} or module:Class)")
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-th quantile"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        cumulative = []
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            cumulative.append({'le': bound, 'count': seen})
+        cumulative.append({'le': '+Inf', 'count': self.count})
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'avg': round(self.total / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': cumulative,
+        }
+
+
+class MicroBatcher:
+    """Groups evaluation requests into small batches handed to the backend"""
+
+    def __init__(self, backend, executor, max_batch=8, max_wait=0.01):
+        self.backend = backend
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, text):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            asyncio.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, self.backend.evaluate_batch, texts)
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class ScoringService:
+    """Request coalescing, micro-batching and metrics around a backend"""
+
+    def __init__(self, backend, max_batch=8, max_wait=0.01, workers=4):
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.batcher = MicroBatcher(backend, self.executor, max_batch=max_batch, max_wait=max_wait)
+        self.in_flight = {}
+        self.coalesced = 0
+        self.histograms = {}
+
+    def start(self):
+        self.batcher.start()
+
+    async def score(self, text):
+        """Evaluate text, sharing the result with identical in-flight requests"""
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self.batcher.submit(text))
+        self.in_flight[key] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def observe(self, endpoint, seconds):
+        histogram = self.histograms.get(endpoint)
+        if histogram is None:
+            histogram = self.histograms[endpoint] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def metrics(self):
+        return {
+            'backend': self.backend.name,
+            'coalesced_requests': self.coalesced,
+            'in_flight': len(self.in_flight),
+            'batches': self.batcher.batches,
+            'endpoints': {name: h.snapshot() for name, h in sorted(self.histograms.items())},
+        }
+
+    async def route(self, method, path, body):
+        """Dispatch one request; returns (status, payload)"""
+        if path == '/health':
+            return 200, {'status': 'ok', 'backend': self.backend.name}
+        if path == '/metrics':
+            return 200, self.metrics()
+        if path not in ('/score', '/score/batch'):
+            return 404, {'error': f"Unknown endpoint {path}"}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+
+        try:
+            request = json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            return 400, {'error': f"Invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return 400, {'error': 'The request body must be a JSON object'}
+
+        if path == '/score':
+            text = request.get('text')
+            if not isinstance(text, str) or not text.strip():
+                return 400, {'error': "Field 'text' is required"}
+            try:
+                return 200, await self.score(text)
+            except Exception as e:
+                return 502, {'error': f"{type(e).__name__}: {e}"}
+
+        texts = request.get('texts')
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return 400, {'error': "Field 'texts' must be a list of strings"}
+        outcomes = await asyncio.gather(*(self.score(t) for t in texts), return_exceptions=True)
+        results = [
+            {'error': f"{type(o).__name__}: {o}"} if isinstance(o, Exception) else o
+            for o in outcomes
+        ]
+        return 200, {'results': results}
+
+
+async def read_request(reader, max_body):
+    """Parse one HTTP/1.1 request; returns None on EOF"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ValueError(f"malformed request line {request_line.decode('latin-1').strip()[:80]!r}")
+    method, target, version = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise ValueError(f"invalid Content-Length {headers['content-length']!r}")
+    if length < 0:
+        raise ValueError(f"invalid Content-Length {length}")
+    if length > max_body:
+        raise PayloadTooLarge('payload too large')
+    body = await reader.readexactly(length) if length else b''
+    keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+    return method, target.split('?', 1)[0], body, keep_alive
+
+
+def write_response(writer, status, payload, keep_alive):
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + data)
+
+
+def make_handler(service, max_body=5 * 1024 * 1024):
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, max_body)
+                except PayloadTooLarge:
+                    write_response(writer, 413, {'error': 'Payload too large'}, False)
+                    break
+                except ValueError as e:
+                    write_response(writer, 400, {'error': f"Bad request: {e}"}, False)
+                    break
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+
+                started = time.perf_counter()
+                try:
+                    status, payload = await service.route(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                if path.startswith('/score'):
+                    service.observe(f"{method} {path}", time.perf_counter() - started)
+
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(service, host, port):
+    service.start()
+    server = await asyncio.start_server(make_handler(service), host, port)
+    print(f"Scoring service ({service.backend.name} backend) listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP scoring service for petitions')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--backend', default='claude', help="'claude', 'heuristic' or module:Class")
+    parser.add_argument('--max-batch', type=int, default=8, help='Maximum requests per micro-batch')
+    parser.add_argument('--batch-wait-ms', type=float, default=10.0, help='How long to wait to fill a batch')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent backend batches')
+    args = parser.parse_args()
+
+    service = ScoringService(
+        load_backend(args.backend),
+        max_batch=args.max_batch,
+        max_wait=args.batch_wait_ms / 1000,
+        workers=args.workers,
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
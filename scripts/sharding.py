@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Deterministic sharding of the petition list and per-shard result journals
+
+shard_for() assigns each request_id to one of N shards by hash, so any number
+of evaluator.py processes (on one host or several sharing a directory) split
+processed_petitions.json without coordination. Each shard appends its results
+to its own JSONL journal (shard-<i>-of-<N>.jsonl), which survives crashes: a
+restarted shard skips petitions it already evaluated, and coordinator.py
+merges the journals into all_evaluations.json.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+JOURNAL_PATTERN = re.compile(r'^shard-(\d+)-of-(\d+)\.jsonl$')
+
+
+def shard_for(request_id, shards):
+    """Shard index in [0, shards) for a request_id, stable across processes and hosts"""
+    digest = hashlib.sha256(str(request_id).encode('ascii')).digest()
+    return int.from_bytes(digest[:8], 'big') % shards
+
+
+def parse_shard(spec):
+    """'2/8' -> (2, 8)"""
+    match = re.fullmatch(r'(\d+)/(\d+)', spec.strip())
+    if not match:
+        raise ValueError(f"Invalid shard {spec!r}, expected INDEX/COUNT such as 0/4")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}, index must be in [0, {count})")
+    return index, count
+
+
+def journal_path(journal_dir, index, count):
+    return Path(journal_dir) / f'shard-{index}-of-{count}.jsonl'
+
+
+def shard_api_key(index):
+    """Per-shard API key from ANTHROPIC_API_KEY_SHARD_<index>, if configured"""
+    return os.environ.get(f'ANTHROPIC_API_KEY_SHARD_{index}')
+
+
+def read_journal(path):
+    """request_id -> last record in one journal; a torn final line is ignored"""
+    records = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record['request_id']] = record
+    return records
+
+
+def find_journals(journal_dir, count=None):
+    """{shard count: [paths]} of the journals in a directory, optionally for one count"""
+    journals = {}
+    for path in sorted(Path(journal_dir).glob('shard-*-of-*.jsonl')):
+        match = JOURNAL_PATTERN.match(path.name)
+        if match and (count is None or int(match.group(2)) == count):
+            journals.setdefault(int(match.group(2)), []).append(path)
+    return journals
+
+
+def is_current(record, petition):
+    """True when a journal record was made from the petition's current text"""
+    text_sha256 = petition.text_sha256 if isinstance(petition.text_sha256, str) else None
+    return record.get('text_sha256') == text_sha256
+
+
+class ShardJournal:
+    """Append-only JSONL journal of one shard's results"""
+
+    def __init__(self, journal_dir, index, count):
+        self.index = index
+        self.count = count
+        self.path = journal_path(journal_dir, index, count)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.previous = read_journal(self.path) if self.path.exists() else {}
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def is_done(self, petition):
+        """True when this petition's current text already has a successful record"""
+        record = self.previous.get(petition.request_id)
+        return record is not None and record.get('status') == 'ok' and is_current(record, petition)
+
+    def _append(self, record):
+        line = json.dumps({'shard': f'{self.index}/{self.count}', **record}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record_success(self, entry):
+        text_sha256 = entry.petition.text_sha256 if entry.petition else None
+        self._append({
+            'request_id': entry.request_id,
+            'status': 'ok',
+            'text_sha256': text_sha256 if isinstance(text_sha256, str) else None,
+            'entry': entry.to_dict(),
+        })
+
+    def record_failure(self, petition, error):
+        text_sha256 = petition.text_sha256 if isinstance(petition.text_sha256, str) else None
+        self._append({'request_id': petition.request_id, 'status': 'failed', 'rating': petition.rating,
+                      'text_sha256': text_sha256, 'error': error})
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+TF-IDF similarity search over the petition corpus
+
+Term counts of every petition are kept in a CSR sparse matrix (indptr/indices/
+counts NumPy arrays) persisted to data/similarity_index.npz together with the
+vocabulary and each petition's text_sha256. Rebuilding only tokenizes petitions
+whose text is new or changed; IDF weights and row norms are recomputed from the
+counts with vectorized array operations, and cosine top-k search is a sparse
+matrix-vector product over the whole corpus. Everything runs offline on CPU.
+
+    python scripts/similarity.py build
+    python scripts/similarity.py similar 123456 -k 5 --rating 5
+"""
+import argparse
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+SIMILARITY_INDEX_FILE = 'similarity_index.npz'
+
+TOKEN_PATTERN = re.compile(r'[a-zà-ÿ]{3,}')
+STOPWORDS = frozenset("""
+    que com por para uma dos das nos nas pela pelo pelos pelas como mais sua seu suas seus sem sob
+    ser são foi não também ainda este esta estes estas esse essa esses essas isso isto aquele aquela
+    qual quais quando onde bem já mesmo entre até após sobre tem ter nem seja pois assim porém
+    """.split())
+
+
+def tokenize(text):
+    """Lowercased word tokens of 3+ letters, without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class SimilarityIndex:
+    """Sparse TF-IDF matrix over the corpus, one row per petition"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.request_ids = np.zeros(0, dtype=np.int64)
+        self.text_hashes = np.zeros(0, dtype='U64')
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.counts = np.zeros(0, dtype=np.float32)
+        self.vocabulary = {}
+        self._weights = None
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as data:
+                self.request_ids = data['request_ids']
+                self.text_hashes = data['text_hashes']
+                self.indptr = data['indptr']
+                self.indices = data['indices']
+                self.counts = data['counts']
+                self.vocabulary = {term: i for i, term in enumerate(data['vocabulary'].tolist())}
+
+    def __len__(self):
+        return len(self.request_ids)
+
+    def row_of(self, request_id):
+        rows = np.flatnonzero(self.request_ids == request_id)
+        return int(rows[0]) if len(rows) else None
+
+    def _term_ids(self, tokens, grow):
+        counts = Counter(tokens)
+        ids, values = [], []
+        for term, count in counts.items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                if not grow:
+                    continue
+                term_id = self.vocabulary[term] = len(self.vocabulary)
+            ids.append(term_id)
+            values.append(count)
+        order = np.argsort(ids)
+        return np.asarray(ids, dtype=np.int32)[order], np.asarray(values, dtype=np.float32)[order]
+
+    def update(self, documents):
+        """Add or replace rows for (request_id, text_sha256, get_text) triples.
+
+        get_text() is only called when the petition is new or its text_sha256
+        changed. Returns the number of rows (re)tokenized.
+        """
+        current = dict(zip(self.request_ids.tolist(), self.text_hashes.tolist()))
+        replaced = {}
+        for request_id, text_sha256, get_text in documents:
+            if text_sha256 is not None and current.get(request_id) == text_sha256:
+                continue
+            replaced[request_id] = (text_sha256 or '', *self._term_ids(tokenize(get_text()), grow=True))
+        if replaced:
+            keep = ~np.isin(self.request_ids, list(replaced))
+            self._rebuild(keep, replaced)
+        return len(replaced)
+
+    def retain(self, request_ids):
+        """Drop rows of petitions no longer in the corpus"""
+        keep = np.isin(self.request_ids, list(request_ids))
+        if not keep.all():
+            self._rebuild(keep, {})
+
+    def _rebuild(self, keep, new_rows):
+        lengths = np.diff(self.indptr)
+        row_of_entry = np.repeat(np.arange(len(self.request_ids)), lengths)
+        entry_mask = keep[row_of_entry]
+        new_items = list(new_rows.items())
+        self.request_ids = np.concatenate([self.request_ids[keep],
+                                           np.asarray([r for r, _ in new_items], dtype=np.int64)])
+        self.text_hashes = np.concatenate([self.text_hashes[keep],
+                                           np.asarray([h for _, (h, _, _) in new_items], dtype='U64')])
+        self.indices = np.concatenate([self.indices[entry_mask]] + [ids for _, (_, ids, _) in new_items])
+        self.counts = np.concatenate([self.counts[entry_mask]] + [values for _, (_, _, values) in new_items])
+        lengths = np.concatenate([lengths[keep], np.asarray([len(ids) for _, (_, ids, _) in new_items], dtype=np.int64)])
+        self.indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self._weights = None
+
+    def save(self):
+        vocabulary = np.empty(len(self.vocabulary), dtype=object)
+        for term, term_id in self.vocabulary.items():
+            vocabulary[term_id] = term
+        tmp = self.path.with_name(self.path.stem + '.tmp.npz')
+        np.savez_compressed(tmp, request_ids=self.request_ids, text_hashes=self.text_hashes, indptr=self.indptr,
+                            indices=self.indices, counts=self.counts, vocabulary=vocabulary.astype(str))
+        tmp.replace(self.path)
+
+    def _idf(self):
+        document_frequency = np.bincount(self.indices, minlength=len(self.vocabulary))
+        return (np.log((1 + len(self)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    def _weighted(self):
+        """(idf, L2-normalized sublinear TF-IDF values aligned with indices, row of each entry)"""
+        if self._weights is None:
+            idf = self._idf()
+            rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+            values = (1 + np.log(self.counts)) * idf[self.indices]
+            norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(self)))
+            values = values / np.where(norms > 0, norms, 1)[rows]
+            self._weights = (idf, values.astype(np.float32), rows)
+        return self._weights
+
+    def _query_vector(self, term_ids, counts):
+        idf, _, _ = self._weighted()
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        values = (1 + np.log(counts)) * idf[term_ids]
+        norm = np.sqrt(np.dot(values, values))
+        if norm > 0:
+            vector[term_ids] = values / norm
+        return vector
+
+    def scores(self, vector):
+        """Cosine similarity of every row with a dense, normalized query vector"""
+        _, values, rows = self._weighted()
+        return np.bincount(rows, weights=values * vector[self.indices], minlength=len(self))
+
+    def _top(self, scores, k, candidates, exclude):
+        mask = np.ones(len(self), dtype=bool) if candidates is None else np.isin(self.request_ids, list(candidates))
+        if exclude is not None:
+            mask &= self.request_ids != exclude
+        rows = np.flatnonzero(mask)
+        if not len(rows):
+            return []
+        k = min(k, len(rows))
+        best = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(self.request_ids[row]), float(scores[row])) for row in best]
+
+    def most_similar(self, request_id, k=5, candidates=None):
+        """[(request_id, cosine)] of the k petitions closest to an indexed one"""
+        row = self.row_of(request_id)
+        if row is None:
+            raise KeyError(f"request_id {request_id} is not in the similarity index")
+        start, end = self.indptr[row], self.indptr[row + 1]
+        vector = self._query_vector(self.indices[start:end], self.counts[start:end])
+        return self._top(self.scores(vector), k, candidates, exclude=request_id)
+
+    def query_text(self, text, k=5, candidates=None):
+        """[(request_id, cosine)] of the k petitions closest to an arbitrary text"""
+        term_ids, counts = self._term_ids(tokenize(text), grow=False)
+        return self._top(self.scores(self._query_vector(term_ids, counts)), k, candidates, exclude=None)
+
+
+def update_similarity_index(path, petitions, get_text):
+    """Bring the index at path up to date with the given PetitionRecords; returns (index, updated)"""
+    index = SimilarityIndex(path)
+    index.retain(p.request_id for p in petitions)
+    updated = index.update(
+        (p.request_id, p.text_sha256 if isinstance(p.text_sha256, str) else None, lambda p=p: get_text(p))
+        for p in petitions
+    )
+    index.save()
+    return index, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the petition similarity index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help='Index new or changed petitions')
+    similar_parser = subparsers.add_parser('similar', help='Petitions most similar to one petition')
+    similar_parser.add_argument('request_id', type=int)
+    similar_parser.add_argument('-k', type=int, default=5)
+    similar_parser.add_argument('--rating', type=int, help='Only consider petitions with this customer rating')
+    args = parser.parse_args()
+
+    from corpus import open_corpus, read_petition_text
+    from records import PetitionRecord
+
+    project_dir = Path(__file__).parent.parent
+    data_dir = project_dir / 'data'
+    petitions_dir = project_dir / 'petitions'
+    index_path = data_dir / SIMILARITY_INDEX_FILE
+    with open(data_dir / 'processed_petitions.json', 'r', encoding='utf-8') as f:
+        petitions = [PetitionRecord.from_dict(p) for p in json.load(f)]
+
+    if args.command == 'build':
+        corpus = open_corpus(petitions_dir)
+        index, updated = update_similarity_index(
+            index_path, petitions, lambda petition: read_petition_text(petition, petitions_dir, corpus))
+        print(f"Indexed {len(index)} petitions ({updated} re-tokenized, {len(index.vocabulary)} terms) "
+              f"into {index_path}")
+        return
+
+    if not index_path.exists():
+        parser.error(f"{index_path} not found; run 'similarity.py build' first")
+    index = SimilarityIndex(index_path)
+    ratings = {p.request_id: p.rating for p in petitions}
+    candidates = None
+    if args.rating is not None:
+        candidates = [request_id for request_id, rating in ratings.items() if rating == args.rating]
+    for request_id, score in index.most_similar(args.request_id, args.k, candidates):
+        print(f"  {request_id:>10}  rating {ratings.get(request_id, '?')}  cosine {score:.3f}")
+
+
+if __name__ == '__main__':
+    main()
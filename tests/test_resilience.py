@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+RetryPolicy and CircuitBreaker against the fake Messages API
+
+Each test starts fake_messages_api.start_server() with injected faults and
+drives real SDK calls through the policy. Sleeps are recorded on a fake clock
+instead of waited out. Run with:
+
+    python -m unittest discover tests
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from anthropic import Anthropic, APIConnectionError, APIStatusError, BadRequestError
+
+from fake_messages_api import start_server
+from resilience import RETRYABLE_STATUS_CODES, CircuitBreaker, RetryPolicy
+
+
+class FakeClock:
+    """Monotonic clock whose sleep() advances time and records the delay"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeAPITestCase(unittest.TestCase):
+
+    def start(self, **fault_options):
+        """Start a fake API with the given faults; return (client, faults)"""
+        server, base_url = start_server(**fault_options)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = Anthropic(base_url=base_url, api_key='fake', max_retries=0, timeout=10)
+        return client, server.RequestHandlerClass.faults
+
+    def policy(self, clock, **options):
+        options.setdefault('base_delay', 0.01)
+        return RetryPolicy(retry_on=(APIConnectionError,), sleep=clock.sleep, **options)
+
+    @staticmethod
+    def create(client):
+        return client.messages.create(
+            model='claude-sonnet-4-5', max_tokens=100,
+            messages=[{'role': 'user', 'content': 'PETIÇÃO: Excelentíssimo Senhor Doutor Juiz de Direito'}],
+        )
+
+
+class RetryableStatusTest(FakeAPITestCase):
+
+    def test_retryable_statuses_are_retried(self):
+        self.assertTrue({429, 500, 529} <= RETRYABLE_STATUS_CODES)
+        for status in (429, 500, 529):
+            with self.subTest(status=status):
+                clock = FakeClock()
+                client, faults = self.start(error_status=status, outage_requests=2)
+                message = self.policy(clock).call(self.create, client)
+                self.assertEqual(message.type, 'message')
+                self.assertEqual(faults.request_count, 3)
+                self.assertEqual(len(clock.sleeps), 2)
+
+    def test_client_error_is_not_retried(self):
+        self.assertNotIn(400, RETRYABLE_STATUS_CODES)
+        clock = FakeClock()
+        client, faults = self.start(error_status=400, outage_requests=1)
+        with self.assertRaises(BadRequestError):
+            self.policy(clock).call(self.create, client)
+        self.assertEqual(faults.request_count, 1)
+        self.assertEqual(clock.sleeps, [])
+
+    def test_last_error_propagates_after_max_attempts(self):
+        clock = FakeClock()
+        client, faults = self.start(error_status=529, outage_requests=10)
+        with self.assertRaises(APIStatusError) as caught:
+            self.policy(clock, max_attempts=3).call(self.create, client)
+        self.assertEqual(caught.exception.status_code, 529)
+        self.assertEqual(faults.request_count, 3)
+
+
+class RetryAfterTest(FakeAPITestCase):
+
+    def test_retry_after_sets_the_delay(self):
+        clock = FakeClock()
+        client, _ = self.start(error_status=429, retry_after=3, outage_requests=1)
+        self.policy(clock).call(self.create, client)
+        self.assertEqual(clock.sleeps, [3.0])
+
+    def test_retry_after_ms_takes_precedence(self):
+        clock = FakeClock()
+        client, _ = self.start(error_status=429, retry_after=3, retry_after_ms=1500, outage_requests=1)
+        self.policy(clock).call(self.create, client)
+        self.assertEqual(clock.sleeps, [1.5])
+
+    def test_retry_after_is_capped_by_max_delay(self):
+        clock = FakeClock()
+        client, _ = self.start(error_status=529, retry_after=120, outage_requests=1)
+        self.policy(clock, max_delay=5).call(self.create, client)
+        self.assertEqual(clock.sleeps, [5])
+
+
+class CircuitBreakerTest(FakeAPITestCase):
+
+    def breaker(self, clock, **options):
+        return CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock, sleep=clock.sleep, **options)
+
+    def test_opens_after_threshold_and_recovers_through_probe(self):
+        clock = FakeClock()
+        breaker = self.breaker(clock)
+        policy = self.policy(clock, max_attempts=1, breaker=breaker)
+        client, faults = self.start(error_status=529, outage_requests=2)
+
+        for _ in range(2):
+            with self.assertRaises(APIStatusError):
+                policy.call(self.create, client)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # The next call waits out the reset timeout, then probes and closes the circuit
+        policy.call(self.create, client)
+        self.assertEqual(clock.sleeps, [10])
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.consecutive_failures, 0)
+        self.assertEqual(faults.request_count, 3)
+
+    def test_failed_probe_reopens_with_doubled_timeout(self):
+        clock = FakeClock()
+        breaker = self.breaker(clock)
+        policy = self.policy(clock, max_attempts=1, breaker=breaker)
+        client, _ = self.start(error_status=503, outage_requests=3)
+
+        for _ in range(3):
+            with self.assertRaises(APIStatusError):
+                policy.call(self.create, client)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.reset_timeout, 20)
+        self.assertEqual(breaker.times_opened, 2)
+
+        policy.call(self.create, client)
+        self.assertEqual(clock.sleeps, [10, 20])
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.reset_timeout, 10)
+
+
+class RecordIgnoredTest(FakeAPITestCase):
+
+    def test_client_error_keeps_failure_count(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, clock=clock, sleep=clock.sleep)
+        policy = self.policy(clock, max_attempts=1, breaker=breaker)
+        overloaded, _ = self.start(error_status=529, outage_requests=1)
+        rejecting, _ = self.start(error_status=400, outage_requests=1)
+
+        with self.assertRaises(APIStatusError):
+            policy.call(self.create, overloaded)
+        with self.assertRaises(BadRequestError):
+            policy.call(self.create, rejecting)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.consecutive_failures, 1)
+
+    def test_client_error_probe_frees_the_slot_without_closing(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock, sleep=clock.sleep)
+        policy = self.policy(clock, max_attempts=1, breaker=breaker)
+        overloaded, _ = self.start(error_status=529, outage_requests=1)
+        rejecting, _ = self.start(error_status=400, outage_requests=1)
+
+        with self.assertRaises(APIStatusError):
+            policy.call(self.create, overloaded)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # The probe gets a 400: no verdict on availability, so stay half-open
+        with self.assertRaises(BadRequestError):
+            policy.call(self.create, rejecting)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(clock.sleeps, [10])
+
+        # The freed slot lets the next call probe straight away
+        policy.call(self.create, overloaded)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(clock.sleeps, [10])
+
+
+if __name__ == '__main__':
+    unittest.main()